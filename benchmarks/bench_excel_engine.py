@@ -0,0 +1,64 @@
+"""Benchmark of the Excel engines parsing e-Stat workbooks.
+
+Synthetic workbooks laid out like the e-Stat ones (see ``lpmd.tests.estat``) are parsed
+with each available engine, reading the whole sheet as before and reading only the rows
+and columns declared in data_catalogue.yml.
+
+Usage::
+
+    python benchmarks/bench_excel_engine.py --years 1000 --repeat 5
+"""
+
+import argparse
+import io
+import timeit
+from importlib.util import find_spec
+
+import pandas as pd
+
+from lpmd.core.scrape import ScraperShipment
+from lpmd.tests.estat import make_workbook
+
+
+def _engines():
+    engines = ["openpyxl"]
+    if find_spec("python_calamine") is not None:
+        engines.append("calamine")
+    return engines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--years", type=int, default=100, help="Data rows per workbook."
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Repeats of each run.")
+    args = parser.parse_args()
+
+    columns = ScraperShipment().columns
+    content = make_workbook(columns, years=list(range(1989, 1989 + args.years)))
+    print("workbook: {} rows, {:,} bytes".format(args.years, len(content)))
+
+    for engine in _engines():
+        scraper = ScraperShipment(excel_engine=engine)
+
+        def _full():
+            pd.read_excel(io.BytesIO(content), engine=engine)
+
+        def _catalogue():
+            scraper._read_excel(content)
+
+        def _scraped():
+            scraper.get_scraped_data("00.All", content=content)
+
+        for name, func in [
+            ("full sheet", _full),
+            ("catalogue rows", _catalogue),
+            ("get_scraped_data", _scraped),
+        ]:
+            best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+            print("{:<10} {:<18} {:8.1f} ms".format(engine, name, best * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmarks of scraping, cleansing, aggregation and loading.
+
+See ``conftest.py`` for the scales and the baselines.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import lpmd.core.panel as panel
+import lpmd.datasets as dt
+from lpmd.utils.format import format_raw_qty, format_raw_str_year
+
+# Rows of the series formatted at 1x scale.
+BASE_SERIES_ROWS = 1000
+
+
+def _raw_data(scraper):
+    """Raw data of a partition as passed to ``_cleanse_scraped_data``."""
+    content = scraper.download("00.All")
+    df_raw = scraper._read_excel(content)
+    return df_raw[df_raw["year"].notna()].reset_index(drop=True)
+
+
+def test_get_scraped_data(bench, scraper):
+    df = bench(scraper.get_scraped_data, "00.All")
+    assert len(df) > 0
+
+
+def test_cleanse_scraped_data(bench, scraper):
+    df_raw = _raw_data(scraper)
+    df = bench(scraper._cleanse_scraped_data, setup=lambda: ((df_raw.copy(),), dict()))
+    assert len(df) == len(df_raw)
+
+
+def test_format_raw_qty(bench, scale):
+    # e-Stat の数量の列と同じく, 数値と秘匿・該当なしの記号が混在する.
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 100000, size=BASE_SERIES_ROWS * scale).astype(object)
+    values[::11] = "-"
+    values[::13] = "x"
+    series = pd.Series(values, dtype=object)
+    series_formatted = bench(format_raw_qty, series)
+    assert series_formatted.dtype == float
+
+
+def test_format_raw_str_year(bench, scale):
+    years = 1900 + np.arange(BASE_SERIES_ROWS * scale) % 120
+    series = pd.Series(
+        ["{}({})".format("昭." + str(year - 1925), year) for year in years],
+        dtype=object,
+    )
+    series_formatted = bench(format_raw_str_year, series)
+    assert series_formatted.iloc[0] == 1900
+
+
+def test_aggregate(bench, scraper):
+    df = bench(scraper.aggregate, rounds=3)
+    assert df["prefecture"].nunique() == len(scraper.data_catalogue["partition"])
+
+
+def test_out_to_datasets(bench, scraper, tmp_path):
+    scraper.datasets_path = str(tmp_path / scraper.data_id)
+    file_path = bench(scraper.out_to_datasets, rounds=3)
+    assert file_path.endswith(".parquet.zstd")
+
+
+@pytest.fixture()
+def datasets(scraper, tmp_path, monkeypatch):
+    """Datasets directory holding the shipment dataset built at the scale."""
+    scraper.datasets_path = str(tmp_path / scraper.data_id)
+    scraper.out_to_datasets()
+    monkeypatch.setattr(dt, "_datasets_dir", lambda: tmp_path)
+    dt.cache_clear()
+    yield tmp_path
+    dt.cache_clear()
+
+
+@pytest.mark.parametrize("case", ["full", "filtered", "cached"])
+def test_load_shipment(bench, datasets, case):
+    if case == "full":
+        df = bench(lambda: dt.load_shipment(cache=False))
+    elif case == "filtered":
+        df = bench(
+            lambda: dt.load_shipment(
+                prefectures=["01.Hokkaido", "02.Aomori"],
+                years=range(1000, 1010),
+                columns=["year", "pig"],
+                cache=False,
+            )
+        )
+    else:
+        dt.load_shipment()
+        df = bench(dt.load_shipment)
+    assert len(df) > 0
+
+
+@pytest.fixture()
+def panel_datasets(scrapers, tmp_path, monkeypatch):
+    """Datasets directory holding all datasets and the panel built at the scale."""
+    for scraper in scrapers:
+        scraper.datasets_path = str(tmp_path / scraper.data_id)
+        scraper.out_to_datasets()
+    panel.out_to_panel(str(tmp_path))
+    monkeypatch.setattr(dt, "_datasets_dir", lambda: tmp_path)
+    dt.cache_clear()
+    yield tmp_path
+    dt.cache_clear()
+
+
+@pytest.mark.parametrize("case", ["artifact", "on_the_fly"])
+def test_load_panel(bench, panel_datasets, monkeypatch, case):
+    if case == "on_the_fly":
+        # 作成済みのパネルがない場合は, 読み込むたびに結合する.
+        monkeypatch.setattr(panel, "panel_path", lambda _: "not_exists")
+    df = bench(lambda: dt.load_panel(cache=False))
+    assert df.index.is_monotonic_increasing
@@ -0,0 +1,198 @@
+"""Fixtures of the benchmark suite.
+
+Benchmarks run offline against the local e-Stat stand-in (see ``lpmd.tests.estat``),
+serving synthetic workbooks at 1x, 10x and 100x of the rows of the e-Stat ones.
+
+The minimum time of each benchmark is divided by the time of a fixed calibration workload
+measured on the same machine, so that the stored baselines in ``baselines.json`` can be
+compared across machines. A benchmark fails if it is slower than its baseline by more
+than ``--baseline-tolerance``.
+
+Usage::
+
+    pytest benchmarks                           # compare with the baselines
+    pytest benchmarks --scales 1,10             # skip the 100x scale
+    pytest benchmarks --update-baselines        # record new baselines
+"""
+
+import json
+import os
+import timeit
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lpmd.core.scrape import ScraperCarcass, ScraperShipment, ScraperSlaughter
+from lpmd.tests.estat import EStatStandIn, make_workbook
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+# Rows of a workbook at 1x scale, which is as many years as the e-Stat workbooks.
+BASE_YEARS = 25
+
+# Number of partitions served at each scale.
+N_PARTITIONS = 8
+
+SCALES = [1, 10, 100]
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("lpmd benchmarks")
+    group.addoption(
+        "--scales",
+        default=",".join(map(str, SCALES)),
+        help="Comma-separated synthetic scales to be run (default: 1,10,100).",
+    )
+    group.addoption(
+        "--update-baselines",
+        action="store_true",
+        help="Record the results as the new baselines instead of comparing with them.",
+    )
+    group.addoption(
+        "--baseline-tolerance",
+        type=float,
+        default=1.0,
+        help="Allowed slowdown relative to the baselines (default: 1.0, i.e. twice as slow).",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "scale" in metafunc.fixturenames:
+        scales = [
+            int(scale) for scale in metafunc.config.getoption("scales").split(",")
+        ]
+        metafunc.parametrize("scale", scales, ids=lambda scale: "{}x".format(scale))
+
+
+def _calibration_workload():
+    """Fixed workload mixing Python, NumPy and pandas, as the scrape pipeline does."""
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 100000, size=200000)
+    series = pd.Series(values.astype(str), dtype=object)
+    series[::7] = "-"
+    series = pd.to_numeric(series, errors="coerce")
+    series.groupby(values % 48).sum()
+    sum(len(str(value)) for value in values[:50000])
+
+
+@pytest.fixture(scope="session")
+def calibration():
+    """Seconds taken by the calibration workload on this machine."""
+    _calibration_workload()
+    return min(timeit.repeat(_calibration_workload, number=1, repeat=7))
+
+
+@pytest.fixture(scope="session")
+def baselines(request):
+    """Stored baselines, which are rewritten at the end of the session with ``--update-baselines``."""
+    dict_baselines = dict()
+    if os.path.exists(BASELINES_PATH):
+        with open(BASELINES_PATH, encoding="utf-8") as f:
+            dict_baselines = json.load(f)
+    yield dict_baselines
+    if request.config.getoption("update_baselines"):
+        with open(BASELINES_PATH, "w", encoding="utf-8") as f:
+            json.dump(dict_baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+@pytest.fixture()
+def bench(benchmark, request, calibration, baselines):
+    """
+    Run a benchmark and compare its minimum with the baseline.
+
+    The returned function takes ``func`` and its arguments, and keyword arguments
+    ``setup`` (returning the arguments of each round, e.g. fresh copies of mutated inputs)
+    and ``rounds``. If both are None, the rounds are calibrated by pytest-benchmark.
+    """
+
+    def _run(func, *args, setup=None, rounds=None):
+        if setup is None and rounds is None:
+            # 計測の回数は pytest-benchmark が実行時間から決める.
+            result = benchmark(func, *args)
+        else:
+            result = benchmark.pedantic(
+                func,
+                args=args,
+                setup=setup,
+                rounds=5 if rounds is None else rounds,
+                warmup_rounds=1,
+            )
+        if benchmark.stats is None:
+            # --benchmark-disable の場合は計測されない.
+            return result
+
+        name = request.node.name
+        relative = benchmark.stats.stats.min / calibration
+        benchmark.extra_info["relative_to_calibration"] = relative
+        if request.config.getoption("update_baselines"):
+            baselines[name] = float("{:.4g}".format(relative))
+        elif name in baselines:
+            tolerance = request.config.getoption("baseline_tolerance")
+            if relative > baselines[name] * (1 + tolerance):
+                pytest.fail(
+                    "{} regressed: {:.3g} times the calibration, "
+                    "while the baseline is {:.3g}.".format(
+                        name, relative, baselines[name]
+                    ),
+                    pytrace=False,
+                )
+        return result
+
+    return _run
+
+
+@pytest.fixture(scope="session")
+def stand_in():
+    """e-Stat stand-in shared by the benchmarks."""
+    server = EStatStandIn()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="session")
+def workbooks():
+    """Synthetic workbooks cached by scale, as generating the large ones is slow."""
+    dict_workbooks = dict()
+
+    def _get(scale, columns):
+        key = (scale, tuple(columns))
+        if key not in dict_workbooks:
+            years = list(range(1000, 1000 + BASE_YEARS * scale))
+            dict_workbooks[key] = make_workbook(columns, years=years)
+        return dict_workbooks[key]
+
+    return _get
+
+
+def _serve(scraper, stand_in, workbooks, scale):
+    """Serve the partitions of the scraper by the stand-in at the scale."""
+    content = workbooks(scale, scraper.columns)
+    partition = dict()
+    for i, partition_id in enumerate(
+        list(scraper.data_catalogue["partition"])[:N_PARTITIONS]
+    ):
+        path = "/{}x/{}/file-download?statInfId={}&fileKind=0".format(
+            scale, scraper.data_id, i
+        )
+        stand_in.routes[path] = content
+        partition[partition_id] = stand_in.url(path)
+    scraper.data_catalogue["partition"] = partition
+    return scraper
+
+
+@pytest.fixture()
+def scraper(stand_in, workbooks, scale):
+    """Shipment scraper whose partitions are served by the stand-in at the scale."""
+    return _serve(ScraperShipment(), stand_in, workbooks, scale)
+
+
+@pytest.fixture()
+def scrapers(stand_in, workbooks, scale):
+    """Scrapers of shipment, slaughter and carcass served by the stand-in at the scale."""
+    return [
+        _serve(scraper_class(), stand_in, workbooks, scale)
+        for scraper_class in [ScraperShipment, ScraperSlaughter, ScraperCarcass]
+    ]
@@ -0,0 +1,7 @@
+"""lpmd.__main__."""
+
+import sys
+
+from lpmd.cli import main
+
+sys.exit(main())
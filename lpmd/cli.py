@@ -0,0 +1,349 @@
+"""lpmd.cli.
+
+Command-line entry point of lpmd.
+
+Usage::
+
+    lpmd build                                   # build all datasets
+    lpmd build shipment --workers 8              # build a dataset with 8 workers
+    lpmd build --only-partitions 13.Tokyo 27.Osaka --incremental
+    lpmd build --dry-run                         # list what would be built
+    lpmd build --replay estat.zip                # record e-Stat once, then build offline
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import lpmd.core.panel as panel
+from lpmd.core.scrape import ScraperCarcass, ScraperShipment, ScraperSlaughter
+
+# Datasets which can be built by ``lpmd build``.
+SCRAPERS = {
+    "shipment": ScraperShipment,
+    "slaughter": ScraperSlaughter,
+    "carcass": ScraperCarcass,
+}
+
+
+def _make_parser():
+    parser = argparse.ArgumentParser(
+        prog="lpmd", description="lpmd: Livestock Product Marketing Data for Japan"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser(
+        "build",
+        help="Build datasets in lpmd/datasets from e-Stat.",
+        description="Build datasets concurrently from e-Stat, "
+        "reporting the timings of each partition.",
+    )
+    build.add_argument(
+        "datasets",
+        nargs="*",
+        metavar="DATASET",
+        help="Datasets to be built, from {}. All of them if omitted.".format(
+            ", ".join(SCRAPERS)
+        ),
+    )
+    build.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Partitions scraped concurrently per dataset (default: 4).",
+    )
+    build.add_argument(
+        "--only-partitions",
+        nargs="+",
+        metavar="PARTITION",
+        help="Rebuild only these partitions, e.g. 13.Tokyo. "
+        "The rows of the other partitions are re-used from the dataset.",
+    )
+    build.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print the partitions and the files to be built without downloading.",
+    )
+    build.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Parse only the partitions whose Excel files have changed since the last build.",
+    )
+    build.add_argument(
+        "--partitioned",
+        action="store_true",
+        help="Write the datasets partitioned by prefecture.",
+    )
+    build.add_argument(
+        "--output",
+        default=os.path.join("lpmd", "datasets"),
+        help="Directory of the datasets (default: lpmd/datasets).",
+    )
+    build.add_argument(
+        "--cache-dir", default=None, help="Directory of the on-disk download cache."
+    )
+    build.add_argument(
+        "--replay",
+        metavar="ARCHIVE",
+        default=None,
+        help="Record the e-Stat responses into the archive, and replay them in later builds "
+        "without network.",
+    )
+    build.add_argument(
+        "--replay-mode",
+        choices=["record", "replay", "auto"],
+        default="auto",
+        help="record: download and record all responses, replay: never download, "
+        "auto: download only the responses not recorded (default: auto).",
+    )
+    build.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="Log the timing spans of each stage of the pipeline.",
+    )
+    return parser
+
+
+def _format_bytes(n_bytes):
+    return "{:.1f} MB".format(n_bytes / 1024**2)
+
+
+def _build(scraper, args):
+    """Build a dataset and return the path, the seconds taken and the error if any."""
+    start = time.perf_counter()
+    try:
+        path = scraper.out_to_datasets(
+            incremental=args.incremental,
+            partitioned=args.partitioned,
+            partition_ids=args.only_partitions,
+            max_workers=args.workers,
+            use_processes=True,
+        )
+    except Exception as e:
+        # 一つのデータセットの失敗で, 他のデータセットの報告が失われないようにする.
+        return None, time.perf_counter() - start, str(e)
+    return path, time.perf_counter() - start, None
+
+
+def _report(scraper, path, seconds, error, out):
+    """Print the timings of each partition and the throughput of the dataset."""
+    print("{}:".format(scraper.data_id), file=out)
+    print(
+        "  {:<14} {:>10} {:>10} {:>10} {:>10} {:>8} {:>12}".format(
+            "partition", "fetch", "parse", "cleanse", "write", "rows", "bytes"
+        ),
+        file=out,
+    )
+    for partition_id in scraper.data_catalogue["partition"]:
+        stats = scraper.partition_stats.get(partition_id)
+        if stats is None:
+            continue
+        cells = [
+            "{:.2f}s".format(stats[key]) if key in stats else "-"
+            for key in [
+                "fetch_seconds",
+                "parse_seconds",
+                "cleanse_seconds",
+                "write_seconds",
+            ]
+        ]
+        print(
+            "  {:<14} {:>10} {:>10} {:>10} {:>10} {:>8} {:>12}".format(
+                partition_id,
+                *cells,
+                "{:,}".format(stats["rows"]) if "rows" in stats else "-",
+                "{:,}".format(stats["bytes"]) if "bytes" in stats else "-",
+            ),
+            file=out,
+        )
+
+    n_rows = sum(stats.get("rows", 0) for stats in scraper.partition_stats.values())
+    n_bytes = sum(stats.get("bytes", 0) for stats in scraper.partition_stats.values())
+    list_peak_rss = [
+        stats["peak_rss_bytes"]
+        for stats in scraper.partition_stats.values()
+        if "peak_rss_bytes" in stats
+    ]
+    if scraper.write_seconds is not None:
+        print("  write {:.2f}s".format(scraper.write_seconds), file=out)
+    if len(list_peak_rss) > 0:
+        print("  peak memory {}".format(_format_bytes(max(list_peak_rss))), file=out)
+    print(
+        "  total {:.2f}s, {:,} rows ({:,.0f} rows/s), {} ({}/s)".format(
+            seconds,
+            n_rows,
+            n_rows / seconds if seconds > 0 else 0,
+            _format_bytes(n_bytes),
+            _format_bytes(n_bytes / seconds if seconds > 0 else 0),
+        ),
+        file=out,
+    )
+    if error is None:
+        print("  -> {}".format(path), file=out)
+    else:
+        print("  failed: {}".format(error), file=out)
+
+
+def _dry_run(scraper, args, out):
+    """Print the partitions and the file to be built."""
+    partition_ids = scraper._resolve_partition_ids(args.only_partitions)
+    if args.partitioned:
+        file = "{}.parquet".format(scraper.data_id)
+    else:
+        file = "{}.parquet.zstd".format(scraper.data_id)
+    print(
+        "{}: {} partitions -> {}".format(
+            scraper.data_id,
+            len(partition_ids),
+            os.path.join(scraper.datasets_path, file),
+        ),
+        file=out,
+    )
+    for partition_id in partition_ids:
+        print(
+            "  {:<14} {}".format(
+                partition_id, scraper.data_catalogue["partition"][partition_id]
+            ),
+            file=out,
+        )
+
+
+def _has_panel_datasets(args):
+    """Whether all datasets of the panel are built, or are going to be built."""
+    datasets = args.datasets or list(SCRAPERS)
+    for data_id in panel.PANEL_DATA_IDS:
+        if data_id in datasets:
+            continue
+        if not os.path.exists(panel.dataset_path(args.output, data_id)):
+            return False
+    return True
+
+
+def build(args, out=None):
+    """
+    Build the datasets specified by the command-line arguments.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed arguments of ``lpmd build``.
+    out : file-like object, default None
+        Stream to which the report is printed. If None, ``sys.stdout``.
+
+    Returns
+    -------
+    exit_code : int
+        0 if all partitions have been built, otherwise 1.
+
+    """
+    out = sys.stdout if out is None else out
+    session = None
+    if args.replay is not None:
+        import lpmd.utils.replay as replay
+
+        session = replay.ReplaySession(args.replay, mode=args.replay_mode)
+    try:
+        return _build_all(args, session, out)
+    finally:
+        if session is not None:
+            session.close()
+
+
+def _build_all(args, session, out):
+    list_scraper = []
+    for data_id in args.datasets or list(SCRAPERS):
+        scraper = SCRAPERS[data_id](cache_dir=args.cache_dir, session=session)
+        scraper.datasets_path = os.path.join(args.output, data_id)
+        list_scraper.append(scraper)
+
+    try:
+        for scraper in list_scraper:
+            scraper._resolve_partition_ids(args.only_partitions)
+    except ValueError as e:
+        print("lpmd build: error: {}".format(e), file=sys.stderr)
+        return 2
+
+    if args.dry_run:
+        for scraper in list_scraper:
+            _dry_run(scraper, args, out)
+        if _has_panel_datasets(args):
+            print("panel -> {}".format(panel.panel_path(args.output)), file=out)
+        return 0
+
+    # データセットごとにスレッドで並行して作成し, 指定された順に報告する.
+    failed = []
+    with ThreadPoolExecutor(max_workers=len(list_scraper)) as executor:
+        futures = [executor.submit(_build, scraper, args) for scraper in list_scraper]
+        for scraper, future in zip(list_scraper, futures):
+            path, seconds, error = future.result()
+            _report(scraper, path, seconds, error, out)
+            if error is not None:
+                failed.append((scraper.data_id, None, error))
+            for partition_id, stats in scraper.partition_stats.items():
+                if "error" in stats:
+                    failed.append((scraper.data_id, partition_id, stats["error"]))
+
+    # 全てのデータセットが揃っている場合は, 結合したパネルも作り直す.
+    if _has_panel_datasets(args):
+        start = time.perf_counter()
+        try:
+            path = panel.out_to_panel(args.output)
+        except (OSError, ValueError) as e:
+            print("panel:\n  failed: {}".format(e), file=out)
+            failed.append(("panel", None, str(e)))
+        else:
+            print(
+                "panel:\n  total {:.2f}s\n  -> {}".format(
+                    time.perf_counter() - start, path
+                ),
+                file=out,
+            )
+
+    if len(failed) == 0:
+        return 0
+    print("failed:", file=out)
+    for data_id, partition_id, error in failed:
+        name = (
+            data_id if partition_id is None else "{}/{}".format(data_id, partition_id)
+        )
+        print("  {}: {}".format(name, error), file=out)
+    return 1
+
+
+def main(argv=None):
+    """
+    Run the command line of lpmd.
+
+    Parameters
+    ----------
+    argv : list of str, default None
+        Command-line arguments. If None, ``sys.argv[1:]``.
+
+    Returns
+    -------
+    exit_code : int
+        Exit code of the command.
+
+    """
+    parser = _make_parser()
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        unknown = [data_id for data_id in args.datasets if data_id not in SCRAPERS]
+        if len(unknown) > 0:
+            parser.error(
+                "Specified datasets {} must be one of {}.".format(
+                    unknown, list(SCRAPERS)
+                )
+            )
+        if args.workers < 1:
+            parser.error("--workers must be positive.")
+        logging.basicConfig(
+            level=logging.DEBUG if args.verbose else logging.WARNING,
+            format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+        )
+        return build(args)
+    return 0
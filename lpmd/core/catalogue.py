@@ -0,0 +1,211 @@
+"""lpmd.core.catalogue."""
+
+import copy
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from importlib.resources import files
+from types import MappingProxyType
+
+# Environment variable of the directory where the parsed catalogue is snapshotted.
+SNAPSHOT_DIR_ENV = "LPMD_CATALOGUE_SNAPSHOT_DIR"
+
+_lock = threading.Lock()
+_catalogue = None
+
+
+class DatasetCatalogue:
+    """
+    Read-only view on a dataset in data_catalogue.yml.
+
+    Parameters
+    ----------
+    data_id : str
+        String expressing which data in data_catalogue.yml.
+    raw : dict
+        Section of the dataset in data_catalogue.yml.
+
+    Attributes
+    ----------
+    name : str or None
+        Name of the dataset.
+    columns : mapping
+        Columns section, mapping column to the dict of name, dtype and column_type.
+    column_names : mapping
+        Mapping column to the name in the Excel file.
+    pipeline : mapping
+        Pipeline section on how the Excel file is read, e.g. header_offset.
+    metadata : mapping
+        Metadata section, mapping column added to scraped data (e.g. prefecture) to the dict of dtype.
+    dtypes : mapping
+        Mapping column, including metadata column, to the dtype.
+    column_types : mapping
+        Mapping column to the column_type.
+    partitions : mapping
+        Mapping partition_id to the url.
+    urls : tuple of str
+        Urls of the partitions.
+
+    """
+
+    def __init__(self, data_id, raw):
+        self.data_id = data_id
+        self._raw = raw
+        columns = raw.get("columns", dict())
+        metadata = raw.get("metadata", dict())
+        # 列の定義がない項目は partition_id と url の対応のみからなる.
+        partitions = raw["partition"] if "partition" in raw else raw
+
+        self.name = raw.get("name")
+        self.columns = MappingProxyType(columns)
+        self.column_names = MappingProxyType(
+            {col: v.get("name") for col, v in columns.items()}
+        )
+        self.pipeline = MappingProxyType(raw.get("pipeline", dict()))
+        self.metadata = MappingProxyType(metadata)
+        self.dtypes = MappingProxyType(
+            {
+                col: v["dtype"]
+                for col, v in {**columns, **metadata}.items()
+                if "dtype" in v
+            }
+        )
+        self.column_types = MappingProxyType(
+            {col: v["column_type"] for col, v in columns.items() if "column_type" in v}
+        )
+        self.partitions = MappingProxyType(partitions)
+        self.urls = tuple(partitions.values())
+
+    def to_dict(self):
+        """
+        Copy the section of the dataset in data_catalogue.yml.
+
+        Returns
+        -------
+        raw : dict
+            Deep copy of the section, which can be modified without affecting the catalogue.
+
+        """
+        return copy.deepcopy(self._raw)
+
+
+class DataCatalogue:
+    """
+    Data catalogue parsed from data_catalogue.yml.
+
+    Parameters
+    ----------
+    raw : dict
+        Parsed data_catalogue.yml.
+    sha256 : str
+        SHA-256 of data_catalogue.yml.
+
+    """
+
+    def __init__(self, raw, sha256):
+        self.sha256 = sha256
+        self._raw = raw
+        self._datasets = {
+            data_id: DatasetCatalogue(data_id, section)
+            for data_id, section in raw.items()
+        }
+
+    @property
+    def data_ids(self):
+        """List of data_id in data_catalogue.yml."""
+        return list(self._datasets.keys())
+
+    def __getitem__(self, data_id):
+        return self._datasets[data_id]
+
+    def __contains__(self, data_id):
+        return data_id in self._datasets
+
+    def to_dict(self):
+        """Deep copy of parsed data_catalogue.yml."""
+        return copy.deepcopy(self._raw)
+
+
+def _parse(content):
+    import yaml
+
+    # C 実装のローダーが使える場合はそちらを使う.
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    return yaml.load(content, Loader=loader)
+
+
+def _load_snapshot(snapshot_dir, sha256):
+    path = os.path.join(snapshot_dir, "data_catalogue-{}.pickle".format(sha256))
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+
+def _save_snapshot(snapshot_dir, sha256, raw):
+    os.makedirs(snapshot_dir, exist_ok=True)
+    path = os.path.join(snapshot_dir, "data_catalogue-{}.pickle".format(sha256))
+    fd, tmp_path = tempfile.mkstemp(dir=snapshot_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(raw, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_catalogue(snapshot_dir=None):
+    """
+    Parse data_catalogue.yml.
+
+    Parameters
+    ----------
+    snapshot_dir : str, default None
+        Directory of the pickled snapshot keyed by SHA-256 of data_catalogue.yml.
+        If the snapshot exists, it is loaded instead of parsing the yml file.
+        If None, no snapshot is used.
+
+    Returns
+    -------
+    catalogue : DataCatalogue
+        Parsed data catalogue.
+
+    """
+    content = files("lpmd").joinpath("data_catalogue.yml").read_bytes()
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    raw = None
+    if snapshot_dir is not None:
+        raw = _load_snapshot(snapshot_dir, sha256)
+    if raw is None:
+        raw = _parse(content)
+        if snapshot_dir is not None:
+            _save_snapshot(snapshot_dir, sha256, raw)
+    return DataCatalogue(raw, sha256)
+
+
+def get_catalogue():
+    """
+    Get the data catalogue shared in the process, which is parsed only once.
+
+    If the environment variable ``LPMD_CATALOGUE_SNAPSHOT_DIR`` is set,
+    the snapshot in the directory is used (see ``load_catalogue``).
+
+    Returns
+    -------
+    catalogue : DataCatalogue
+        Parsed data catalogue.
+
+    """
+    global _catalogue
+    if _catalogue is None:
+        with _lock:
+            if _catalogue is None:
+                _catalogue = load_catalogue(
+                    snapshot_dir=os.environ.get(SNAPSHOT_DIR_ENV)
+                )
+    return _catalogue
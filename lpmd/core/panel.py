@@ -0,0 +1,193 @@
+"""lpmd.core.panel."""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import lpmd.core.catalogue as catalogue
+
+# Datasets joined into the panel, in the order of its columns.
+PANEL_DATA_IDS = ["shipment", "slaughter", "carcass"]
+
+# Levels of the index of the panel.
+PANEL_INDEX = ["prefecture", "year"]
+
+# Separator of data_id and column in the flat column names stored in parquet, e.g. "shipment.pig".
+COLUMN_SEPARATOR = "."
+
+# Key of the parquet metadata holding the fingerprints of the datasets the panel is built from.
+SOURCES_KEY = b"lpmd_panel_sources"
+
+
+def dataset_path(datasets_dir, data_id):
+    """Path of the dataset, which is a directory if the dataset is partitioned by prefecture."""
+    dir_path = os.path.join(datasets_dir, data_id, "{}.parquet".format(data_id))
+    if os.path.isdir(dir_path):
+        return dir_path
+    return os.path.join(datasets_dir, data_id, "{}.parquet.zstd".format(data_id))
+
+
+def panel_path(datasets_dir):
+    """Path of the panel artifact."""
+    return os.path.join(datasets_dir, "panel", "panel.parquet.zstd")
+
+
+def fingerprint(path):
+    """SHA-256 of the dataset files, which tells whether the panel has been built from them."""
+    if os.path.isdir(path):
+        list_path = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(path)
+            for name in names
+            if not name.startswith(".")
+        )
+    else:
+        list_path = [path]
+    h = hashlib.sha256()
+    for file_path in list_path:
+        h.update(os.path.relpath(file_path, path).encode("utf-8"))
+        with open(file_path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def panel_columns(data_id):
+    """Columns of the dataset in the panel, i.e. the measures declared in data_catalogue.yml."""
+    return [
+        col
+        for col in catalogue.get_catalogue()[data_id].columns
+        if col not in PANEL_INDEX
+    ]
+
+
+def make_panel(dict_df):
+    """
+    Join the datasets on prefecture and year.
+
+    Parameters
+    ----------
+    dict_df : dict of pandas.core.frame.DataFrame
+        Mapping data_id to the dataset, which has prefecture and year columns.
+
+    Returns
+    -------
+    df_panel : pandas.core.frame.DataFrame
+        Outer join of the datasets indexed by (prefecture, year) and sorted by the index.
+        The columns are MultiIndex of (data_id, column) on the measures of each dataset.
+
+    """
+    import pandas as pd
+
+    list_df = []
+    for data_id, df in dict_df.items():
+        columns = [col for col in panel_columns(data_id) if col in df.columns]
+        df = df[PANEL_INDEX + columns].copy()
+        # 読み込み方によらず, prefecture は文字列の索引とする.
+        df["prefecture"] = df["prefecture"].astype(str)
+        list_df.append(df.set_index(PANEL_INDEX))
+    df_panel = pd.concat(list_df, axis=1, keys=list(dict_df), join="outer")
+    df_panel.columns = df_panel.columns.set_names(["data_id", "column"])
+    return df_panel.sort_index()
+
+
+def flatten_columns(df_panel):
+    """Flatten the (data_id, column) columns of the panel into the names stored in parquet."""
+    df_panel = df_panel.copy(deep=False)
+    df_panel.columns = [
+        COLUMN_SEPARATOR.join(col) for col in df_panel.columns.to_flat_index()
+    ]
+    return df_panel
+
+
+def unflatten_columns(df_panel):
+    """Restore the (data_id, column) columns of the panel read from parquet."""
+    import pandas as pd
+
+    df_panel.columns = pd.MultiIndex.from_tuples(
+        [tuple(col.split(COLUMN_SEPARATOR, 1)) for col in df_panel.columns],
+        names=["data_id", "column"],
+    )
+    return df_panel
+
+
+def read_sources(file_path):
+    """Fingerprints of the datasets stored in the panel artifact. Empty dict if it has none."""
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_schema(file_path).metadata or dict()
+    if SOURCES_KEY not in metadata:
+        return dict()
+    return json.loads(metadata[SOURCES_KEY])
+
+
+def out_to_panel(datasets_dir=os.path.join("lpmd", "datasets")):
+    """
+    Build the panel from the datasets and write it as parquet.
+
+    The panel is written with the fingerprints of the datasets, so that ``lpmd.datasets.load_panel``
+    can tell whether the panel is up to date.
+
+    Parameters
+    ----------
+    datasets_dir : str, default "lpmd/datasets"
+        Directory of the datasets, where the panel is written into panel/panel.parquet.zstd.
+
+    Returns
+    -------
+    file_path : str
+        Path of the panel.
+
+    Raises
+    ------
+    FileNotFoundError
+        If any of the datasets has not been built.
+
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    dict_path = {
+        data_id: dataset_path(datasets_dir, data_id) for data_id in PANEL_DATA_IDS
+    }
+    missing = [
+        data_id for data_id, path in dict_path.items() if not os.path.exists(path)
+    ]
+    if len(missing) > 0:
+        msg = "Specified datasets {} have not been built in {}.".format(
+            missing, datasets_dir
+        )
+        raise FileNotFoundError(msg)
+
+    dict_df = {
+        data_id: pd.read_parquet(path, columns=PANEL_INDEX + panel_columns(data_id))
+        for data_id, path in dict_path.items()
+    }
+    df_panel = make_panel(dict_df)
+    sources = {data_id: fingerprint(path) for data_id, path in dict_path.items()}
+
+    table = pa.Table.from_pandas(flatten_columns(df_panel))
+    table = table.replace_schema_metadata(
+        {**table.schema.metadata, SOURCES_KEY: json.dumps(sources).encode("utf-8")}
+    )
+
+    file_path = panel_path(datasets_dir)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    # 読み込み中に書きかけのファイルが見えないよう, 一時ファイルを経由する.
+    fd, tmp_file_path = tempfile.mkstemp(
+        prefix=".{}.".format(os.path.basename(file_path)),
+        dir=os.path.dirname(file_path),
+    )
+    os.close(fd)
+    try:
+        # 列が多いため, 行グループごとに全列の統計を持つとフッターが本体より大きくなる.
+        # 行グループは一つにし, 統計は索引の列のみに持たせる.
+        pq.write_table(
+            table, tmp_file_path, compression="zstd", write_statistics=PANEL_INDEX
+        )
+        os.replace(tmp_file_path, file_path)
+    finally:
+        if os.path.exists(tmp_file_path):
+            os.remove(tmp_file_path)
+    return file_path
@@ -1,15 +1,127 @@
 """lpmd.core.scrape."""
 
+import contextlib
+import copy
+import hashlib
+import io
+import json
+import logging
 import os
+import queue
 import shutil
-from importlib import resources
-
-import dask.dataframe as dd
-import pandas as pd
-import yaml
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlsplit
 
+import lpmd.core.catalogue as catalogue
+import lpmd.utils.cache as cache
 import lpmd.utils.check as check
-import lpmd.utils.format as fmt
+import lpmd.utils.http as http
+import lpmd.utils.instrument as instrument
+
+# pandas, pyarrow and dask are imported where they are used,
+# so that importing this module stays fast.
+
+# Engines of ``pandas.read_excel`` which can be specified as excel_engine.
+EXCEL_ENGINES = ["calamine", "openpyxl", "xlrd"]
+
+logger = logging.getLogger(__name__)
+
+
+def _supports_calamine():
+    """Whether ``pandas.read_excel`` supports the calamine engine, which is added in pandas 2.2."""
+    import pandas as pd
+
+    version = tuple(int(v) for v in pd.__version__.split(".")[:2])
+    return version >= (2, 2)
+
+
+def _default_excel_engine():
+    """calamine if it can be used, otherwise None, i.e. detected by pandas from the file."""
+    from importlib.util import find_spec
+
+    if find_spec("python_calamine") is not None and _supports_calamine():
+        return "calamine"
+    # openpyxl は .xls を読めないため, 形式に応じて pandas に選ばせる.
+    return None
+
+
+def _process_pool(max_workers):
+    """
+    Process pool parsing the Excel files, whose workers are spawned.
+
+    The workers are started lazily while the download threads run, and forking a multi-threaded
+    process may deadlock the child, so that the workers are always spawned.
+    """
+    import multiprocessing
+
+    return ProcessPoolExecutor(
+        max_workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+class _HostLimiter:
+    """
+    Bound the number of concurrent requests per host.
+
+    Requests are counted per host across all callers, and each of them waits until fewer than
+    its own ``max_per_host`` requests to the host are in flight.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._in_flight = dict()
+
+    @contextlib.contextmanager
+    def __call__(self, url, max_per_host):
+        host = urlsplit(url).netloc
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._in_flight.get(host, 0) < max_per_host
+            )
+            self._in_flight[host] = self._in_flight.get(host, 0) + 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight[host] -= 1
+                self._condition.notify_all()
+
+
+# 同じホストに並行して取得するスクレイパー (lpmd build など) で上限を共有する.
+_host_limiter = _HostLimiter()
+
+
+def _parse_scraped_data(scraper, partition_id, content):
+    """Parse downloaded Excel file in a worker, returning the events to be emitted by the caller."""
+    # イベントはワーカーで出力せず, 呼び出し元に返して出力する.
+    scraper = copy.copy(scraper)
+    scraper._relay = []
+    df_scraped = scraper.get_scraped_data(partition_id, content=content)
+    return df_scraped, scraper._relay
+
+
+@contextlib.asynccontextmanager
+async def _async_session(session=None, max_per_host=4, replay=False):
+    """
+    Use the given session, or open a pooled one closed on exit.
+
+    None if aiohttp is not installed, or the responses are replayed by the synchronous session.
+    """
+    if session is not None:
+        yield session
+        return
+    if replay:
+        # 記録された応答は同期版のセッションでしか再生できない.
+        yield None
+        return
+    session = http.open_async_session(max_per_host=max_per_host)
+    if session is None:
+        yield None
+        return
+    async with session:
+        yield session
 
 
 class BaseScraper:
@@ -17,29 +129,154 @@ class BaseScraper:
     Base class for scraper.
 
     Other scraper classes should inherit from this class.
-    The class has base methods for scraping data, and in other scraper subclass `get_scraped_data` should be customized.
+    The class has base methods for scraping data, and `get_scraped_data` runs the pipeline declared
+    in pipeline and metadata sections of data_catalogue.yml, so that a new dataset only needs its section.
 
     Parameters
     ----------
     data_id : str
         String expressing which data should be scraped in data_catalogue.yml.
+    cache_dir : str, default None
+        Directory of the on-disk download cache. If specified, unchanged Excel files are
+        revalidated with conditional requests instead of being downloaded again.
+    cache_max_bytes : int, default 512 MiB
+        Maximum total size of the download cache.
+    staging_root : str, default None
+        Directory under which a unique staging directory is created for each on-disk aggregation.
+        If None, the default temporary directory of the system is used.
+    excel_engine : {"calamine", "openpyxl", "xlrd"}, default None
+        Engine of ``pandas.read_excel`` parsing the Excel files.
+        calamine requires python-calamine and pandas 2.2 or later.
+        If None, calamine is used if it can be used, otherwise pandas chooses
+        the engine by the format of the file, i.e. openpyxl for .xlsx and xlrd for .xls.
+    session : lpmd.utils.session.Session, default None
+        Session keeping connections to e-Stat alive, with timeouts and retries.
+        If None, the session shared in the process is used.
+    callback : callable, default None
+        Hook called with each event of the instrumentation, e.g. to ship the numbers to monitoring.
+        It may be called from the download threads or the thread managing the parsing processes,
+        but never from the parsing processes. Exceptions raised by it propagate to the caller.
+
+    Attributes
+    ----------
+    partition_stats : dict
+        Dict mapping partition_id to the statistics of the last scrape, i.e. ``fetch_seconds``,
+        ``bytes``, ``parse_seconds``, ``cleanse_seconds``, ``rows``, ``write_seconds``
+        (partitioned layout only), ``peak_rss_bytes`` and ``error`` if the url is not effective
+        or the Excel file cannot be parsed.
+    write_seconds : float or None
+        Seconds taken to write the dataset by the last ``out_to_datasets``.
+
+    Notes
+    -----
+    Each stage of the pipeline is timed as a span, and emitted as an event, i.e. a dict with
+
+    - event: "fetch", "parse" (reading the Excel file), "cleanse" (converting the columns
+      and adding the metadata) or "write".
+    - data_id and partition_id (None if the span covers the whole dataset).
+    - seconds taken and peak_rss_bytes, the peak memory of the process which ran the span.
+    - bytes transferred (fetch) or written (write), rows produced, and error if the span failed.
+
+    Events are logged at DEBUG level by the ``lpmd.core.scrape`` logger with the event as
+    ``record.lpmd_event``, recorded in ``partition_stats`` and passed to ``callback``.
 
     """
 
-    def __init__(self, data_id):
+    # Column identifying the partition which each row is scraped from.
+    partition_column = "prefecture"
+
+    def __init__(
+        self,
+        data_id,
+        cache_dir=None,
+        cache_max_bytes=cache.DEFAULT_MAX_BYTES,
+        staging_root=None,
+        excel_engine=None,
+        session=None,
+        callback=None,
+    ):
+        if excel_engine is not None and excel_engine not in EXCEL_ENGINES:
+            msg = "Specified excel_engine must be one of {}.".format(EXCEL_ENGINES)
+            raise ValueError(msg)
+        if excel_engine == "calamine" and not _supports_calamine():
+            msg = "Specified excel_engine calamine requires pandas 2.2 or later."
+            raise ValueError(msg)
+        if excel_engine is None:
+            excel_engine = _default_excel_engine()
+
         self.data_id = data_id
+        self.staging_root = staging_root
+        self.excel_engine = excel_engine
+        self.session = session
+        self.callback = callback
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = cache.DownloadCache(cache_dir, max_bytes=cache_max_bytes)
 
-        # Read yml file on urls
-        data_catalogue = yaml.safe_load(
-            resources.read_text("lpmd", "data_catalogue.yml")
-        )
-        self.data_catalogue = data_catalogue[self.data_id]
+        # data_catalogue.yml はプロセス内で一度だけ解析し, 各インスタンスはその写しを持つ.
+        self.data_catalogue = catalogue.get_catalogue()[self.data_id].to_dict()
         self.columns = self.data_catalogue["columns"]
+        self.pipeline = self.data_catalogue.get("pipeline", dict())
+        self.metadata = self.data_catalogue.get("metadata", dict())
         self.datasets_path = "lpmd/datasets/{data_id}/".format(data_id=self.data_id)
+        self.partition_stats = dict()
+        self.write_seconds = None
+        self._relay = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # callback は pickle できるとは限らず, ワーカーでは使わない.
+        state["callback"] = None
+        return state
+
+    def _replays(self):
+        """Whether the responses are recorded and replayed by ``lpmd.utils.replay.ReplaySession``."""
+        import lpmd.utils.replay as replay
+        import lpmd.utils.session as sess
+
+        session = self.session if self.session is not None else sess.get_session()
+        return isinstance(session, replay.ReplaySession)
+
+    def _span(self, name, partition_id=None):
+        """Time a stage of the pipeline. See Notes of ``BaseScraper``."""
+        return instrument.span(
+            name, self._emit, data_id=self.data_id, partition_id=partition_id
+        )
+
+    def _emit(self, event):
+        """Log the event, record it in ``partition_stats`` and pass it to ``callback``."""
+        if self._relay is not None:
+            self._relay.append(event)
+            return
+
+        partition_id = event.get("partition_id")
+        if partition_id is not None:
+            stats = self.partition_stats.setdefault(partition_id, dict())
+            stats["{}_seconds".format(event["event"])] = event["seconds"]
+            # 書き込みのバイト数と行数は取得と解析のものと区別するため記録しない.
+            if event["event"] != "write":
+                for key in ["bytes", "rows", "error"]:
+                    if key in event:
+                        stats[key] = event[key]
+            if event["peak_rss_bytes"] is not None:
+                stats["peak_rss_bytes"] = max(
+                    stats.get("peak_rss_bytes", 0), event["peak_rss_bytes"]
+                )
+
+        logger.debug(
+            "%s %s/%s: %.3fs",
+            event["event"],
+            event["data_id"],
+            partition_id,
+            event["seconds"],
+            extra={"lpmd_event": event},
+        )
+        if self.callback is not None:
+            self.callback(event)
 
-    def get_scraped_data(self, partition_id):
+    def download(self, partition_id):
         """
-        Get scraped data corresponding to partition_id.
+        Download the raw Excel file corresponding to partition_id.
 
         Parameters
         ----------
@@ -48,30 +285,109 @@ class BaseScraper:
 
         Returns
         -------
-        df_scraped : pandas.core.frame.DataFrame
-            Scraped data that are not cleansed.
+        content : bytes or None
+            Raw bytes of the Excel file. If the url is not effective or the response is not a file, None.
 
         """
         url = self.data_catalogue["partition"][partition_id]
-        columns = self.columns.keys()
 
-        # Check whether url is effective
-        if not check.check_url(url):
-            # ToDo: change logger
-            print("Specified url is not effective.")
-            return None
+        # Download and validate the file in a single request.
+        check.validate_url(url)
+        with self._span("fetch", partition_id) as event:
+            try:
+                content = http.fetch_url(url, cache=self.cache, session=self.session)
+            except (OSError, ValueError) as e:
+                logger.warning("Specified url is not effective: %s (%s)", url, e)
+                event["error"] = str(e)
+                return None
+            event["bytes"] = len(content)
+        return content
+
+    def get_scraped_data(self, partition_id, content=None):
+        """
+        Get scraped data corresponding to partition_id.
+
+        Parameters
+        ----------
+        partition_id : str
+            String expressing which partition data should be scraped in data_catalogue.yml.
+        content : bytes, default None
+            Raw bytes of the Excel file already downloaded by ``download``.
+            If None, the file is downloaded from the url in data_catalogue.yml.
+
+        Returns
+        -------
+        df_scraped : pandas.core.frame.DataFrame or None
+            Scraped data that are cleansed, with the metadata columns.
+            None if the url is not effective or the Excel file cannot be parsed.
+
+        Notes
+        -----
+        The pipeline section of data_catalogue.yml declares
+
+        - header_offset: number of rows between the header row and the data, which are skipped.
+        - required_columns: rows where any of these columns is empty (e.g. footnotes) are dropped.
+
+        and the metadata section declares the columns added to every row, whose ``value`` is
+        "name" of the dataset, "partition_id" or "url" of the partition.
+
+        """
+        import pandas as pd
+
+        if content is None:
+            content = self.download(partition_id)
+            if content is None:
+                return None
+
+        with self._span("parse", partition_id) as event:
+            try:
+                df_scraped = self._read_excel(content)
 
-        # Read and cleanse Excel file on specified url
-        df_scraped = pd.read_excel(url)
-        df_scraped.columns = columns
+                # 必須の列が空の行 (注記など) を除く. 以降の列の変換は同じ DataFrame に代入する.
+                required_columns = self.pipeline.get("required_columns", [])
+                if len(required_columns) > 0:
+                    is_required = (
+                        df_scraped[required_columns].notna().all(axis=1).to_numpy()
+                    )
+                    if not is_required.all():
+                        df_scraped = df_scraped[is_required]
+                        df_scraped.index = pd.RangeIndex(len(df_scraped))
+            except Exception as e:
+                # 壊れたファイルはエンジンによって様々な例外になるため, パーティションの失敗として扱う.
+                logger.warning(
+                    "Specified Excel file cannot be parsed: %s (%s)",
+                    self.data_catalogue["partition"][partition_id],
+                    e,
+                )
+                event["error"] = str(e)
+                return None
+            event["bytes"] = len(content)
 
+        with self._span("cleanse", partition_id) as event:
+            df_scraped = self._cleanse_scraped_data(df_scraped)
+            df_scraped = self._add_metadata(df_scraped, partition_id)
+            event["rows"] = len(df_scraped)
         return df_scraped
 
+    def _read_excel(self, content):
+        """Parse the Excel file, skipping the header junk and the columns not in data_catalogue.yml."""
+        import pandas as pd
+
+        columns = list(self.columns.keys())
+        return pd.read_excel(
+            io.BytesIO(content),
+            engine=self.excel_engine,
+            header=None,
+            names=columns,
+            skiprows=1 + self.pipeline.get("header_offset", 0),
+            usecols=range(len(columns)),
+        )
+
     def _cleanse_scraped_data(self, df_scraped):
         """
         Cleanse scraped data.
 
-        The function is assumed to be added in `get_scraped_data` of the class that inherit from `BaseScraper`.
+        The function is called in `get_scraped_data`, converting the columns by column_type in data_catalogue.yml.
 
         Parameters
         ----------
@@ -84,14 +400,62 @@ class BaseScraper:
             Scraped data that are cleansed.
 
         """
+        import lpmd.utils.format as fmt
+
+        list_qty = []
         for col in df_scraped.columns:
             if col in self.columns.keys():
                 column_type = self.columns[col]["column_type"]
                 if column_type == "str_year":
                     df_scraped[col] = fmt.format_raw_str_year(df_scraped[col])
                 elif column_type == "qty":
-                    df_scraped[col] = fmt.format_raw_qty(df_scraped[col])
-        return df_scraped
+                    list_qty.append(col)
+
+        # 数量の列はまとめて一度に変換する.
+        df_scraped = fmt.format_raw_qty_frame(df_scraped, columns=list_qty)
+        return self._enforce_dtypes(df_scraped)
+
+    def _add_metadata(self, df_scraped, partition_id):
+        """
+        Add the metadata columns declared in metadata section of data_catalogue.yml to scraped data.
+
+        The metadata columns declared as ``category`` are built as categoricals with a single category,
+        so that the long strings such as url are not copied to every row.
+
+        Parameters
+        ----------
+        df_scraped : pandas.core.frame.DataFrame
+            Scraped data that are cleansed.
+        partition_id : str
+            String expressing which partition data is scraped in data_catalogue.yml.
+
+        Returns
+        -------
+        df_scraped : pandas.core.frame.DataFrame
+            Scraped data with the metadata columns.
+
+        """
+        import numpy as np
+        import pandas as pd
+
+        dict_source = {
+            "name": self.data_catalogue.get("name"),
+            "partition_id": partition_id,
+            "url": self.data_catalogue["partition"][partition_id],
+        }
+        codes = np.zeros(len(df_scraped), dtype=np.int8)
+        for col, meta in self.metadata.items():
+            if meta.get("value") not in dict_source:
+                msg = "Specified value of metadata `{}` must be one of {}.".format(
+                    col, list(dict_source)
+                )
+                raise ValueError(msg)
+            value = dict_source[meta["value"]]
+            if meta.get("dtype") == "category":
+                df_scraped[col] = pd.Categorical.from_codes(codes, categories=[value])
+            else:
+                df_scraped[col] = value
+        return self._enforce_dtypes(df_scraped)
 
     def save_scraped_data(self, partition_id, path=None, **kwargs):
         """
@@ -112,7 +476,12 @@ class BaseScraper:
             If scraped data is successfully saved, True. Otherwise, False.
 
         """
-        has_saved = False
+        save_path = self._make_save_path(path)
+        df_scraped = self.get_scraped_data(partition_id)
+        return self._write_scraped_data(df_scraped, partition_id, save_path, **kwargs)
+
+    def _make_save_path(self, path):
+        """Validate path and create the directory where scraped data are saved."""
         if path is None:
             path = "."
         else:
@@ -123,15 +492,388 @@ class BaseScraper:
         # データを取得し保存するディレクトリを作成.
         save_path = os.path.join(path, self.data_id)
         os.makedirs(save_path, exist_ok=True)
+        return save_path
 
-        df_scraped = self.get_scraped_data(partition_id)
+    def _write_scraped_data(self, df_scraped, partition_id, save_path, **kwargs):
+        """Write scraped data as csv and return whether it has been saved."""
+        has_saved = False
         if df_scraped is not None:
             filename = self.data_id + "-" + partition_id + ".csv"
             df_scraped.to_csv(os.path.join(save_path, filename), **kwargs)
             has_saved = True
         return has_saved
 
-    def save_batch(self, path=None, **kwargs):
+    def _iter_scraped_data(
+        self,
+        partition_ids,
+        max_workers=None,
+        max_per_host=4,
+        use_processes=False,
+        parse=True,
+    ):
+        """
+        Scrape partitions concurrently and yield them in completion order.
+
+        Downloads run on a thread pool, bounded per host by ``max_per_host``.
+        Excel parsing runs on a process pool if ``use_processes`` is True,
+        otherwise on the downloading thread. At most ``2 * max_workers`` partitions are
+        scraped ahead of the consumer, so that a slow consumer bounds the memory.
+
+        Parameters
+        ----------
+        partition_ids : list of str
+            Partitions to be scraped.
+        max_workers : int, default None
+            Maximum number of download threads and parsing processes.
+            If None or 1, partitions are scraped one by one in the given order.
+        max_per_host : int, default 4
+            Maximum number of concurrent downloads per host, shared by all scrapers in the process.
+        use_processes : bool, default False
+            Whether Excel files are parsed on a process pool. See ``iter_partitions``.
+        parse : bool, default True
+            If False, the downloaded bytes are yielded without being parsed.
+
+        Yields
+        ------
+        partition_id : str
+            Partition that has been scraped.
+        df_scraped : pandas.core.frame.DataFrame or bytes or None
+            Scraped data, or the raw bytes if ``parse`` is False.
+            None if the url is not effective or the Excel file cannot be parsed.
+
+        """
+        partition_ids = list(partition_ids)
+        if max_workers is None or max_workers <= 1:
+            for partition_id in partition_ids:
+                if parse:
+                    yield partition_id, self.get_scraped_data(partition_id)
+                else:
+                    yield partition_id, self.download(partition_id)
+            return
+
+        results = queue.Queue()
+        fetch_pool = ThreadPoolExecutor(max_workers=max_workers)
+        parse_pool = None
+        if parse and use_processes:
+            parse_pool = _process_pool(max_workers)
+
+        def _fetch(partition_id):
+            with _host_limiter(
+                self.data_catalogue["partition"][partition_id], max_per_host
+            ):
+                content = self.download(partition_id)
+            if parse and parse_pool is None and content is not None:
+                return self.get_scraped_data(partition_id, content=content)
+            return content
+
+        def _on_fetched(partition_id, future):
+            if parse_pool is None or future.exception() is not None:
+                results.put((partition_id, future))
+                return
+            content = future.result()
+            if content is None:
+                future_none = Future()
+                future_none.set_result(None)
+                results.put((partition_id, future_none))
+                return
+            try:
+                future_parsed = parse_pool.submit(
+                    _parse_scraped_data, self, partition_id, content
+                )
+            except RuntimeError as e:
+                # The pool has been shut down because the consumer stopped.
+                future_parsed = Future()
+                future_parsed.set_exception(e)
+                results.put((partition_id, future_parsed))
+                return
+            future_parsed.add_done_callback(lambda f: _on_parsed(partition_id, f))
+
+        def _on_parsed(partition_id, future):
+            # ワーカープロセスで計測されたイベントを出力する.
+            if future.exception() is None:
+                df_scraped, events = future.result()
+                future = Future()
+                try:
+                    for event in events:
+                        self._emit(event)
+                except Exception as e:
+                    # callback の例外は Future に入れて, 利用する側で送出する.
+                    future.set_exception(e)
+                else:
+                    future.set_result(df_scraped)
+            results.put((partition_id, future))
+
+        iter_partition_ids = iter(partition_ids)
+
+        def _submit():
+            partition_id = next(iter_partition_ids, None)
+            if partition_id is None:
+                return
+            future = fetch_pool.submit(_fetch, partition_id)
+            future.add_done_callback(lambda f: _on_fetched(partition_id, f))
+
+        try:
+            # 消費されるのを待たずに取得するパーティションの数を制限する.
+            for _ in range(2 * max_workers):
+                _submit()
+            for _ in range(len(partition_ids)):
+                partition_id, future = results.get()
+                yield partition_id, future.result()
+                _submit()
+        finally:
+            fetch_pool.shutdown(wait=True, cancel_futures=True)
+            if parse_pool is not None:
+                parse_pool.shutdown(wait=True, cancel_futures=True)
+
+    def iter_partitions(
+        self, partition_ids=None, max_workers=None, max_per_host=4, use_processes=False
+    ):
+        """
+        Scrape partitions and yield each of them as soon as it is scraped.
+
+        Unlike ``aggregate``, partitions are not held until all of them are scraped,
+        so that each partition can be written, validated or uploaded immediately
+        and the memory is bounded by a few partitions.
+
+        Parameters
+        ----------
+        partition_ids : list of str, default None
+            Partitions to be scraped. If None, all partitions in data_catalogue.yml.
+        max_workers : int, default None
+            Maximum number of partitions scraped concurrently.
+            If None or 1, partitions are scraped one by one in the order of ``partition_ids``.
+            Otherwise, they are yielded in completion order.
+        max_per_host : int, default 4
+            Maximum number of concurrent downloads per host, shared by all scrapers in the process.
+            Used only if ``max_workers`` > 1.
+        use_processes : bool, default False
+            Whether Excel files are parsed on a process pool. Used only if ``max_workers`` > 1.
+            The workers of the pool are spawned and import the main module again, so that a script
+            using it must guard its entry point with ``if __name__ == "__main__":``.
+
+        Yields
+        ------
+        partition_id : str
+            Partition that has been scraped.
+        df_scraped : pandas.core.frame.DataFrame or None
+            Scraped data. None if the url is not effective or the Excel file cannot be parsed.
+
+        Examples
+        --------
+        >>> scraper = ScraperShipment()
+        >>> for partition_id, df in scraper.iter_partitions(max_workers=4):  # doctest: +SKIP
+        ...     df.to_parquet("{}.parquet".format(partition_id))
+
+        """
+        return self._iter_scraped_data(
+            self._resolve_partition_ids(partition_ids),
+            max_workers=max_workers,
+            max_per_host=max_per_host,
+            use_processes=use_processes,
+        )
+
+    def _resolve_partition_ids(self, partition_ids=None):
+        """Validate partition_ids. If None, all partitions in data_catalogue.yml."""
+        if partition_ids is None:
+            return list(self.data_catalogue["partition"].keys())
+        if isinstance(partition_ids, str):
+            partition_ids = [partition_ids]
+        unknown = [
+            partition_id
+            for partition_id in partition_ids
+            if partition_id not in self.data_catalogue["partition"]
+        ]
+        if len(unknown) > 0:
+            msg = "Specified partition_ids {} are not in data_catalogue.yml.".format(
+                unknown
+            )
+            raise ValueError(msg)
+        return list(partition_ids)
+
+    async def adownload(self, partition_id, session=None):
+        """
+        Download the raw Excel file corresponding to partition_id without blocking the event loop.
+
+        Parameters
+        ----------
+        partition_id : str
+            String expressing which partition data should be scraped in data_catalogue.yml.
+        session : aiohttp.ClientSession, default None
+            Session used for the request. If None, a session is opened for the request,
+            or ``download`` runs on the default executor of the event loop if aiohttp is not installed.
+
+        Returns
+        -------
+        content : bytes or None
+            Raw bytes of the Excel file. If the url is not effective or the response is not a file, None.
+
+        """
+        url = self.data_catalogue["partition"][partition_id]
+        check.validate_url(url)
+        async with _async_session(session, replay=self._replays()) as session:
+            if session is None:
+                # aiohttp がない場合や応答を再生する場合は, 同期版をスレッドで実行する.
+                import asyncio
+
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, self.download, partition_id)
+            with self._span("fetch", partition_id) as event:
+                try:
+                    content = await http.afetch_url(
+                        url, session=session, cache=self.cache
+                    )
+                except (OSError, ValueError) as e:
+                    logger.warning("Specified url is not effective: %s (%s)", url, e)
+                    event["error"] = str(e)
+                    return None
+                event["bytes"] = len(content)
+        return content
+
+    async def aget_scraped_data(
+        self, partition_id, content=None, session=None, executor=None
+    ):
+        """
+        Get scraped data corresponding to partition_id without blocking the event loop.
+
+        The Excel file is downloaded asynchronously, and parsed on ``executor``.
+
+        Parameters
+        ----------
+        partition_id : str
+            String expressing which partition data should be scraped in data_catalogue.yml.
+        content : bytes, default None
+            Raw bytes of the Excel file already downloaded. If None, the file is downloaded.
+        session : aiohttp.ClientSession, default None
+            Session used for the request. See ``adownload``.
+        executor : concurrent.futures.Executor, default None
+            Executor parsing the Excel file, e.g. ``ProcessPoolExecutor``.
+            If None, the default executor of the event loop is used.
+
+        Returns
+        -------
+        df_scraped : pandas.core.frame.DataFrame or None
+            Scraped data. None if the url is not effective or the Excel file cannot be parsed.
+
+        """
+        import asyncio
+
+        if content is None:
+            content = await self.adownload(partition_id, session=session)
+            if content is None:
+                return None
+        loop = asyncio.get_running_loop()
+        df_scraped, events = await loop.run_in_executor(
+            executor, _parse_scraped_data, self, partition_id, content
+        )
+        for event in events:
+            self._emit(event)
+        return df_scraped
+
+    async def aiter_partitions(
+        self, partition_ids=None, max_concurrency=4, session=None, executor=None
+    ):
+        """
+        Scrape partitions concurrently on the event loop and yield them in completion order.
+
+        Downloads share a pooled session whose connections are kept alive, and at most
+        ``max_concurrency`` of them run at the same time. At most ``2 * max_concurrency``
+        partitions are scraped ahead of the consumer.
+
+        Parameters
+        ----------
+        partition_ids : list of str, default None
+            Partitions to be scraped. If None, all partitions in data_catalogue.yml.
+        max_concurrency : int, default 4
+            Maximum number of concurrent downloads.
+        session : aiohttp.ClientSession, default None
+            Session used for the requests. If None, a session is opened while iterating.
+        executor : concurrent.futures.Executor, default None
+            Executor parsing the Excel files. If None, the default executor of the event loop is used.
+
+        Yields
+        ------
+        partition_id : str
+            Partition that has been scraped.
+        df_scraped : pandas.core.frame.DataFrame or None
+            Scraped data. None if the url is not effective or the Excel file cannot be parsed.
+
+        Examples
+        --------
+        >>> async def refresh():  # doctest: +SKIP
+        ...     async for partition_id, df in ScraperShipment().aiter_partitions():
+        ...         await upload(partition_id, df)
+
+        """
+        import asyncio
+
+        iter_partition_ids = iter(self._resolve_partition_ids(partition_ids))
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async with _async_session(
+            session, max_per_host=max_concurrency, replay=self._replays()
+        ) as session:
+
+            async def _scrape(partition_id):
+                async with semaphore:
+                    content = await self.adownload(partition_id, session=session)
+                if content is None:
+                    return partition_id, None
+                df_scraped = await self.aget_scraped_data(
+                    partition_id, content=content, executor=executor
+                )
+                return partition_id, df_scraped
+
+            pending = set()
+
+            def _schedule():
+                partition_id = next(iter_partition_ids, None)
+                if partition_id is not None:
+                    pending.add(asyncio.ensure_future(_scrape(partition_id)))
+
+            for _ in range(2 * max_concurrency):
+                _schedule()
+            try:
+                while len(pending) > 0:
+                    done, _ = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        pending.remove(task)
+                        yield task.result()
+                        _schedule()
+            finally:
+                for task in pending:
+                    task.cancel()
+                if len(pending) > 0:
+                    await asyncio.gather(*pending, return_exceptions=True)
+
+    def _parse_batch(self, dict_content, max_workers=None, use_processes=False):
+        """Parse downloaded Excel files, on a process pool if ``max_workers`` > 1."""
+        partition_ids = list(dict_content.keys())
+        if max_workers is None or max_workers <= 1 or not use_processes:
+            return {
+                partition_id: self.get_scraped_data(
+                    partition_id, content=dict_content[partition_id]
+                )
+                for partition_id in partition_ids
+            }
+        with _process_pool(max_workers) as executor:
+            list_result = executor.map(
+                _parse_scraped_data,
+                [self] * len(partition_ids),
+                partition_ids,
+                [dict_content[partition_id] for partition_id in partition_ids],
+            )
+            dict_scraped = dict()
+            for partition_id, (df_scraped, events) in zip(partition_ids, list_result):
+                for event in events:
+                    self._emit(event)
+                dict_scraped[partition_id] = df_scraped
+            return dict_scraped
+
+    def save_batch(
+        self, path=None, max_workers=None, max_per_host=4, use_processes=False, **kwargs
+    ):
         """
         Save scraped data in batches that are defined in partition section of data_catalogue.yml.
 
@@ -139,6 +881,16 @@ class BaseScraper:
         ----------
         path : str, default None
             Sting expressing the path to save. If None, scraped data is stored at working current directory.
+        max_workers : int, default None
+            Maximum number of partitions scraped concurrently.
+            If None or 1, partitions are scraped one by one.
+        max_per_host : int, default 4
+            Maximum number of concurrent downloads per host, shared by all scrapers in the process.
+            Used only if ``max_workers`` > 1.
+        use_processes : bool, default False
+            Whether Excel files are parsed on a process pool. Used only if ``max_workers`` > 1.
+            The workers of the pool are spawned and import the main module again, so that a script
+            using it must guard its entry point with ``if __name__ == "__main__":``.
         kwargs
             Additional keyword arguments passed to ``pandas.DataFrame.to_csv``.
 
@@ -148,152 +900,656 @@ class BaseScraper:
             Dict expressing whether partition_id in question is successfully saved.
 
         """
-        dict_result = dict()
-        partition_id_list = self.data_catalogue["partition"].keys()
-        for partition_id in partition_id_list:
-            dict_result[partition_id] = self.save_scraped_data(
-                partition_id, path=path, **kwargs
+        partition_id_list = list(self.data_catalogue["partition"].keys())
+        save_path = self._make_save_path(path)
+        # 結果の順序は data_catalogue.yml の順序に合わせる.
+        dict_result = dict.fromkeys(partition_id_list, False)
+        for partition_id, df_scraped in self._iter_scraped_data(
+            partition_id_list,
+            max_workers,
+            max_per_host=max_per_host,
+            use_processes=use_processes,
+        ):
+            dict_result[partition_id] = self._write_scraped_data(
+                df_scraped, partition_id, save_path, **kwargs
             )
         return dict_result
 
-    def aggregate(self):
+    def _catalogue_dtypes(self, columns):
+        """Get dtypes declared in columns and metadata sections of data_catalogue.yml for specified columns."""
+        dict_declared = {**self.columns, **self.metadata}
+        return {
+            col: dict_declared[col]["dtype"]
+            for col in columns
+            if col in dict_declared.keys() and "dtype" in dict_declared[col]
+        }
+
+    def _enforce_dtypes(self, df):
         """
-        Aggregate scraped data that are defined in partition section of data_catalogue.yml into a single data frame.
+        Cast columns to the dtypes declared in data_catalogue.yml.
+
+        Columns already of the declared dtype are not cast, so the function is cheap on typed data.
+
+        Parameters
+        ----------
+        df : pandas.core.frame.DataFrame
+            Scraped data.
 
         Returns
         -------
         df : pandas.core.frame.DataFrame
-            Aggregated data frame.
+            Scraped data whose columns have the declared dtypes.
 
         """
-        path = ".tmp/"
-        self.save_batch(path=path, index=False, sep="\t")
-        ddf = dd.read_csv(f"{path}/{self.data_id}/*.csv", sep="\t")
-        df = ddf.compute()
-        shutil.rmtree(path)
-        return df.reset_index(drop=True)
+        import pandas as pd
 
-    def out_to_datasets(self):
+        dict_cast = dict()
+        for col, dtype in self._catalogue_dtypes(df.columns).items():
+            dtype = pd.api.types.pandas_dtype(dtype)
+            # "category" はカテゴリによらず categorical であればよい.
+            if isinstance(dtype, pd.CategoricalDtype) and dtype.categories is None:
+                is_cast = not isinstance(df[col].dtype, pd.CategoricalDtype)
+            else:
+                is_cast = df[col].dtype != dtype
+            if is_cast:
+                dict_cast[col] = dtype
+        if len(dict_cast) == 0:
+            return df
+        return df.astype(dict_cast)
+
+    def aggregate(self, on_disk=False, **kwargs):
         """
-        Write a DataFrame to the binary parquet format in `lpmd.datasets`.
+        Aggregate scraped data that are defined in partition section of data_catalogue.yml into a single data frame.
+
+        Parameters
+        ----------
+        on_disk : bool, default False
+            If False, scraped data are concatenated in memory.
+            If True, they are staged as csv files and read with ``dask.dataframe``,
+            which is for larger-than-memory runs.
+        kwargs
+            Additional keyword arguments on concurrency passed to ``save_batch``,
+            i.e. ``max_workers``, ``max_per_host`` and ``use_processes``.
+            See ``save_batch`` on the process pool.
 
         Returns
         -------
-        file_path : str
-            The file path to be saved.
+        df : pandas.core.frame.DataFrame
+            Aggregated data frame.
+
+        Raises
+        ------
+        ValueError
+            If no partition data has been scraped.
 
         """
-        file = "{data_id}.parquet.zstd".format(data_id=self.data_id)
-        file_path = os.path.join(self.datasets_path, file)
-        os.makedirs(self.datasets_path, exist_ok=True)
-        df = self.aggregate()
-        df.to_parquet(file_path, compression="zstd")
-        return file_path
+        if on_disk:
+            return self._aggregate_on_disk(**kwargs)
 
+        partition_id_list = list(self.data_catalogue["partition"].keys())
+        dict_scraped, _ = self._scrape_partitions(partition_id_list, **kwargs)
+        return self._concat_scraped_data(dict_scraped)
 
-class ScraperShipment(BaseScraper):
-    """Scraper class for data on livestock products shipment."""
+    def _scrape_partitions(self, partition_ids, **kwargs):
+        """Scrape partitions, returning the scraped data and the partitions whose urls are not effective."""
+        dict_scraped = dict()
+        list_failed = []
+        for partition_id, df_scraped in self._iter_scraped_data(
+            partition_ids, **kwargs
+        ):
+            if df_scraped is None:
+                list_failed.append(partition_id)
+            else:
+                dict_scraped[partition_id] = df_scraped
+        return dict_scraped, list_failed
 
-    _data_id = "shipment"
+    def _read_previous_partitions(self, file_path, partition_ids):
+        """Read the rows of the partitions from the dataset built last time, skipping empty ones."""
+        import pandas as pd
+        import pyarrow.parquet as pq
 
-    def __init__(self):
-        super(ScraperShipment, self).__init__(self._data_id)
+        df_previous = pd.read_parquet(
+            file_path, filters=[(self.partition_column, "in", list(partition_ids))]
+        )
+        if os.path.isdir(file_path):
+            # 分割されたデータセットではパーティション列が末尾になるため, 列の順序を戻す.
+            schema = pq.read_schema(os.path.join(file_path, "_common_metadata"))
+            df_previous = df_previous[schema.names]
+        dict_previous = dict()
+        for partition_id in partition_ids:
+            df_partition = df_previous[
+                df_previous[self.partition_column] == partition_id
+            ]
+            if len(df_partition) > 0:
+                dict_previous[partition_id] = df_partition
+        return dict_previous
+
+    def _concat_scraped_data(self, dict_scraped):
+        """Concatenate scraped data once in the order of data_catalogue.yml."""
+        import pandas as pd
+
+        partition_id_list = list(self.data_catalogue["partition"].keys())
+        list_scraped = [
+            dict_scraped[partition_id]
+            for partition_id in partition_id_list
+            if partition_id in dict_scraped
+        ]
+        if len(list_scraped) == 0:
+            msg = "No partition data has been scraped."
+            raise ValueError(msg)
+
+        # カテゴリの異なる categorical の列は結合すると object になるため, 先にカテゴリを揃える.
+        for col in list_scraped[0].columns:
+            list_dtype = [
+                df[col].dtype if col in df.columns else None for df in list_scraped
+            ]
+            if all(isinstance(dtype, pd.CategoricalDtype) for dtype in list_dtype):
+                categories = pd.Index(
+                    list(
+                        dict.fromkeys(
+                            category
+                            for dtype in list_dtype
+                            for category in dtype.categories
+                        )
+                    )
+                )
+                list_scraped = [
+                    df.assign(**{col: df[col].cat.set_categories(categories)})
+                    for df in list_scraped
+                ]
+        df = pd.concat(list_scraped, ignore_index=True)
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].cat.remove_unused_categories()
+        return self._enforce_dtypes(df)
+
+    def _aggregate_on_disk(self, **kwargs):
+        """Aggregate scraped data through csv files staged on disk."""
+        try:
+            import dask.dataframe as dd
+        except ImportError as e:
+            msg = "dask is required to aggregate on disk. Install it with `pip install lpmd[dask]`."
+            raise ImportError(msg) from e
+
+        # 並行して実行される他の集計と衝突しないよう, 実行ごとに一意なディレクトリを使う.
+        if self.staging_root is not None:
+            os.makedirs(self.staging_root, exist_ok=True)
+        with tempfile.TemporaryDirectory(
+            prefix="lpmd-{data_id}-".format(data_id=self.data_id),
+            dir=self.staging_root,
+        ) as path:
+            dict_result = self.save_batch(path=path, index=False, sep="\t", **kwargs)
+            if not any(dict_result.values()):
+                msg = "No partition data has been scraped."
+                raise ValueError(msg)
+            # csv から型を推論し直さないよう, data_catalogue.yml の型で読み込む.
+            ddf = dd.read_csv(
+                os.path.join(path, self.data_id, "*.csv"),
+                sep="\t",
+                dtype=self._catalogue_dtypes(list(self.columns) + list(self.metadata)),
+            )
+            df = ddf.compute()
+        return self._enforce_dtypes(df.reset_index(drop=True))
 
-    def get_scraped_data(self, partition_id):
+    def _scrape_incremental(self, manifest, partition_ids=None, force=False, **kwargs):
         """
-        Get scraped data corresponding to partition_id for livestock products shipment.
+        Scrape only the partitions whose Excel files have changed since the last build.
 
         Parameters
         ----------
-        partition_id : str
-            String expressing which partition data should be scraped in data_catalogue.yml.
+        manifest : dict
+            Manifest of the dataset built last time.
+        partition_ids : list of str, default None
+            Partitions to be downloaded. The rows of the other partitions are re-used
+            from the last build. If None, all partitions in data_catalogue.yml.
+        force : bool, default False
+            If True, the downloaded partitions are parsed even if their Excel files have not changed.
+        kwargs
+            Additional keyword arguments on concurrency passed to ``save_batch``.
 
         Returns
         -------
-        df_scraped : pandas.core.frame.DataFrame
-            Scraped data that are not cleansed.
+        dict_scraped : dict
+            Dict mapping the changed partition_id to the scraped data.
+        list_unchanged : list of str
+            Partitions whose rows can be re-used from the last build, if any.
+        manifest : dict
+            Manifest of the new build.
 
         """
-        df_scraped = super().get_scraped_data(partition_id)
-        if df_scraped is not None:
-            df_scraped = df_scraped[
-                (df_scraped.index >= 7) & (~df_scraped["year"].isna())
-            ]
-            df_scraped = self._cleanse_scraped_data(df_scraped)
-            df_scraped["data_source"] = self.data_catalogue["name"]
-            df_scraped["prefecture"] = partition_id
-            df_scraped["source_url"] = self.data_catalogue["partition"][partition_id]
-            df_scraped.reset_index(drop=True, inplace=True)
-        return df_scraped
+        max_workers = kwargs.get("max_workers")
+        use_processes = kwargs.get("use_processes", False)
+        partition_id_list = list(self.data_catalogue["partition"].keys())
+        partition_ids = self._resolve_partition_ids(partition_ids)
+        dict_previous = manifest.get("partitions", dict())
 
+        dict_partitions = dict()
+        dict_changed = dict()
+        # 対象外のパーティションは前回のデータを残す.
+        list_unchanged = [
+            partition_id
+            for partition_id in partition_id_list
+            if partition_id not in partition_ids
+        ]
+        for partition_id in list_unchanged:
+            if partition_id in dict_previous:
+                dict_partitions[partition_id] = dict_previous[partition_id]
 
-class ScraperSlaughter(BaseScraper):
-    """Scraper class for data on animals slaughtered and abattoirs."""
+        for partition_id, content in self._iter_scraped_data(
+            partition_ids, parse=False, **kwargs
+        ):
+            url = self.data_catalogue["partition"][partition_id]
+            previous = dict_previous.get(partition_id)
+            if content is None:
+                # 取得できなかったパーティションも前回のデータを残す.
+                list_unchanged.append(partition_id)
+                if previous is not None:
+                    dict_partitions[partition_id] = previous
+                continue
 
-    _data_id = "slaughter"
+            entry = {"url": url, "sha256": hashlib.sha256(content).hexdigest()}
+            meta = None if self.cache is None else self.cache.get(url)
+            if meta is not None:
+                entry["etag"] = meta["etag"]
+                entry["last_modified"] = meta["last_modified"]
+            is_unchanged = previous is not None and all(
+                previous[key] == entry[key] for key in ["url", "sha256"]
+            )
+            if is_unchanged and not force:
+                entry["rows"] = previous.get("rows")
+                list_unchanged.append(partition_id)
+            else:
+                dict_changed[partition_id] = content
+            dict_partitions[partition_id] = entry
 
-    def __init__(self):
-        super(ScraperSlaughter, self).__init__(self._data_id)
+        dict_scraped = dict()
+        dict_parsed = self._parse_batch(
+            dict_changed, max_workers=max_workers, use_processes=use_processes
+        )
+        for partition_id, df_scraped in dict_parsed.items():
+            if df_scraped is None:
+                # 解析できなかったパーティションも前回のデータを残す.
+                list_unchanged.append(partition_id)
+                if partition_id in dict_previous:
+                    dict_partitions[partition_id] = dict_previous[partition_id]
+                else:
+                    del dict_partitions[partition_id]
+                continue
+            dict_partitions[partition_id]["rows"] = len(df_scraped)
+            dict_scraped[partition_id] = df_scraped
+        manifest = {
+            "data_id": self.data_id,
+            "partitions": {
+                partition_id: dict_partitions[partition_id]
+                for partition_id in partition_id_list
+                if partition_id in dict_partitions
+            },
+        }
+        return dict_scraped, list_unchanged, manifest
+
+    def _layout_paths(self):
+        """Paths of the dataset in the single-file layout and in the partitioned layout."""
+        file_path = os.path.join(
+            self.datasets_path, "{data_id}.parquet.zstd".format(data_id=self.data_id)
+        )
+        dir_path = os.path.join(
+            self.datasets_path, "{data_id}.parquet".format(data_id=self.data_id)
+        )
+        return file_path, dir_path
+
+    def _previous_path(self):
+        """Path of the dataset built last time in either layout, or None if it has not been built."""
+        file_path, dir_path = self._layout_paths()
+        if os.path.exists(file_path):
+            return file_path
+        if os.path.isdir(dir_path):
+            return dir_path
+        return None
 
-    def get_scraped_data(self, partition_id):
+    def _remove_layout(self, partitioned):
         """
-        Get scraped data corresponding to partition_id for animals slaughtered and abattoirs.
+        Remove the dataset written in the layout, with its manifest.
 
-        Parameters
-        ----------
-        partition_id : str
-            String expressing which partition data should be scraped in data_catalogue.yml.
+        The loaders prefer the partitioned layout, so that the dataset written in the other layout
+        is removed after each build, and never read instead of the new one.
+        """
+        file_path, dir_path = self._layout_paths()
+        if partitioned:
+            if os.path.isdir(dir_path):
+                shutil.rmtree(dir_path)
+            return
+        manifest_file = "{data_id}.manifest.json".format(data_id=self.data_id)
+        for path in [file_path, os.path.join(self.datasets_path, manifest_file)]:
+            if os.path.exists(path):
+                os.remove(path)
 
-        Returns
-        -------
-        df_scraped : pandas.core.frame.DataFrame
-            Scraped data that are not cleansed.
+    def _read_unpartitioned(self, partition_ids):
+        """Read the rows of the partitions without files in the partitioned layout from the single file."""
+        file_path, dir_path = self._layout_paths()
+        missing = [
+            partition_id
+            for partition_id in partition_ids
+            if not os.path.isdir(
+                os.path.join(
+                    dir_path,
+                    "{col}={val}".format(col=self.partition_column, val=partition_id),
+                )
+            )
+        ]
+        if len(missing) == 0 or not os.path.exists(file_path):
+            return dict()
+        return self._read_previous_partitions(file_path, missing)
+
+    def _write_parquet(self, df, file_path):
+        """Write a DataFrame to parquet with a row group per partition."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # parquet のスキーマは data_catalogue.yml の型に従う.
+        df = self._enforce_dtypes(df)
+        table = pa.Table.from_pandas(df)
+        if self.partition_column in df.columns:
+            sizes = df.groupby(self.partition_column, sort=False).size().tolist()
+        else:
+            sizes = [len(df)]
+        with pq.ParquetWriter(file_path, table.schema, compression="zstd") as writer:
+            offset = 0
+            for size in sizes:
+                writer.write_table(table.slice(offset, size))
+                offset += size
 
+    def _replace_file(self, file_path, write):
+        """Write a file through a temporary file so that readers never see a half-written one."""
+        fd, tmp_file_path = tempfile.mkstemp(
+            prefix=".{file}.".format(file=os.path.basename(file_path)),
+            dir=os.path.dirname(file_path),
+        )
+        os.close(fd)
+        try:
+            write(tmp_file_path)
+            os.replace(tmp_file_path, file_path)
+        finally:
+            if os.path.exists(tmp_file_path):
+                os.remove(tmp_file_path)
+
+    def _read_manifest(self, manifest_path):
+        """Read the manifest of the last build. If it does not exist, empty dict."""
+        if not os.path.exists(manifest_path):
+            return dict()
+        with open(manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest_path, manifest):
+        """Write the manifest of the build."""
+
+        def _write(path):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        self._replace_file(manifest_path, _write)
+
+    def _write_partitioned_datasets(self, dir_path, dict_scraped, partition_ids):
         """
-        df_scraped = super().get_scraped_data(partition_id)
-        if df_scraped is not None:
-            df_scraped = df_scraped[
-                (df_scraped.index >= 7) & (~df_scraped["year"].isna())
-            ]
-            df_scraped = self._cleanse_scraped_data(df_scraped)
-            df_scraped["data_source"] = self.data_catalogue["name"]
-            df_scraped["prefecture"] = partition_id
-            df_scraped["source_url"] = self.data_catalogue["partition"][partition_id]
-            df_scraped.reset_index(drop=True, inplace=True)
-        return df_scraped
+        Write scraped data as hive-partitioned parquet files.
 
+        Parameters
+        ----------
+        dir_path : str
+            Directory of the partitioned dataset.
+        dict_scraped : dict
+            Dict mapping partition_id to the scraped data to be (re-)written.
+        partition_ids : list of str
+            All partitions of the dataset. Directories of the other partitions are removed.
 
-class ScraperCarcass(BaseScraper):
-    """Scraper class for data on carcass."""
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
 
-    _data_id = "carcass"
+        os.makedirs(dir_path, exist_ok=True)
+        for partition_id, df_scraped in dict_scraped.items():
+            with self._span("write", partition_id) as event:
+                df_scraped = self._enforce_dtypes(df_scraped)
+                partition_path = os.path.join(
+                    dir_path,
+                    "{col}={val}".format(col=self.partition_column, val=partition_id),
+                )
+                os.makedirs(partition_path, exist_ok=True)
+                table = pa.Table.from_pandas(
+                    df_scraped.drop(columns=self.partition_column),
+                    preserve_index=False,
+                )
+                file_path = os.path.join(partition_path, "part-0.parquet")
+                self._replace_file(
+                    file_path,
+                    lambda path: pq.write_table(table, path, compression="zstd"),
+                )
+                schema = pa.Table.from_pandas(df_scraped, preserve_index=False).schema
+                event["rows"] = len(df_scraped)
+                event["bytes"] = os.path.getsize(file_path)
 
-    def __init__(self):
-        super(ScraperCarcass, self).__init__(self._data_id)
+        # 列の順序を復元するため, パーティション列を含むスキーマを残す.
+        if len(dict_scraped) > 0:
+            self._replace_file(
+                os.path.join(dir_path, "_common_metadata"),
+                lambda path: pq.write_metadata(schema, path),
+            )
+
+        prefix = "{col}=".format(col=self.partition_column)
+        for name in os.listdir(dir_path):
+            if name.startswith(prefix) and name[len(prefix) :] not in partition_ids:
+                shutil.rmtree(os.path.join(dir_path, name))
 
-    def get_scraped_data(self, partition_id):
+    def out_to_datasets(
+        self, incremental=False, partitioned=False, partition_ids=None, **kwargs
+    ):
         """
-        Get scraped data corresponding to partition_id for carcass.
+        Write a DataFrame to the binary parquet format in `lpmd.datasets`.
 
         Parameters
         ----------
-        partition_id : str
-            String expressing which partition data should be scraped in data_catalogue.yml.
+        incremental : bool, default False
+            If True, only partitions whose Excel files have changed since the last build are parsed,
+            and the rows of the other partitions are re-used from the dataset.
+            The SHA-256 of each Excel file is recorded in the sidecar manifest.
+        partitioned : bool, default False
+            If False, the dataset is written to a single file `{data_id}.parquet.zstd`.
+            If True, it is written to the directory `{data_id}.parquet` partitioned by prefecture
+            in the hive layout, and an incremental build rewrites only the files of changed partitions.
+            The dataset written in the other layout is removed, and its rows are re-used if needed.
+        partition_ids : list of str, default None
+            Partitions to be rebuilt. The rows of the other partitions are re-used from the dataset,
+            so that a few partitions can be refreshed without downloading all of them.
+            If None, all partitions in data_catalogue.yml.
+            In any case, the rows of the partitions whose urls are not effective are re-used
+            from the dataset, so that a transient failure never drops them.
+        kwargs
+            Additional keyword arguments on concurrency passed to ``save_batch``,
+            i.e. ``max_workers``, ``max_per_host`` and ``use_processes``.
+            See ``save_batch`` on the process pool.
 
         Returns
         -------
-        df_scraped : pandas.core.frame.DataFrame
-            Scraped data that are not cleansed.
+        file_path : str
+            The file path to be saved.
 
         """
-        df_scraped = super().get_scraped_data(partition_id)
-        if df_scraped is not None:
-            df_scraped = df_scraped[
-                (df_scraped.index >= 7) & (~df_scraped["year"].isna())
-            ]
-            df_scraped = self._cleanse_scraped_data(df_scraped)
-            df_scraped["data_source"] = self.data_catalogue["name"]
-            df_scraped["prefecture"] = partition_id
-            df_scraped["source_url"] = self.data_catalogue["partition"][partition_id]
-            df_scraped.reset_index(drop=True, inplace=True)
-        return df_scraped
+        os.makedirs(self.datasets_path, exist_ok=True)
+        if partitioned:
+            return self._out_to_partitioned_datasets(
+                incremental=incremental, partition_ids=partition_ids, **kwargs
+            )
+
+        file_path, _ = self._layout_paths()
+        # 分割して作られたデータセットも, 前回のデータとして使う.
+        previous_path = self._previous_path()
+        manifest_file = "{data_id}.manifest.json".format(data_id=self.data_id)
+        manifest_path = os.path.join(self.datasets_path, manifest_file)
+
+        if not incremental and partition_ids is None:
+            partition_id_list = list(self.data_catalogue["partition"].keys())
+            dict_scraped, list_failed = self._scrape_partitions(
+                partition_id_list, **kwargs
+            )
+            if len(dict_scraped) == 0:
+                msg = "No partition data has been scraped."
+                raise ValueError(msg)
+            # 取得できなかったパーティションは, 一時的な失敗で消えないよう前回のデータを残す.
+            if len(list_failed) > 0 and previous_path is not None:
+                dict_scraped.update(
+                    self._read_previous_partitions(previous_path, list_failed)
+                )
+            df = self._concat_scraped_data(dict_scraped)
+            with self._span("write") as event:
+                self._replace_file(
+                    file_path, lambda path: self._write_parquet(df, path)
+                )
+                event["rows"] = len(df)
+                event["bytes"] = os.path.getsize(file_path)
+            self.write_seconds = event["seconds"]
+            # 全件を作り直した場合, 前回の manifest は使えない.
+            if os.path.exists(manifest_path):
+                os.remove(manifest_path)
+            self._remove_layout(partitioned=True)
+            return file_path
+
+        manifest = dict()
+        if os.path.exists(file_path):
+            manifest = self._read_manifest(manifest_path)
+        dict_scraped, list_unchanged, manifest = self._scrape_incremental(
+            manifest, partition_ids=partition_ids, force=not incremental, **kwargs
+        )
+        if len(list_unchanged) > 0 and previous_path is not None:
+            dict_scraped.update(
+                self._read_previous_partitions(previous_path, list_unchanged)
+            )
+        df = self._concat_scraped_data(dict_scraped)
+
+        with self._span("write") as event:
+            self._replace_file(file_path, lambda path: self._write_parquet(df, path))
+            self._write_manifest(manifest_path, manifest)
+            event["rows"] = len(df)
+            event["bytes"] = os.path.getsize(file_path)
+        self.write_seconds = event["seconds"]
+        self._remove_layout(partitioned=True)
+        return file_path
+
+    def _out_to_partitioned_datasets(
+        self, incremental=False, partition_ids=None, **kwargs
+    ):
+        """Write the dataset partitioned by prefecture. See ``out_to_datasets``."""
+        _, dir_path = self._layout_paths()
+        manifest_path = os.path.join(dir_path, "_manifest.json")
+        partition_id_list = list(self.data_catalogue["partition"].keys())
+
+        if incremental or partition_ids is not None:
+            manifest = self._read_manifest(manifest_path)
+            dict_scraped, list_unchanged, manifest = self._scrape_incremental(
+                manifest, partition_ids=partition_ids, force=not incremental, **kwargs
+            )
+            if len(dict_scraped) + len(list_unchanged) == 0:
+                msg = "No partition data has been scraped."
+                raise ValueError(msg)
+            # 単一ファイルで作られたデータセットから, ファイルのないパーティションを補う.
+            dict_scraped.update(self._read_unpartitioned(list_unchanged))
+            # 変更のあったパーティションのファイルのみ書き換える.
+            with self._span("write") as event:
+                self._write_partitioned_datasets(
+                    dir_path, dict_scraped, list(dict_scraped) + list_unchanged
+                )
+                self._write_manifest(manifest_path, manifest)
+                event["rows"] = sum(len(df) for df in dict_scraped.values())
+            self.write_seconds = event["seconds"]
+            self._remove_layout(partitioned=False)
+            return dir_path
+
+        dict_scraped, list_failed = self._scrape_partitions(partition_id_list, **kwargs)
+        if len(dict_scraped) == 0:
+            msg = "No partition data has been scraped."
+            raise ValueError(msg)
+
+        # 一時ディレクトリに書き込んでから置き換える.
+        tmp_dir_path = tempfile.mkdtemp(
+            prefix=".{data_id}.parquet.".format(data_id=self.data_id),
+            dir=self.datasets_path,
+        )
+        old_dir_path = tmp_dir_path + ".old"
+        dict_previous = self._read_unpartitioned(list_failed)
+        with self._span("write") as event:
+            try:
+                self._write_partitioned_datasets(
+                    tmp_dir_path,
+                    {**dict_scraped, **dict_previous},
+                    list(dict_scraped) + list(dict_previous),
+                )
+                # 取得できなかったパーティションは, 前回のファイルを残す.
+                for partition_id in list_failed:
+                    name = "{col}={val}".format(
+                        col=self.partition_column, val=partition_id
+                    )
+                    if os.path.isdir(os.path.join(dir_path, name)):
+                        shutil.copytree(
+                            os.path.join(dir_path, name),
+                            os.path.join(tmp_dir_path, name),
+                        )
+                if os.path.exists(dir_path):
+                    os.rename(dir_path, old_dir_path)
+                os.rename(tmp_dir_path, dir_path)
+            finally:
+                for path in [tmp_dir_path, old_dir_path]:
+                    if os.path.exists(path):
+                        shutil.rmtree(path)
+            event["rows"] = sum(len(df) for df in dict_scraped.values())
+        self.write_seconds = event["seconds"]
+        self._remove_layout(partitioned=False)
+        return dir_path
+
+
+class ScraperShipment(BaseScraper):
+    """
+    Scraper class for data on livestock products shipment.
+
+    Parameters
+    ----------
+    kwargs
+        Additional keyword arguments passed to ``BaseScraper``.
+
+    """
+
+    _data_id = "shipment"
+
+    def __init__(self, **kwargs):
+        super(ScraperShipment, self).__init__(self._data_id, **kwargs)
+
+
+class ScraperSlaughter(BaseScraper):
+    """
+    Scraper class for data on animals slaughtered and abattoirs.
+
+    Parameters
+    ----------
+    kwargs
+        Additional keyword arguments passed to ``BaseScraper``.
+
+    """
+
+    _data_id = "slaughter"
+
+    def __init__(self, **kwargs):
+        super(ScraperSlaughter, self).__init__(self._data_id, **kwargs)
+
+
+class ScraperCarcass(BaseScraper):
+    """
+    Scraper class for data on carcass.
+
+    Parameters
+    ----------
+    kwargs
+        Additional keyword arguments passed to ``BaseScraper``.
+
+    """
+
+    _data_id = "carcass"
+
+    def __init__(self, **kwargs):
+        super(ScraperCarcass, self).__init__(self._data_id, **kwargs)
@@ -1,21 +1,481 @@
+import os
+import threading
+from collections import OrderedDict, namedtuple
 from importlib.resources import files
 
-import pandas as pd
+import lpmd.core.catalogue as catalogue
 
+# pandas and pyarrow are imported where they are used, so that importing this module stays fast.
 
-def _load(data_id):
-    path = files("lpmd").joinpath(f"datasets/{data_id}/{data_id}.parquet.zstd")
-    df = pd.read_parquet(path)
-    return df
+PARTITION_COLUMN = "prefecture"
 
+BACKENDS = ["pandas", "pyarrow", "table", "dataset"]
 
-def load_shipment():
-    return _load("shipment")
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize", "length"])
 
 
-def load_slaughter():
-    return _load("slaughter")
+class _LoaderCache:
+    """
+    Process-wide LRU cache of loaded datasets bounded by memory.
 
+    Parameters
+    ----------
+    maxsize : int
+        Maximum total memory in bytes of the cached DataFrames and Tables.
 
-def load_carcass():
-    return _load("carcass")
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.currsize = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, signature):
+        with self._lock:
+            entry = self._entries.get(key)
+            # ファイルが更新された場合は無効にする.
+            if entry is None or entry[0] != signature:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, signature, df):
+        if hasattr(df, "memory_usage"):
+            nbytes = int(df.memory_usage(deep=True).sum())
+        else:
+            nbytes = df.nbytes
+        with self._lock:
+            self._pop(key)
+            if nbytes > self.maxsize:
+                return
+            self._entries[key] = (signature, df, nbytes)
+            self.currsize += nbytes
+            self._evict()
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.currsize -= entry[2]
+
+    def _evict(self):
+        while self.currsize > self.maxsize:
+            _, (_, _, nbytes) = self._entries.popitem(last=False)
+            self.currsize -= nbytes
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.currsize = 0
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(
+                self.hits, self.misses, self.maxsize, self.currsize, len(self._entries)
+            )
+
+
+_cache = _LoaderCache(maxsize=256 * 1024**2)
+
+
+def cache_info():
+    """
+    Report statistics of the cache of loaded datasets.
+
+    Returns
+    -------
+    info : CacheInfo
+        Named tuple of hits, misses, maxsize (bytes), currsize (bytes) and length (number of entries).
+
+    """
+    return _cache.info()
+
+
+def cache_clear():
+    """Clear the cache of loaded datasets and its statistics."""
+    _cache.clear()
+
+
+def cache_resize(maxsize):
+    """
+    Change the memory cap of the cache of loaded datasets.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum total memory in bytes of the cached DataFrames. Least recently used ones are evicted.
+
+    """
+    _cache.resize(maxsize)
+
+
+def _copy_on_write():
+    import pandas as pd
+
+    # pandas 3.0 以降は常に copy-on-write.
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    try:
+        return pd.get_option("mode.copy_on_write") is True
+    except KeyError:
+        return False
+
+
+def _signature(path):
+    """Signature of the dataset files on mtime and size, which invalidates the cache."""
+    if os.path.isdir(path):
+        signature = []
+        for root, _, names in os.walk(path):
+            for name in sorted(names):
+                stat = os.stat(os.path.join(root, name))
+                signature.append((name, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(signature))
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _datasets_dir():
+    return files("lpmd").joinpath("datasets")
+
+
+def _categorical_columns(data_id):
+    """Columns declared as ``category`` in data_catalogue.yml, which are read as dictionary-encoded."""
+    data_catalogue = catalogue.get_catalogue()
+    if data_id not in data_catalogue:
+        return []
+    return [
+        col
+        for col, dtype in data_catalogue[data_id].dtypes.items()
+        if dtype == "category"
+    ]
+
+
+def _filters(prefectures=None, years=None):
+    filters = []
+    if prefectures is not None:
+        if isinstance(prefectures, str):
+            prefectures = [prefectures]
+        filters.append((PARTITION_COLUMN, "in", list(prefectures)))
+    if years is not None:
+        if isinstance(years, int):
+            years = [years]
+        filters.append(("year", "in", [int(year) for year in years]))
+    return filters if len(filters) > 0 else None
+
+
+def _load(
+    data_id, prefectures=None, years=None, columns=None, cache=True, backend="pandas"
+):
+    """
+    Load dataset, reading only the files, row groups and columns needed.
+
+    The columns declared as ``category`` in data_catalogue.yml (e.g. prefecture) are read as
+    dictionary-encoded arrays, i.e. pandas categoricals, even if they are stored as plain strings.
+
+    Loaded datasets are memoized in a process-wide cache, which is invalidated when the files are updated.
+    A cached DataFrame is returned as a copy-on-write shallow copy if pandas enables copy-on-write,
+    otherwise as a deep copy, so that modifying it never affects the cache.
+
+    Parameters
+    ----------
+    data_id : str
+        String expressing which dataset should be loaded.
+    prefectures : str or list of str, default None
+        Prefectures (partition_id in data_catalogue.yml, e.g. "01.Hokkaido") to be loaded.
+        If None, all prefectures are loaded.
+    years : int or list of int, default None
+        Years to be loaded, e.g. ``range(2000, 2010)``. If None, all years are loaded.
+    columns : list of str, default None
+        Columns to be loaded. If None, all columns are loaded.
+    cache : bool, default True
+        Whether the process-wide cache is used.
+    backend : {"pandas", "pyarrow", "table", "dataset"}, default "pandas"
+        Type of the returned dataset.
+
+        - "pandas": pandas.DataFrame backed by NumPy.
+        - "pyarrow": pandas.DataFrame backed by Arrow (``pandas.ArrowDtype``) without conversion copy.
+        - "table": pyarrow.Table read from memory-mapped files, which is immutable and shared with the cache.
+        - "dataset": pyarrow.dataset.Dataset on memory-mapped files, which is scanned lazily.
+          ``columns`` is not supported; pass it to ``Dataset.to_table`` instead.
+
+    Returns
+    -------
+    df : pandas.core.frame.DataFrame or pyarrow.Table or pyarrow.dataset.Dataset
+        Loaded dataset.
+
+    """
+    if backend not in BACKENDS:
+        msg = "Specified backend must be one of {}.".format(BACKENDS)
+        raise ValueError(msg)
+
+    dir_path = _datasets_dir().joinpath(f"{data_id}/{data_id}.parquet")
+    if dir_path.is_dir():
+        path = str(dir_path)
+    else:
+        path = str(_datasets_dir().joinpath(f"{data_id}/{data_id}.parquet.zstd"))
+    filters = _filters(prefectures=prefectures, years=years)
+    categorical = _categorical_columns(data_id)
+    if backend == "dataset":
+        return _dataset(path, columns, filters, categorical)
+    if not cache:
+        return _read(path, columns, filters, backend, categorical)
+
+    key = (
+        data_id,
+        None if columns is None else tuple(columns),
+        None if filters is None else tuple((c, o, tuple(v)) for c, o, v in filters),
+        backend,
+    )
+    signature = _signature(path)
+    df = _cache.get(key, signature)
+    if df is None:
+        df = _read(path, columns, filters, backend, categorical)
+        _cache.put(key, signature, df)
+    if backend == "table":
+        return df
+    return df.copy(deep=not _copy_on_write())
+
+
+def _partitioning(categorical=None):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    if categorical is not None and PARTITION_COLUMN in categorical:
+        # 辞書はディレクトリ名から作る.
+        return ds.partitioning(
+            pa.schema([(PARTITION_COLUMN, pa.dictionary(pa.int32(), pa.string()))]),
+            flavor="hive",
+            dictionaries="infer",
+        )
+    return ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive")
+
+
+def _read(path, columns, filters, backend="pandas", categorical=None):
+    import pandas as pd
+    import pyarrow.parquet as pq
+
+    # 繰り返しの多い文字列の列は辞書符号化したまま読み込む.
+    read_dictionary = categorical if categorical else None
+
+    if os.path.isdir(path):
+        # prefecture ごとに分割されたデータセットの場合, 必要なファイルのみ読み込む.
+        schema = pq.read_schema(os.path.join(path, "_common_metadata"))
+        table = pq.read_table(
+            path,
+            columns=columns,
+            filters=filters,
+            partitioning=_partitioning(categorical),
+            read_dictionary=read_dictionary,
+            memory_map=True,
+        )
+        names = [name for name in schema.names if name in table.column_names]
+        table = table.select(names)
+    elif backend == "pandas":
+        df = pd.read_parquet(
+            path, columns=columns, filters=filters, read_dictionary=read_dictionary
+        )
+        return df
+    else:
+        table = pq.read_table(
+            path,
+            columns=columns,
+            filters=filters,
+            read_dictionary=read_dictionary,
+            memory_map=True,
+        )
+
+    if backend == "table":
+        return table
+    if backend == "pyarrow":
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    return table.to_pandas()
+
+
+def _dataset(path, columns, filters, categorical=None):
+    import pyarrow.dataset as ds
+    import pyarrow.fs as fs
+    import pyarrow.parquet as pq
+
+    if columns is not None:
+        msg = "Specified columns is not supported with backend `dataset`."
+        raise ValueError(msg)
+    dataset = ds.dataset(
+        path,
+        format=ds.ParquetFileFormat(
+            read_options=ds.ParquetReadOptions(dictionary_columns=categorical or [])
+        ),
+        partitioning=_partitioning(categorical) if os.path.isdir(path) else None,
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+    if filters is not None:
+        dataset = dataset.filter(pq.filters_to_expression(filters))
+    return dataset
+
+
+def load_shipment(
+    prefectures=None, years=None, columns=None, cache=True, backend="pandas"
+):
+    return _load(
+        "shipment",
+        prefectures=prefectures,
+        years=years,
+        columns=columns,
+        cache=cache,
+        backend=backend,
+    )
+
+
+def load_slaughter(
+    prefectures=None, years=None, columns=None, cache=True, backend="pandas"
+):
+    return _load(
+        "slaughter",
+        prefectures=prefectures,
+        years=years,
+        columns=columns,
+        cache=cache,
+        backend=backend,
+    )
+
+
+def load_carcass(
+    prefectures=None, years=None, columns=None, cache=True, backend="pandas"
+):
+    return _load(
+        "carcass",
+        prefectures=prefectures,
+        years=years,
+        columns=columns,
+        cache=cache,
+        backend=backend,
+    )
+
+
+def load_panel(datasets=None, prefectures=None, years=None, columns=None, cache=True):
+    """
+    Load shipment, slaughter and carcass joined on prefecture and year.
+
+    The panel is read from panel/panel.parquet.zstd built with the datasets (see ``lpmd.core.panel``),
+    so that the joins and the sort are not repeated. If the panel has not been built, or has been built
+    from other versions of the datasets, it is built on the fly from the datasets.
+
+    Parameters
+    ----------
+    datasets : list of str, default None
+        Datasets to be loaded, from "shipment", "slaughter" and "carcass". If None, all of them.
+    prefectures : str or list of str, default None
+        Prefectures (partition_id in data_catalogue.yml, e.g. "01.Hokkaido") to be loaded.
+        If None, all prefectures are loaded.
+    years : int or list of int, default None
+        Years to be loaded, e.g. ``range(2000, 2010)``. If None, all years are loaded.
+    columns : list of str, default None
+        Columns to be loaded from each dataset, e.g. ``["pig", "cattle"]``. If None, all columns are loaded.
+    cache : bool, default True
+        Whether the process-wide cache is used.
+
+    Returns
+    -------
+    df : pandas.core.frame.DataFrame
+        Panel indexed by (prefecture, year) and sorted by the index, whose columns are MultiIndex of
+        (data_id, column), e.g. ``df["shipment", "pig"]``. Missing combinations are NaN.
+
+    Examples
+    --------
+    >>> df = load_panel(years=range(2000, 2010), columns=["pig"])  # doctest: +SKIP
+    >>> df.loc["01.Hokkaido"]  # doctest: +SKIP
+
+    """
+    import lpmd.core.panel as panel
+
+    if datasets is None:
+        datasets = list(panel.PANEL_DATA_IDS)
+    unknown = [data_id for data_id in datasets if data_id not in panel.PANEL_DATA_IDS]
+    if len(unknown) > 0:
+        msg = "Specified datasets {} must be one of {}.".format(
+            unknown, panel.PANEL_DATA_IDS
+        )
+        raise ValueError(msg)
+
+    datasets_dir = str(_datasets_dir())
+    filters = _filters(prefectures=prefectures, years=years)
+    if not cache:
+        return _read_panel(datasets_dir, datasets, columns, filters, cache=False)
+
+    key = (
+        "panel",
+        tuple(datasets),
+        None if columns is None else tuple(columns),
+        None if filters is None else tuple((c, o, tuple(v)) for c, o, v in filters),
+    )
+    list_path = [panel.panel_path(datasets_dir)] + [
+        panel.dataset_path(datasets_dir, data_id) for data_id in panel.PANEL_DATA_IDS
+    ]
+    signature = tuple(
+        _signature(path) if os.path.exists(path) else None for path in list_path
+    )
+    df = _cache.get(key, signature)
+    if df is None:
+        df = _read_panel(datasets_dir, datasets, columns, filters, cache=True)
+        _cache.put(key, signature, df)
+    return df.copy(deep=not _copy_on_write())
+
+
+def _read_panel(datasets_dir, datasets, columns, filters, cache=True):
+    import pandas as pd
+
+    import lpmd.core.panel as panel
+
+    dict_columns = {
+        data_id: [
+            col
+            for col in panel.panel_columns(data_id)
+            if columns is None or col in columns
+        ]
+        for data_id in datasets
+    }
+
+    file_path = panel.panel_path(datasets_dir)
+    if os.path.exists(file_path) and panel.read_sources(file_path) == {
+        data_id: panel.fingerprint(panel.dataset_path(datasets_dir, data_id))
+        for data_id in panel.PANEL_DATA_IDS
+    }:
+        df = pd.read_parquet(
+            file_path,
+            columns=[
+                panel.COLUMN_SEPARATOR.join([data_id, col])
+                for data_id, list_col in dict_columns.items()
+                for col in list_col
+            ],
+            filters=filters,
+        )
+        return panel.unflatten_columns(df)
+
+    # 作成済みのパネルがない, または古い場合は, その場で結合する.
+    prefectures, years = None, None
+    for col, _, values in filters or []:
+        if col == PARTITION_COLUMN:
+            prefectures = values
+        else:
+            years = values
+    dict_df = {
+        data_id: _load(
+            data_id,
+            prefectures=prefectures,
+            years=years,
+            columns=panel.PANEL_INDEX + list_col,
+            cache=cache,
+        )
+        for data_id, list_col in dict_columns.items()
+    }
+    return panel.make_panel(dict_df)
@@ -0,0 +1,14 @@
+"""Shared fixtures for lpmd tests."""
+
+import pytest
+
+from lpmd.tests.estat import EStatStandIn
+
+
+@pytest.fixture()
+def estat():
+    """Start the e-Stat stand-in for a test."""
+    stand_in = EStatStandIn()
+    stand_in.start()
+    yield stand_in
+    stand_in.stop()
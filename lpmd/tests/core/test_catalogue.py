@@ -0,0 +1,72 @@
+"""pytest for lpmd.core.catalogue."""
+
+import os
+from importlib.resources import files
+
+import pytest
+import yaml
+
+import lpmd.core.catalogue as catalogue
+
+test_data_id = "shipment"
+test_partition_id = "00.All"
+test_url = "https://www.e-stat.go.jp/stat-search/file-download?statInfId=000032117924&fileKind=0"
+
+
+class TestCatalogue:
+    """pytest for lpmd.core.catalogue."""
+
+    @pytest.fixture()
+    def setup(self):
+        self.raw = yaml.safe_load(
+            files("lpmd").joinpath("data_catalogue.yml").read_text(encoding="utf-8")
+        )
+
+    def test_get_catalogue(self, setup):
+        data_catalogue = catalogue.get_catalogue()
+        assert catalogue.get_catalogue() is data_catalogue
+        assert data_catalogue.to_dict() == self.raw
+        assert data_catalogue.data_ids == list(self.raw)
+        assert test_data_id in data_catalogue
+
+    def test_dataset_catalogue(self, setup):
+        view = catalogue.get_catalogue()[test_data_id]
+        raw = self.raw[test_data_id]
+        assert view.name == raw["name"]
+        assert dict(view.columns) == raw["columns"]
+        assert view.column_names["year"] == "年次"
+        assert view.dtypes["year"] == "int"
+        assert view.dtypes["pig"] == "float"
+        assert dict(view.metadata) == raw["metadata"]
+        assert view.pipeline["header_offset"] == 7
+        assert view.dtypes["prefecture"] == "category"
+        assert view.column_types["year"] == "str_year"
+        assert dict(view.partitions) == raw["partition"]
+        assert view.urls[0] == test_url
+
+        # views cannot be modified, and copies do not affect the catalogue.
+        with pytest.raises(TypeError):
+            view.partitions[test_partition_id] = "http://xxxxxx"
+        copied = view.to_dict()
+        copied["partition"][test_partition_id] = "http://xxxxxx"
+        assert view.partitions[test_partition_id] == test_url
+
+    def test_dataset_catalogue_without_columns(self, setup):
+        data_id = "6.鶏卵流通累年統計"
+        view = catalogue.get_catalogue()[data_id]
+        assert dict(view.columns) == dict()
+        assert dict(view.partitions) == self.raw[data_id]
+
+    def test_load_catalogue_snapshot(self, setup, tmp_path, monkeypatch):
+        snapshot_dir = str(tmp_path / "snapshot")
+        data_catalogue = catalogue.load_catalogue(snapshot_dir=snapshot_dir)
+        snapshot_file = "data_catalogue-{}.pickle".format(data_catalogue.sha256)
+        assert os.listdir(snapshot_dir) == [snapshot_file]
+
+        # snapshot がある場合は yml を解析しない.
+        def _raise(content):
+            raise AssertionError("data_catalogue.yml must not be parsed.")
+
+        monkeypatch.setattr(catalogue, "_parse", _raise)
+        data_catalogue = catalogue.load_catalogue(snapshot_dir=snapshot_dir)
+        assert data_catalogue.to_dict() == self.raw
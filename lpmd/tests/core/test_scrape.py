@@ -1,20 +1,30 @@
 """pytest for lpmd.core.untable.scrape."""
 
+import asyncio
+import json
 import os
 import shutil
-from importlib import resources
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib.resources import files
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 import yaml
 
+import lpmd.core.panel as panel
+import lpmd.core.scrape as scrape
+import lpmd.utils.http as http
 from lpmd.core.scrape import (
     BaseScraper,
     ScraperCarcass,
     ScraperShipment,
     ScraperSlaughter,
 )
+from lpmd.tests.estat import TEST_YEARS, make_workbook, serve_partitions
 
 # -------------------------
 # BaseScraper pytest
@@ -37,7 +47,7 @@ class TestBaseScraper:
         assert self.base.data_id == test_data_id
 
         data_catalogue = yaml.safe_load(
-            resources.read_text("lpmd", "data_catalogue.yml")
+            files("lpmd").joinpath("data_catalogue.yml").read_text(encoding="utf-8")
         )
         assert self.base.data_catalogue == data_catalogue[test_data_id]
         assert self.base.columns == data_catalogue[test_data_id]["columns"]
@@ -46,6 +56,11 @@ class TestBaseScraper:
             data_id=test_data_id
         )
 
+        # 各インスタンスの data_catalogue は他のインスタンスと共有されない.
+        self.base.data_catalogue["partition"][test_partition_id] = test_error_url
+        other = BaseScraper(data_id=test_data_id)
+        assert other.data_catalogue["partition"][test_partition_id] == test_url
+
     def test_get_scraped_data(self, setup):
         df = self.base.get_scraped_data(partition_id=test_partition_id)
         assert len(df) > 0
@@ -84,6 +99,36 @@ class TestBaseScraper:
 
         pd.testing.assert_frame_equal(df_scraped_tgt, df_scraped_exp)
 
+    @pytest.mark.parametrize(
+        "scraper_class", [ScraperShipment, ScraperSlaughter, ScraperCarcass]
+    )
+    def test_get_scraped_data_pipeline(self, estat, scraper_class):
+        # サブクラスは data_catalogue.yml の pipeline を実行するだけである.
+        scraper = scraper_class()
+        base = BaseScraper(data_id=scraper.data_id)
+        partition = serve_partitions(scraper, estat, n_partitions=1)
+        base.data_catalogue["partition"] = partition
+
+        df = base.get_scraped_data(partition_id="00.All")
+        pd.testing.assert_frame_equal(df, scraper.get_scraped_data("00.All"))
+        assert list(df.columns) == list(scraper.columns) + [
+            "data_source",
+            "prefecture",
+            "source_url",
+        ]
+        assert isinstance(df.index, pd.RangeIndex)
+        assert list(df["year"]) == TEST_YEARS
+        assert (df["data_source"] == base.data_catalogue["name"]).all()
+        assert (df["prefecture"] == "00.All").all()
+        assert (df["source_url"] == partition["00.All"]).all()
+
+    def test_raise_get_scraped_data_pipeline(self, setup, estat):
+        serve_partitions(self.base, estat, n_partitions=1)
+        self.base.metadata["prefecture"]["value"] = "prefecture"
+        msg = "Specified value of metadata `prefecture` must be one of"
+        with pytest.raises(ValueError, match=msg):
+            self.base.get_scraped_data(partition_id="00.All")
+
 
 # -------------------------
 # ScraperShipment pytest
@@ -165,10 +210,472 @@ class TestScraperShipment:
         # cleanup
         shutil.rmtree(self.scraper.data_id)
 
+    def test_get_scraped_data_single_request(self, setup, estat):
+        partition = serve_partitions(self.scraper, estat, n_partitions=1)
+        df = self.scraper.get_scraped_data(partition_id="00.All")
+        assert len(df) > 0
+
+        # Excel ファイルは1回のリクエストでのみ取得される.
+        assert estat.count() == 1
+        assert estat.count(path=estat.requests_path(partition["00.All"])) == 1
+
+    @pytest.mark.parametrize("excel_engine", ["openpyxl", "calamine"])
+    def test_get_scraped_data_excel_engine(self, estat, excel_engine):
+        if excel_engine == "calamine":
+            pytest.importorskip("python_calamine")
+        scraper = ScraperShipment(excel_engine=excel_engine)
+        serve_partitions(scraper, estat, n_partitions=1)
+
+        # 見出しの下の不要な行と注記の行は除かれる.
+        df = scraper.get_scraped_data(partition_id="00.All")
+        assert list(df["year"]) == TEST_YEARS
+        assert list(df.columns)[:-3] == list(scraper.columns)
+
+        # どのエンジンでも同じ結果になる.
+        df_openpyxl = ScraperShipment(excel_engine="openpyxl").get_scraped_data(
+            "00.All",
+            content=estat.routes[
+                estat.requests_path(scraper.data_catalogue["partition"]["00.All"])
+            ],
+        )
+        pd.testing.assert_frame_equal(
+            df.drop(columns="source_url"), df_openpyxl.drop(columns="source_url")
+        )
+
+    def test_get_scraped_data_default_excel_engine(self, estat, monkeypatch):
+        """Without python-calamine, the engine is detected by pandas from the file."""
+        import importlib.util
+
+        find_spec = importlib.util.find_spec
+        monkeypatch.setattr(
+            importlib.util,
+            "find_spec",
+            lambda name, *args: (
+                None if name == "python_calamine" else find_spec(name, *args)
+            ),
+        )
+        scraper = ScraperShipment()
+        assert scraper.excel_engine is None
+        serve_partitions(scraper, estat, n_partitions=1)
+        df = scraper.get_scraped_data(partition_id="00.All")
+        assert list(df["year"]) == TEST_YEARS
+
+        # .xls (BIFF) は openpyxl ではなく xlrd で読み込まれる.
+        xlrd = pytest.importorskip("xlrd")
+        content_xls = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + b"\x00" * 504
+        with pytest.raises(xlrd.compdoc.CompDocError):
+            scraper._read_excel(content_xls)
+
+    def test_default_excel_engine_old_pandas(self, monkeypatch):
+        """calamine is not used with pandas older than 2.2, which does not support it."""
+        pytest.importorskip("python_calamine")
+        monkeypatch.setattr(pd, "__version__", "2.1.4")
+        assert ScraperShipment().excel_engine is None
+        monkeypatch.setattr(pd, "__version__", "2.2.0")
+        assert ScraperShipment().excel_engine == "calamine"
+
+    def test_raise_excel_engine(self, monkeypatch):
+        msg = "Specified excel_engine must be one of"
+        with pytest.raises(ValueError, match=msg):
+            ScraperShipment(excel_engine="polars")
+
+        monkeypatch.setattr(pd, "__version__", "2.1.4")
+        msg = "Specified excel_engine calamine requires pandas 2.2 or later."
+        with pytest.raises(ValueError, match=msg):
+            ScraperShipment(excel_engine="calamine")
+
+    def test_get_scraped_data_cache(self, estat, tmp_path):
+        scraper = ScraperShipment(cache_dir=str(tmp_path / "cache"))
+        partition = serve_partitions(scraper, estat, n_partitions=1)
+        path = estat.requests_path(partition["00.All"])
+
+        df = scraper.get_scraped_data(partition_id="00.All")
+        df_cached = scraper.get_scraped_data(partition_id="00.All")
+        pd.testing.assert_frame_equal(df_cached, df)
+
+        # 2回目は 304 Not Modified のみで, ダウンロードしない.
+        assert estat.count(path=path, status=200) == 1
+        assert estat.count(path=path, status=304) == 1
+
+    @pytest.mark.parametrize("use_processes", [False, True])
+    def test_save_batch_concurrent(self, setup, estat, tmp_path, use_processes):
+        partition = serve_partitions(self.scraper, estat, n_partitions=6)
+        estat.delay = 0.05
+        estat.routes.pop(estat.requests_path(partition["03.Iwate"]))
+
+        tgt_dict_result = self.scraper.save_batch(
+            path=str(tmp_path),
+            max_workers=6,
+            max_per_host=2,
+            use_processes=use_processes,
+        )
+
+        # 結果は data_catalogue.yml の順序で返る.
+        assert list(tgt_dict_result) == list(partition)
+        for partition_id, has_saved in tgt_dict_result.items():
+            assert has_saved == (partition_id != "03.Iwate")
+        assert estat.max_in_flight <= 2
+
+        # 逐次実行の結果と一致することを確認.
+        serial_path = tmp_path / "serial"
+        self.scraper.save_batch(path=str(serial_path))
+        for partition_id in partition:
+            file = "{}-{}.csv".format(test_shipment_data_id, partition_id)
+            concurrent_file = tmp_path / test_shipment_data_id / file
+            serial_file = serial_path / test_shipment_data_id / file
+            assert concurrent_file.exists() == serial_file.exists()
+            if serial_file.exists():
+                assert concurrent_file.read_bytes() == serial_file.read_bytes()
+
+    def test_save_batch_max_per_host(self, setup, estat, tmp_path):
+        """The bound per host is shared by the scrapers running concurrently."""
+        list_scraper = [self.scraper, ScraperSlaughter()]
+        for scraper in list_scraper:
+            serve_partitions(scraper, estat, n_partitions=4)
+        estat.delay = 0.05
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [
+                executor.submit(
+                    scraper.save_batch,
+                    path=str(tmp_path),
+                    max_workers=4,
+                    max_per_host=2,
+                )
+                for scraper in list_scraper
+            ]
+            for future in futures:
+                assert all(future.result().values())
+        assert estat.max_in_flight <= 2
+
     def test_aggregate(self, setup):
         df = self.scraper.aggregate()
         assert len(df) > 0
 
+    def test_aggregate_in_memory(self, setup, estat, tmp_path, monkeypatch):
+        partition = serve_partitions(self.scraper, estat, n_partitions=3)
+        monkeypatch.chdir(tmp_path)
+
+        df = self.scraper.aggregate()
+        assert not os.path.exists(".tmp")
+        assert len(df) == 3 * len(TEST_YEARS)
+        assert list(df["prefecture"].unique()) == list(partition)
+        assert isinstance(df.index, pd.RangeIndex)
+        assert pd.api.types.is_integer_dtype(df["year"])
+        assert pd.api.types.is_float_dtype(df["pig"])
+
+        # csv を経由する場合と同じ結果になる.
+        df_on_disk = self.scraper.aggregate(on_disk=True)
+        pd.testing.assert_frame_equal(df, df_on_disk, check_dtype=False)
+
+        df_concurrent = self.scraper.aggregate(max_workers=3, use_processes=False)
+        pd.testing.assert_frame_equal(df, df_concurrent)
+
+    def test_aggregate_on_disk_staging(self, estat, tmp_path):
+        staging_root = tmp_path / "staging"
+        scrapers = [
+            ScraperShipment(staging_root=str(staging_root)),
+            ScraperCarcass(staging_root=str(staging_root)),
+        ]
+        for scraper in scrapers:
+            serve_partitions(scraper, estat, n_partitions=2)
+        estat.delay = 0.05
+
+        # 2つのスクレイパーを同時に実行しても互いのファイルを消さない.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list_df = list(
+                executor.map(lambda scraper: scraper.aggregate(on_disk=True), scrapers)
+            )
+        for scraper, df in zip(scrapers, list_df):
+            assert len(df) == 2 * len(TEST_YEARS)
+            assert list(df.columns)[:-3] == list(scraper.columns)
+        assert os.listdir(staging_root) == []
+
+        # 例外が発生しても staging ディレクトリは削除される.
+        scrapers[0].data_catalogue["partition"] = {"00.All": estat.url("/missing")}
+        with pytest.raises(ValueError):
+            scrapers[0].aggregate(on_disk=True)
+        assert os.listdir(staging_root) == []
+
+    def test_raise_aggregate(self, setup, estat):
+        self.scraper.data_catalogue["partition"] = {"00.All": estat.url("/missing")}
+        msg = "No partition data has been scraped."
+        with pytest.raises(ValueError, match=msg):
+            self.scraper.aggregate()
+
+    def test_iter_partitions(self, setup, estat):
+        partition = serve_partitions(self.scraper, estat, n_partitions=4)
+        estat.routes.pop(estat.requests_path(partition["02.Aomori"]))
+
+        # 逐次実行では指定した順序で返り, 取得できなかったパーティションは None となる.
+        list_result = list(
+            self.scraper.iter_partitions(partition_ids=["03.Iwate", "02.Aomori"])
+        )
+        assert [partition_id for partition_id, _ in list_result] == [
+            "03.Iwate",
+            "02.Aomori",
+        ]
+        assert list(list_result[0][1]["prefecture"].unique()) == ["03.Iwate"]
+        assert list_result[1][1] is None
+
+        # 並行実行では完了した順に返る.
+        estat.path_delays[estat.requests_path(partition["00.All"])] = 0.5
+        list_partition_id = [
+            partition_id
+            for partition_id, _ in self.scraper.iter_partitions(
+                max_workers=4, use_processes=False
+            )
+        ]
+        assert sorted(list_partition_id) == sorted(partition)
+        assert list_partition_id[-1] == "00.All"
+
+    def test_iter_partitions_backpressure(self, setup, estat):
+        serve_partitions(self.scraper, estat, n_partitions=8)
+        iter_partitions = self.scraper.iter_partitions(
+            max_workers=2, use_processes=False
+        )
+
+        # 消費されない間は max_workers の2倍までしか先に取得しない.
+        next(iter_partitions)
+        time.sleep(0.3)
+        assert estat.count() <= 4
+        assert len(list(iter_partitions)) == 7
+        assert estat.count() == 8
+
+    def test_process_pool(self, setup, estat, monkeypatch):
+        """Parsing processes are opted in, and spawned as they start while the download threads run."""
+        serve_partitions(self.scraper, estat, n_partitions=3)
+        list_pool = []
+
+        def _process_pool(max_workers):
+            list_pool.append(process_pool(max_workers))
+            return list_pool[-1]
+
+        process_pool = scrape._process_pool
+        monkeypatch.setattr(scrape, "_process_pool", _process_pool)
+        # 既定では, __main__ を守っていないスクリプトからも使えるようスレッドで解析する.
+        df = self.scraper.aggregate(max_workers=2)
+        assert len(df) == 3 * len(TEST_YEARS)
+        assert len(list_pool) == 0
+
+        df = self.scraper.aggregate(max_workers=2, use_processes=True)
+        assert len(df) == 3 * len(TEST_YEARS)
+        assert len(list_pool) == 1
+        assert list_pool[0]._mp_context.get_start_method() == "spawn"
+
+    @pytest.mark.parametrize("use_processes", [True, False])
+    def test_partition_stats(self, setup, estat, use_processes):
+        partition = serve_partitions(self.scraper, estat, n_partitions=3)
+        estat.routes.pop(estat.requests_path(partition["02.Aomori"]))
+        list(self.scraper.iter_partitions(max_workers=2, use_processes=use_processes))
+
+        # 解析がワーカープロセスで行われても, 統計は呼び出し元に記録される.
+        stats = self.scraper.partition_stats
+        assert sorted(stats) == sorted(partition)
+        for partition_id in ["00.All", "01.Hokkaido"]:
+            assert stats[partition_id]["rows"] == len(TEST_YEARS)
+            assert stats[partition_id]["bytes"] == len(
+                estat.routes[estat.requests_path(partition[partition_id])]
+            )
+            assert stats[partition_id]["fetch_seconds"] >= 0
+            assert stats[partition_id]["parse_seconds"] > 0
+            assert stats[partition_id]["cleanse_seconds"] > 0
+            assert stats[partition_id]["peak_rss_bytes"] > 0
+        assert "rows" not in stats["02.Aomori"]
+        assert "404" in stats["02.Aomori"]["error"]
+
+    def test_instrumentation(self, setup, estat, tmp_path, caplog):
+        partition = serve_partitions(self.scraper, estat, n_partitions=3)
+        estat.routes.pop(estat.requests_path(partition["02.Aomori"]))
+        events = []
+        # pickle できない callback でも, 解析するワーカープロセスのイベントが届く.
+        self.scraper.callback = lambda event: events.append(event)
+        self.scraper.datasets_path = str(tmp_path / self.scraper.data_id)
+        with caplog.at_level("DEBUG", logger="lpmd.core.scrape"):
+            self.scraper.out_to_datasets(max_workers=2)
+
+        dict_names = dict()
+        for event in events:
+            assert event["data_id"] == self.scraper.data_id
+            assert event["seconds"] >= 0
+            dict_names.setdefault(event["partition_id"], []).append(event["event"])
+        for partition_id in ["00.All", "01.Hokkaido"]:
+            assert dict_names[partition_id] == ["fetch", "parse", "cleanse"]
+        assert dict_names["02.Aomori"] == ["fetch"]
+        assert dict_names[None] == ["write"]
+
+        event_write = events[-1]
+        assert event_write["rows"] == 2 * len(TEST_YEARS)
+        assert event_write["bytes"] > 0
+        assert self.scraper.write_seconds == event_write["seconds"]
+        list_fetch = [e for e in events if e["event"] == "fetch" and "error" not in e]
+        assert all(e["bytes"] > 0 for e in list_fetch)
+
+        # イベントは構造化されたログとしても出力され, 失敗は警告となる.
+        list_logged = [r.lpmd_event for r in caplog.records if hasattr(r, "lpmd_event")]
+        assert list_logged == events
+        list_warning = [r for r in caplog.records if r.levelname == "WARNING"]
+        assert len(list_warning) == 1
+        assert partition["02.Aomori"] in list_warning[0].getMessage()
+
+    @pytest.mark.parametrize("use_processes", [True, False])
+    def test_raise_instrumentation(self, setup, estat, tmp_path, use_processes):
+        """Exceptions raised by callback propagate to the caller instead of hanging."""
+        serve_partitions(self.scraper, estat, n_partitions=3)
+
+        def _callback(event):
+            if event["event"] == "parse":
+                raise RuntimeError("callback failed")
+
+        self.scraper.callback = _callback
+        with pytest.raises(RuntimeError, match="callback failed"):
+            self.scraper.save_batch(
+                path=str(tmp_path), max_workers=2, use_processes=use_processes
+            )
+
+    @pytest.mark.parametrize("partitioned", [False, True])
+    def test_out_to_datasets_failed(self, setup, estat, tmp_path, partitioned):
+        """Rows of the partitions which cannot be downloaded are kept on a full build."""
+        partition = serve_partitions(self.scraper, estat, n_partitions=3)
+        self.scraper.datasets_path = str(tmp_path / self.scraper.data_id)
+        path = self.scraper.out_to_datasets(partitioned=partitioned)
+        df_first = pd.read_parquet(path)
+
+        path_failed = estat.requests_path(partition["01.Hokkaido"])
+        estat.routes.pop(path_failed)
+        path_changed = estat.requests_path(partition["02.Aomori"])
+        estat.routes[path_changed] = make_workbook(self.scraper.columns, offset=100)
+        self.scraper.out_to_datasets(partitioned=partitioned)
+        df = pd.read_parquet(path)
+        assert sorted(df["prefecture"].unique()) == sorted(partition)
+        is_failed = df["prefecture"] == "01.Hokkaido"
+        pd.testing.assert_frame_equal(
+            df[is_failed].reset_index(drop=True),
+            df_first[df_first["prefecture"] == "01.Hokkaido"].reset_index(drop=True),
+        )
+        is_changed = df["prefecture"] == "02.Aomori"
+        assert not df[is_changed].equals(df_first[is_changed])
+
+        # 全てのパーティションを取得できない場合は, データセットを書き換えない.
+        estat.routes.clear()
+        with pytest.raises(ValueError, match="No partition data has been scraped."):
+            self.scraper.out_to_datasets(partitioned=partitioned)
+        pd.testing.assert_frame_equal(pd.read_parquet(path), df)
+
+    @pytest.mark.parametrize("incremental", [False, True])
+    def test_out_to_datasets_corrupt(self, setup, estat, tmp_path, incremental):
+        """Rows of the partitions whose Excel files cannot be parsed are kept."""
+        partition = serve_partitions(self.scraper, estat, n_partitions=3)
+        self.scraper.datasets_path = str(tmp_path / self.scraper.data_id)
+        path = self.scraper.out_to_datasets(incremental=incremental)
+        df_first = pd.read_parquet(path)
+
+        estat.routes[estat.requests_path(partition["01.Hokkaido"])] = b"PK\x03\x04"
+        self.scraper.out_to_datasets(incremental=incremental)
+        pd.testing.assert_frame_equal(pd.read_parquet(path), df_first)
+        assert "error" in self.scraper.partition_stats["01.Hokkaido"]
+
+    def test_out_to_datasets_layout(self, setup, estat, tmp_path):
+        """Switching the layout removes the dataset written in the other one."""
+        partition = serve_partitions(self.scraper, estat, n_partitions=3)
+        self.scraper.datasets_path = str(tmp_path / self.scraper.data_id)
+        dir_path = self.scraper.out_to_datasets(partitioned=True)
+
+        path_changed = estat.requests_path(partition["02.Aomori"])
+        estat.routes[path_changed] = make_workbook(self.scraper.columns, offset=100)
+        file_path = self.scraper.out_to_datasets()
+        assert not os.path.exists(dir_path)
+        assert panel.dataset_path(str(tmp_path), self.scraper.data_id) == file_path
+        df_first = pd.read_parquet(file_path)
+
+        # 取得できなかったパーティションは, もう一方の形式のデータから残す.
+        estat.routes.pop(estat.requests_path(partition["01.Hokkaido"]))
+        assert self.scraper.out_to_datasets(partitioned=True) == dir_path
+        assert not os.path.exists(file_path)
+        df = pd.read_parquet(dir_path)
+        df["prefecture"] = df["prefecture"].astype(str)
+        df = df.sort_values(["prefecture", "year"], ignore_index=True)
+        df_first["prefecture"] = df_first["prefecture"].astype(str)
+        df_first = df_first.sort_values(["prefecture", "year"], ignore_index=True)
+        pd.testing.assert_frame_equal(df[df_first.columns], df_first)
+
+        assert self.scraper.out_to_datasets(incremental=True) == file_path
+        assert not os.path.exists(dir_path)
+        df = pd.read_parquet(file_path)
+        assert sorted(df["prefecture"].unique()) == sorted(partition)
+
+    def test_out_to_datasets_partition_ids(self, setup, estat, tmp_path):
+        partition = serve_partitions(self.scraper, estat, n_partitions=3)
+        self.scraper.datasets_path = str(tmp_path / self.scraper.data_id)
+        dir_path = self.scraper.out_to_datasets(partitioned=True)
+        df_first = pd.read_parquet(dir_path)
+
+        # 指定したパーティションのみ作り直し, 他のパーティションのファイルは残す.
+        path = estat.requests_path(partition["02.Aomori"])
+        estat.routes[path] = make_workbook(self.scraper.columns, offset=100)
+        estat.requests.clear()
+        self.scraper.out_to_datasets(partitioned=True, partition_ids=["02.Aomori"])
+        assert [r[1] for r in estat.requests] == [path]
+        df = pd.read_parquet(dir_path)
+        assert sorted(df["prefecture"].unique()) == sorted(partition)
+        is_changed = df["prefecture"] == "02.Aomori"
+        assert len(df) == len(df_first)
+        assert (
+            not df[is_changed]
+            .reset_index(drop=True)
+            .equals(
+                df_first[df_first["prefecture"] == "02.Aomori"].reset_index(drop=True)
+            )
+        )
+        assert self.scraper.partition_stats["02.Aomori"]["write_seconds"] > 0
+        assert self.scraper.write_seconds > 0
+
+    def test_raise_iter_partitions(self, setup):
+        msg = r"Specified partition_ids \['99.Unknown'\] are not in data_catalogue.yml."
+        with pytest.raises(ValueError, match=msg):
+            self.scraper.iter_partitions(partition_ids=["00.All", "99.Unknown"])
+
+    @pytest.mark.parametrize("has_aiohttp", [True, False])
+    def test_aget_scraped_data(self, setup, estat, monkeypatch, has_aiohttp):
+        if has_aiohttp:
+            pytest.importorskip("aiohttp")
+        else:
+            monkeypatch.setattr(http, "_import_aiohttp", lambda: None)
+        serve_partitions(self.scraper, estat, n_partitions=1)
+
+        df = asyncio.run(self.scraper.aget_scraped_data("00.All"))
+        pd.testing.assert_frame_equal(df, self.scraper.get_scraped_data("00.All"))
+
+        self.scraper.data_catalogue["partition"]["00.All"] = estat.url("/missing")
+        assert asyncio.run(self.scraper.aget_scraped_data("00.All")) is None
+
+    @pytest.mark.parametrize("has_aiohttp", [True, False])
+    def test_aiter_partitions(self, setup, estat, monkeypatch, has_aiohttp):
+        if has_aiohttp:
+            pytest.importorskip("aiohttp")
+        else:
+            monkeypatch.setattr(http, "_import_aiohttp", lambda: None)
+        partition = serve_partitions(self.scraper, estat, n_partitions=6)
+        estat.routes.pop(estat.requests_path(partition["03.Iwate"]))
+        estat.delay = 0.1
+
+        async def _collect():
+            return [
+                result
+                async for result in self.scraper.aiter_partitions(max_concurrency=3)
+            ]
+
+        dict_scraped = dict(asyncio.run(_collect()))
+        assert sorted(dict_scraped) == sorted(partition)
+        assert dict_scraped.pop("03.Iwate") is None
+        for partition_id, df_scraped in dict_scraped.items():
+            assert list(df_scraped["prefecture"].unique()) == [partition_id]
+
+        # ダウンロードは max_concurrency までしか同時に行わない.
+        assert 1 < estat.max_in_flight <= 3
+        if has_aiohttp:
+            assert len(estat.connections) <= 3
+
     def test_out_to_datasets(self, setup):
         original_datasets_path = self.scraper.datasets_path
         self.scraper.datasets_path = "lpmd/tests/core/.tmp/{data_id}/".format(
@@ -188,6 +695,82 @@ class TestScraperShipment:
         shutil.rmtree("lpmd/tests/core/.tmp/")
         self.scraper.datasets_path = original_datasets_path
 
+    def test_out_to_datasets_incremental(self, setup, estat, tmp_path, monkeypatch):
+        partition = serve_partitions(self.scraper, estat, n_partitions=3)
+        self.scraper.datasets_path = str(tmp_path / self.scraper.data_id)
+        manifest_path = tmp_path / self.scraper.data_id / "shipment.manifest.json"
+
+        parsed = []
+        get_scraped_data = self.scraper.get_scraped_data
+
+        def _spy(partition_id, content=None):
+            parsed.append(partition_id)
+            return get_scraped_data(partition_id, content=content)
+
+        monkeypatch.setattr(self.scraper, "get_scraped_data", _spy)
+
+        # 初回は全パーティションを解析し, manifest を記録する.
+        file_path = self.scraper.out_to_datasets(incremental=True)
+        df_first = pd.read_parquet(file_path)
+        assert sorted(parsed) == sorted(partition)
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        assert list(manifest["partitions"]) == list(partition)
+        for entry in manifest["partitions"].values():
+            assert entry["rows"] == len(TEST_YEARS)
+
+        # 変更がなければ解析せずに同じデータセットを作る.
+        parsed.clear()
+        self.scraper.out_to_datasets(incremental=True)
+        assert parsed == []
+        pd.testing.assert_frame_equal(pd.read_parquet(file_path), df_first)
+
+        # 変更されたパーティションのみ解析する.
+        path = estat.requests_path(partition["01.Hokkaido"])
+        estat.routes[path] = make_workbook(self.scraper.columns, offset=100)
+        self.scraper.out_to_datasets(incremental=True)
+        assert parsed == ["01.Hokkaido"]
+        df = pd.read_parquet(file_path)
+        assert list(df["prefecture"].unique()) == list(partition)
+        is_changed = df["prefecture"] == "01.Hokkaido"
+        pd.testing.assert_frame_equal(df[~is_changed], df_first[~is_changed])
+        assert not df[is_changed].equals(df_first[is_changed])
+
+        # 1パーティションごとに row group を分けて書き込む.
+        assert pq.ParquetFile(file_path).num_row_groups == 3
+
+        # 全件作り直す場合は manifest を削除する.
+        self.scraper.out_to_datasets()
+        assert not manifest_path.exists()
+
+    def test_catalogue_dtypes(self, setup, estat, tmp_path):
+        serve_partitions(self.scraper, estat, n_partitions=2)
+        self.scraper.datasets_path = str(tmp_path / self.scraper.data_id)
+        self.scraper.columns["year"]["dtype"] = "Int16"
+        self.scraper.columns["pig"]["dtype"] = "float32"
+
+        # 解析した時点で data_catalogue.yml の型になる.
+        df_scraped = self.scraper.get_scraped_data("00.All")
+        assert df_scraped["year"].dtype == "Int16"
+        assert df_scraped["pig"].dtype == "float32"
+        assert df_scraped["cattle"].dtype == "float64"
+        for col in ["data_source", "prefecture", "source_url"]:
+            assert isinstance(df_scraped[col].dtype, pd.CategoricalDtype)
+        # url は行ごとに複製されず, 1つのカテゴリとして持つ.
+        assert list(df_scraped["source_url"].cat.categories) == [
+            self.scraper.data_catalogue["partition"]["00.All"]
+        ]
+
+        # 結合しても, parquet に書き込んでも型は変わらない.
+        df = self.scraper.aggregate()
+        assert list(map(str, df.dtypes)) == list(map(str, df_scraped.dtypes))
+        assert list(df["prefecture"].cat.categories) == ["00.All", "01.Hokkaido"]
+        file_path = self.scraper.out_to_datasets()
+        schema = pq.read_schema(file_path)
+        assert str(schema.field("year").type) == "int16"
+        assert str(schema.field("pig").type) == "float"
+        assert pa.types.is_dictionary(schema.field("prefecture").type)
+        pd.testing.assert_frame_equal(pd.read_parquet(file_path), df)
+
 
 # -------------------------
 # ScraperSlaughter pytest
@@ -0,0 +1,231 @@
+"""Local e-Stat stand-in for lpmd tests.
+
+The e-Stat server is replaced with a local HTTP stand-in serving synthetic
+workbooks laid out like the e-Stat ones, so that the scraping pipeline can be
+tested without network.
+"""
+
+import hashlib
+import io
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+TEST_YEARS = list(range(1985, 2010))
+
+
+def make_workbook(columns, years=None, offset=0):
+    """
+    Make a synthetic e-Stat workbook.
+
+    The first row holds the Japanese column names, followed by 7 junk rows,
+    the data rows and a footnote row whose "年次" is empty.
+
+    Parameters
+    ----------
+    columns : dict
+        Columns section of data_catalogue.yml.
+    years : list of int, default None
+        Years of the data rows. If None, ``TEST_YEARS``.
+    offset : int, default 0
+        Offset added to quantities, which makes workbooks distinguishable.
+
+    Returns
+    -------
+    content : bytes
+        Raw bytes of the xlsx workbook.
+
+    """
+    years = TEST_YEARS if years is None else years
+    names = [v["name"] for v in columns.values()]
+    rows = [["単位：頭"] + [None] * (len(names) - 1) for _ in range(7)]
+    for i, year in enumerate(years):
+        row = ["平.{}({})".format(year - 1988, year)]
+        for j in range(1, len(names)):
+            if (i + j) % 11 == 0:
+                row.append("-")
+            elif (i + j) % 13 == 0:
+                row.append("x")
+            else:
+                row.append(1000 * j + i + offset)
+        rows.append(row)
+    rows.append([None, "注：x は秘匿"] + [None] * (len(names) - 2))
+    buffer = io.BytesIO()
+    pd.DataFrame(rows, columns=names).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+class EStatStandIn:
+    """
+    Local HTTP server standing in for e-Stat.
+
+    Attributes
+    ----------
+    routes : dict
+        Dict mapping path to the response body.
+    redirects : dict
+        Dict mapping path to the location redirected to with 302.
+    failures : dict
+        Dict mapping path to the number of 503 responses before the path is served.
+    requests : list of tuple
+        (method, path, status) of received requests.
+    request_headers : list of http.client.HTTPMessage
+        Headers of received requests, in the order of ``requests``.
+    connections : set of tuple
+        Client addresses of the connections, which tells whether connections are kept alive.
+    max_in_flight : int
+        Maximum number of requests waiting for ``delay`` at the same time.
+    delay : float
+        Seconds to sleep before responding.
+    path_delays : dict
+        Dict mapping path to the seconds to sleep, which overrides ``delay``.
+
+    """
+
+    def __init__(self):
+        self.routes = dict()
+        self.redirects = dict()
+        self.failures = dict()
+        self.requests = []
+        self.request_headers = []
+        self.connections = set()
+        self.delay = 0.0
+        self.path_delays = dict()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return "http://{}:{}".format(host, port)
+
+    def url(self, path):
+        return self.base_url + path
+
+    def requests_path(self, url):
+        return url[len(self.base_url) :]
+
+    def count(self, method=None, path=None, status=None):
+        query = (method, path, status)
+        return len(
+            [
+                r
+                for r in self.requests
+                if all(q is None or q == v for q, v in zip(query, r))
+            ]
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _make_handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # ヘッダーと本体を別々に送るため, Nagle アルゴリズムで応答が遅れないようにする.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _respond(self, send_body):
+                with stand_in._lock:
+                    stand_in.in_flight += 1
+                    stand_in.max_in_flight = max(
+                        stand_in.max_in_flight, stand_in.in_flight
+                    )
+                try:
+                    time.sleep(stand_in.path_delays.get(self.path, stand_in.delay))
+                finally:
+                    with stand_in._lock:
+                        stand_in.in_flight -= 1
+                with stand_in._lock:
+                    is_failure = stand_in.failures.get(self.path, 0) > 0
+                    if is_failure:
+                        stand_in.failures[self.path] -= 1
+                if is_failure:
+                    self._send_head(503, 0)
+                    return
+                if self.path in stand_in.redirects:
+                    self._send_head(302, 0, location=stand_in.redirects[self.path])
+                    return
+                body = stand_in.routes.get(self.path)
+                if body is None:
+                    self._send_head(404, 0)
+                    return
+                etag = '"{}"'.format(hashlib.sha1(body).hexdigest())
+                if self.headers.get("If-None-Match") == etag:
+                    self._send_head(304, None, etag)
+                    return
+                self._send_head(200, len(body), etag)
+                if send_body:
+                    self.wfile.write(body)
+
+            def _send_head(self, status, length, etag=None, location=None):
+                with stand_in._lock:
+                    stand_in.requests.append((self.command, self.path, status))
+                    stand_in.request_headers.append(self.headers)
+                    stand_in.connections.add(self.client_address)
+                self.send_response(status)
+                if status == 200:
+                    self.send_header(
+                        "Content-Type",
+                        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    )
+                    self.send_header("Last-Modified", "Fri, 01 Jul 2022 00:00:00 GMT")
+                if etag is not None:
+                    self.send_header("ETag", etag)
+                if location is not None:
+                    self.send_header("Location", location)
+                if length is not None:
+                    self.send_header("Content-Length", str(length))
+                self.end_headers()
+
+            def do_GET(self):
+                self._respond(send_body=True)
+
+            def do_HEAD(self):
+                self._respond(send_body=False)
+
+        return Handler
+
+
+def serve_partitions(scraper, estat, n_partitions=3):
+    """
+    Point the partitions of scraper to synthetic workbooks served by estat.
+
+    Parameters
+    ----------
+    scraper : lpmd.core.scrape.BaseScraper
+        Scraper whose data_catalogue is rewritten.
+    estat : EStatStandIn
+        The e-Stat stand-in.
+    n_partitions : int, default 3
+        Number of partitions kept in data_catalogue.
+
+    Returns
+    -------
+    partition : dict
+        The new partition section of data_catalogue.
+
+    """
+    partition = dict()
+    for i, partition_id in enumerate(
+        list(scraper.data_catalogue["partition"])[:n_partitions]
+    ):
+        path = "/{}/file-download?statInfId={}&fileKind=0".format(scraper.data_id, i)
+        estat.routes[path] = make_workbook(scraper.columns, offset=i)
+        partition[partition_id] = estat.url(path)
+    scraper.data_catalogue["partition"] = partition
+    return partition
@@ -0,0 +1,195 @@
+"""pytest for lpmd.cli."""
+
+import os
+
+import pandas as pd
+import pytest
+
+import lpmd.cli as cli
+from lpmd.core.scrape import BaseScraper
+from lpmd.tests.estat import TEST_YEARS, make_workbook, serve_partitions
+
+
+class TestCli:
+    """pytest for lpmd.cli."""
+
+    @pytest.fixture()
+    def setup(self, estat, tmp_path, monkeypatch):
+        # 作成されるスクレイパーのパーティションを e-Stat の代わりのサーバーに向ける.
+        self.partitions = dict()
+        init = BaseScraper.__init__
+
+        def _init(scraper, *args, **kwargs):
+            init(scraper, *args, **kwargs)
+            if scraper.data_id in self.partitions:
+                scraper.data_catalogue["partition"] = dict(
+                    self.partitions[scraper.data_id]
+                )
+            else:
+                self.partitions[scraper.data_id] = serve_partitions(
+                    scraper, estat, n_partitions=3
+                )
+
+        monkeypatch.setattr(BaseScraper, "__init__", _init)
+        for scraper_class in cli.SCRAPERS.values():
+            scraper_class()
+        self.estat = estat
+        self.output = str(tmp_path / "datasets")
+
+    def _file_path(self, data_id):
+        return os.path.join(self.output, data_id, "{}.parquet.zstd".format(data_id))
+
+    def test_build(self, setup, capsys):
+        exit_code = cli.main(
+            [
+                "build",
+                "shipment",
+                "slaughter",
+                "--workers",
+                "2",
+                "--output",
+                self.output,
+            ]
+        )
+        assert exit_code == 0
+        for data_id in ["shipment", "slaughter"]:
+            df = pd.read_parquet(self._file_path(data_id))
+            assert list(df["prefecture"].unique()) == list(self.partitions[data_id])
+        assert not os.path.exists(os.path.join(self.output, "carcass"))
+
+        # パーティションごとの所要時間と, データセットごとのスループットを表示する.
+        out = capsys.readouterr().out
+        assert "shipment:" in out and "slaughter:" in out
+        for partition_id in self.partitions["shipment"]:
+            assert partition_id in out
+        assert "{:,} rows".format(2 * 3 * len(TEST_YEARS)) not in out
+        assert "{:,} rows".format(3 * len(TEST_YEARS)) in out
+        assert "rows/s" in out
+        assert "failed" not in out
+
+    def test_build_panel(self, setup, capsys):
+        exit_code = cli.main(["build", "--output", self.output])
+        assert exit_code == 0
+
+        # 全てのデータセットを作成した場合は, 結合したパネルも作成する.
+        file_path = os.path.join(self.output, "panel", "panel.parquet.zstd")
+        assert "panel:" in capsys.readouterr().out
+        df = pd.read_parquet(file_path)
+        assert df.index.names == ["prefecture", "year"]
+        assert len(df) == 3 * len(TEST_YEARS)
+
+    def test_build_failed(self, setup, capsys):
+        path = "/shipment/file-download?statInfId=1&fileKind=0"
+        content = self.estat.routes.pop(path)
+        exit_code = cli.main(["build", "shipment", "--output", self.output])
+        assert exit_code == 1
+
+        # 取得できたパーティションのみでデータセットを作り, 失敗したパーティションを表示する.
+        df = pd.read_parquet(self._file_path("shipment"))
+        assert list(df["prefecture"].unique()) == ["00.All", "02.Aomori"]
+        out = capsys.readouterr().out
+        assert "failed:\n  shipment/01.Hokkaido: " in out
+
+        # 一時的に取得できなかったパーティションは, 前回のデータを残す.
+        self.estat.routes[path] = content
+        assert cli.main(["build", "shipment", "--output", self.output]) == 0
+        df_first = pd.read_parquet(self._file_path("shipment"))
+        del self.estat.routes[path]
+        assert cli.main(["build", "shipment", "--output", self.output]) == 1
+        df = pd.read_parquet(self._file_path("shipment"))
+        pd.testing.assert_frame_equal(df, df_first)
+
+    @pytest.mark.parametrize("workers", ["1", "2"])
+    def test_build_corrupt(self, setup, capsys, workers):
+        assert cli.main(["build", "shipment", "--output", self.output]) == 0
+        df_first = pd.read_parquet(self._file_path("shipment"))
+        capsys.readouterr()
+
+        # 解析できないファイルも, 失敗したパーティションとして前回のデータを残す.
+        path = "/shipment/file-download?statInfId=1&fileKind=0"
+        self.estat.routes[path] = b"PK\x03\x04garbage"
+        exit_code = cli.main(
+            ["build", "shipment", "--workers", workers, "--output", self.output]
+        )
+        assert exit_code == 1
+        out = capsys.readouterr().out
+        assert "failed:\n  shipment/01.Hokkaido: " in out
+        df = pd.read_parquet(self._file_path("shipment"))
+        pd.testing.assert_frame_equal(df, df_first)
+
+    def test_build_only_partitions(self, setup, capsys):
+        cli.main(["build", "shipment", "--output", self.output])
+        df_first = pd.read_parquet(self._file_path("shipment"))
+        self.estat.requests.clear()
+
+        path = "/shipment/file-download?statInfId=1&fileKind=0"
+        self.estat.routes[path] = make_workbook(
+            cli.SCRAPERS["shipment"]().columns, offset=100
+        )
+        exit_code = cli.main(
+            [
+                "build",
+                "shipment",
+                "--only-partitions",
+                "01.Hokkaido",
+                "--output",
+                self.output,
+            ]
+        )
+        assert exit_code == 0
+
+        # 指定したパーティションのみ取得し, 他のパーティションは前回のデータを使う.
+        assert [r[1] for r in self.estat.requests] == [path]
+        df = pd.read_parquet(self._file_path("shipment"))
+        assert list(df["prefecture"].unique()) == list(self.partitions["shipment"])
+        is_changed = df["prefecture"] == "01.Hokkaido"
+        pd.testing.assert_frame_equal(df[~is_changed], df_first[~is_changed])
+        assert not df[is_changed].equals(df_first[is_changed])
+
+    def test_build_replay(self, setup, tmp_path, capsys):
+        archive = str(tmp_path / "estat.zip")
+        args = ["build", "shipment", "--output", self.output, "--replay", archive]
+        assert cli.main(args) == 0
+        df_first = pd.read_parquet(self._file_path("shipment"))
+        n_requests = len(self.estat.requests)
+
+        # 2回目以降は記録された応答から作成し, e-Stat に接続しない.
+        self.estat.routes.clear()
+        assert cli.main(args + ["--replay-mode", "replay"]) == 0
+        assert len(self.estat.requests) == n_requests
+        pd.testing.assert_frame_equal(
+            pd.read_parquet(self._file_path("shipment")), df_first
+        )
+
+    def test_build_dry_run(self, setup, capsys):
+        exit_code = cli.main(["build", "--dry-run", "--output", self.output])
+        assert exit_code == 0
+        assert self.estat.requests == []
+        assert not os.path.exists(self.output)
+
+        out = capsys.readouterr().out
+        for data_id in cli.SCRAPERS:
+            assert (
+                "{}: 3 partitions -> {}".format(data_id, self._file_path(data_id))
+                in out
+            )
+            for url in self.partitions[data_id].values():
+                assert url in out
+        assert (
+            "panel -> {}".format(
+                os.path.join(self.output, "panel", "panel.parquet.zstd")
+            )
+            in out
+        )
+
+    def test_raise_build(self, setup, capsys):
+        with pytest.raises(SystemExit) as e:
+            cli.main(["build", "pork"])
+        assert e.value.code == 2
+        with pytest.raises(SystemExit) as e:
+            cli.main(["build", "--workers", "0"])
+        assert e.value.code == 2
+
+        exit_code = cli.main(["build", "--only-partitions", "99.Unknown", "--dry-run"])
+        assert exit_code == 2
+        assert "['99.Unknown'] are not in data_catalogue.yml" in capsys.readouterr().err
@@ -1,6 +1,14 @@
+import os
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pytest
 
+import lpmd.core.panel as panel
 import lpmd.datasets as dt
+from lpmd.core.scrape import ScraperCarcass, ScraperShipment, ScraperSlaughter
+from lpmd.tests.estat import TEST_YEARS, make_workbook, serve_partitions
 
 
 class TestDatasets:
@@ -55,7 +63,7 @@ class TestDatasets:
             if col == "year":
                 assert pd.api.types.is_integer_dtype(df[col])
             elif col in ["data_source", "prefecture", "source_url"]:
-                assert pd.api.types.is_string_dtype(df[col])
+                assert isinstance(df[col].dtype, pd.CategoricalDtype)
             else:
                 assert pd.api.types.is_float_dtype(df[col])
 
@@ -116,7 +124,7 @@ class TestDatasets:
             if col == "year":
                 assert pd.api.types.is_integer_dtype(df[col])
             elif col in ["data_source", "prefecture", "source_url"]:
-                assert pd.api.types.is_string_dtype(df[col])
+                assert isinstance(df[col].dtype, pd.CategoricalDtype)
             else:
                 assert pd.api.types.is_float_dtype(df[col])
 
@@ -177,6 +185,252 @@ class TestDatasets:
             if col == "year":
                 assert pd.api.types.is_integer_dtype(df[col])
             elif col in ["data_source", "prefecture", "source_url"]:
-                assert pd.api.types.is_string_dtype(df[col])
+                assert isinstance(df[col].dtype, pd.CategoricalDtype)
             else:
                 assert pd.api.types.is_float_dtype(df[col])
+
+    @pytest.mark.parametrize("data_id", ["shipment", "slaughter", "carcass"])
+    def test__load_filters(self, data_id):
+        """Unit test for lpmd.datasets._load() with filters."""
+        df_all = dt._load(data_id=data_id)
+        prefectures = ["01.Hokkaido", "13.Tokyo"]
+        years = range(2000, 2005)
+        columns = ["year", "pig", "prefecture"]
+
+        df = dt._load(
+            data_id=data_id, prefectures=prefectures, years=years, columns=columns
+        )
+        df_exp = df_all.loc[
+            df_all["prefecture"].isin(prefectures) & df_all["year"].isin(years),
+            columns,
+        ].reset_index(drop=True)
+        pd.testing.assert_frame_equal(df, df_exp)
+
+        df = dt._load(data_id=data_id, prefectures="13.Tokyo", years=2000)
+        assert len(df) == 1
+        assert list(df.columns) == list(df_all.columns)
+
+    def test__load_partitioned(self, estat, tmp_path, monkeypatch):
+        """Unit test for lpmd.datasets._load() on the dataset partitioned by prefecture."""
+        scraper = ScraperShipment()
+        partition = serve_partitions(scraper, estat, n_partitions=3)
+        scraper.datasets_path = str(tmp_path / scraper.data_id)
+        dir_path = scraper.out_to_datasets(partitioned=True)
+        assert sorted(os.listdir(dir_path)) == ["_common_metadata"] + [
+            "prefecture={}".format(partition_id) for partition_id in partition
+        ]
+        monkeypatch.setattr(dt, "_datasets_dir", lambda: tmp_path)
+
+        df = dt.load_shipment()
+        df_exp = scraper.aggregate()
+        pd.testing.assert_frame_equal(df, df_exp, check_dtype=False)
+        # パーティション列も categorical として読み込まれる.
+        assert isinstance(df["prefecture"].dtype, pd.CategoricalDtype)
+
+        df = dt.load_shipment(prefectures="01.Hokkaido", years=[2000, 2001])
+        assert list(df["prefecture"]) == ["01.Hokkaido"] * 2
+        assert list(df["year"]) == [2000, 2001]
+
+        df = dt.load_shipment(columns=["pig", "year"])
+        assert list(df.columns) == ["year", "pig"]
+
+    def test__load_partitioned_incremental(self, estat, tmp_path):
+        """Incremental build of the dataset partitioned by prefecture."""
+        scraper = ScraperShipment()
+        partition = serve_partitions(scraper, estat, n_partitions=3)
+        scraper.datasets_path = str(tmp_path / scraper.data_id)
+        dir_path = scraper.out_to_datasets(incremental=True, partitioned=True)
+
+        def _mtimes():
+            return {
+                partition_id: os.stat(
+                    os.path.join(
+                        dir_path, f"prefecture={partition_id}", "part-0.parquet"
+                    )
+                ).st_mtime_ns
+                for partition_id in partition
+            }
+
+        mtimes = _mtimes()
+        path = estat.requests_path(partition["02.Aomori"])
+        estat.routes[path] = make_workbook(scraper.columns, offset=100)
+        scraper.out_to_datasets(incremental=True, partitioned=True)
+
+        # 変更されたパーティションのファイルのみ書き換えられる.
+        mtimes_new = _mtimes()
+        for partition_id in partition:
+            assert (mtimes_new[partition_id] != mtimes[partition_id]) == (
+                partition_id == "02.Aomori"
+            )
+
+    def test__load_cache(self):
+        """Unit test for the cache of lpmd.datasets._load()."""
+        dt.cache_clear()
+        df = dt.load_shipment()
+        info = dt.cache_info()
+        assert (info.hits, info.misses, info.length) == (0, 1, 1)
+        assert info.currsize > 0
+
+        df_cached = dt.load_shipment()
+        assert dt.cache_info().hits == 1
+        pd.testing.assert_frame_equal(df_cached, df)
+
+        # 返された DataFrame を変更してもキャッシュには影響しない.
+        df_cached.loc[0, "pig"] = -1.0
+        df_cached["added"] = 1
+        pd.testing.assert_frame_equal(dt.load_shipment(), df)
+
+        # 列やフィルタが異なる場合は別のエントリになる.
+        dt.load_shipment(columns=["year", "pig"])
+        assert dt.cache_info().length == 2
+
+        # cache=False の場合は使わない.
+        dt.load_shipment(cache=False)
+        assert dt.cache_info().hits == 2
+
+        # メモリの上限を超えると古いものから削除される.
+        dt.cache_resize(dt.cache_info().currsize - 1)
+        assert dt.cache_info().length == 1
+        dt.cache_resize(256 * 1024**2)
+
+        dt.cache_clear()
+        assert dt.cache_info() == dt.CacheInfo(0, 0, 256 * 1024**2, 0, 0)
+
+    def test__load_cache_invalidate(self, estat, tmp_path, monkeypatch):
+        """The cache of lpmd.datasets._load() is invalidated when the file is updated."""
+        scraper = ScraperShipment()
+        partition = serve_partitions(scraper, estat, n_partitions=2)
+        scraper.datasets_path = str(tmp_path / scraper.data_id)
+        monkeypatch.setattr(dt, "_datasets_dir", lambda: tmp_path)
+        dt.cache_clear()
+
+        scraper.out_to_datasets()
+        assert len(dt.load_shipment()) == 2 * len(TEST_YEARS)
+        assert len(dt.load_shipment()) == 2 * len(TEST_YEARS)
+        assert dt.cache_info().hits == 1
+
+        scraper.data_catalogue["partition"] = {"00.All": partition["00.All"]}
+        scraper.out_to_datasets()
+        assert len(dt.load_shipment()) == len(TEST_YEARS)
+        assert dt.cache_info().hits == 1
+        dt.cache_clear()
+
+    @pytest.mark.parametrize("cache", [True, False])
+    def test__load_backend(self, cache):
+        """Unit test for lpmd.datasets._load() on backend."""
+        df = dt.load_carcass(cache=cache)
+        kwargs = dict(prefectures="13.Tokyo", years=range(2000, 2005))
+
+        table = dt.load_carcass(backend="table", cache=cache)
+        assert isinstance(table, pa.Table)
+        assert pa.types.is_dictionary(table.schema.field("source_url").type)
+        pd.testing.assert_frame_equal(table.to_pandas(), df)
+
+        df_arrow = dt.load_carcass(backend="pyarrow", cache=cache)
+        assert all(isinstance(dtype, pd.ArrowDtype) for dtype in df_arrow.dtypes)
+        assert df_arrow.shape == df.shape
+        assert df_arrow.iloc[0, 1] == df.iloc[0, 1]
+
+        dataset = dt.load_carcass(backend="dataset", **kwargs)
+        assert isinstance(dataset, ds.Dataset)
+        pd.testing.assert_frame_equal(
+            dataset.to_table().to_pandas(), dt.load_carcass(**kwargs)
+        )
+
+    def test_raise__load_backend(self):
+        """Raise test for lpmd.datasets._load() on backend."""
+        msg = "Specified backend must be one of"
+        with pytest.raises(ValueError, match=msg):
+            dt.load_shipment(backend="polars")
+
+        msg = "Specified columns is not supported with backend `dataset`."
+        with pytest.raises(ValueError, match=msg):
+            dt.load_shipment(backend="dataset", columns=["year"])
+
+    def test_load_panel(self):
+        """Unit test for lpmd.datasets.load_panel()."""
+        df = dt.load_panel(cache=False)
+        assert df.index.names == ["prefecture", "year"]
+        assert df.index.is_monotonic_increasing and df.index.is_unique
+        assert list(df.columns.names) == ["data_id", "column"]
+        assert list(df.columns.get_level_values("data_id").unique()) == [
+            "shipment",
+            "slaughter",
+            "carcass",
+        ]
+
+        # 各データセットの値と一致し, 存在しない組み合わせは欠損値となる.
+        df_shipment = dt.load_shipment().astype({"prefecture": str})
+        df_shipment = df_shipment.set_index(["prefecture", "year"])
+        assert len(df) == len(dt.load_slaughter())
+        pd.testing.assert_series_equal(
+            df["shipment", "pig"].loc[df_shipment.index],
+            df_shipment["pig"],
+            check_names=False,
+        )
+        assert df["shipment", "pig"].isna().sum() == len(df) - len(df_shipment)
+        assert ("shipment", "source_url") not in df.columns
+
+    def test_load_panel_filters(self, monkeypatch):
+        """The panel is read from the artifact, and built on the fly if it does not exist."""
+        kwargs = dict(
+            datasets=["carcass", "shipment"],
+            prefectures=["13.Tokyo", "01.Hokkaido"],
+            years=range(2000, 2005),
+            columns=["pig", "carcass"],
+            cache=False,
+        )
+        df = dt.load_panel(**kwargs)
+        assert df.shape == (10, 3)
+        # 列は指定したデータセットの順に並ぶ.
+        assert list(df.columns) == [
+            ("carcass", "pig"),
+            ("carcass", "carcass"),
+            ("shipment", "pig"),
+        ]
+        assert df.index.get_level_values("prefecture").unique().tolist() == [
+            "01.Hokkaido",
+            "13.Tokyo",
+        ]
+
+        monkeypatch.setattr(panel, "panel_path", lambda _: "not_exists")
+        df_on_the_fly = dt.load_panel(**kwargs)
+        pd.testing.assert_frame_equal(df_on_the_fly, df)
+
+    def test_load_panel_stale(self, estat, tmp_path, monkeypatch):
+        """The panel built from other versions of the datasets is not used."""
+        monkeypatch.setattr(dt, "_datasets_dir", lambda: tmp_path)
+        dt.cache_clear()
+        list_scraper = [
+            ScraperShipment(),
+            ScraperSlaughter(),
+            ScraperCarcass(),
+        ]
+        for scraper in list_scraper:
+            serve_partitions(scraper, estat, n_partitions=2)
+            scraper.datasets_path = str(tmp_path / scraper.data_id)
+            scraper.out_to_datasets(partitioned=scraper.data_id == "carcass")
+        file_path = panel.out_to_panel(str(tmp_path))
+        assert file_path == str(tmp_path / "panel" / "panel.parquet.zstd")
+        df = dt.load_panel()
+        assert len(df) == 2 * len(TEST_YEARS)
+        assert dt.load_panel().equals(df)
+        assert dt.cache_info().hits == 1
+
+        scraper = list_scraper[0]
+        scraper.data_catalogue["partition"] = {
+            "00.All": scraper.data_catalogue["partition"]["00.All"]
+        }
+        scraper.out_to_datasets()
+        df = dt.load_panel()
+        assert df.loc["01.Hokkaido", ("shipment", "pig")].isna().all()
+        assert df.loc["01.Hokkaido", ("slaughter", "pig")].notna().any()
+        pd.testing.assert_frame_equal(df, dt.load_panel(cache=False))
+        dt.cache_clear()
+
+    def test_raise_load_panel(self, tmp_path):
+        """Raise test for lpmd.datasets.load_panel()."""
+        with pytest.raises(ValueError, match="Specified datasets"):
+            dt.load_panel(datasets=["pork"])
+        with pytest.raises(FileNotFoundError, match="have not been built"):
+            panel.out_to_panel(str(tmp_path))
@@ -0,0 +1,38 @@
+"""pytest for the import time of lpmd."""
+
+import subprocess
+import sys
+
+import pytest
+
+# 重い依存パッケージは使われるまで import しない.
+HEAVY_MODULES = ["dask", "pandas", "pyarrow", "yaml"]
+
+# Upper limit of the import time in seconds, which is generous for slow CI runners.
+IMPORT_TIME_LIMIT = 0.5
+
+
+def _import(module):
+    """Import module in a fresh interpreter and return the import time and heavy modules loaded."""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import {module}\n"
+        "elapsed = time.perf_counter() - start\n"
+        "print(elapsed)\n"
+        "print(','.join(m for m in {heavy} if m in sys.modules))\n"
+    ).format(module=module, heavy=HEAVY_MODULES)
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout.splitlines()
+    return float(output[0]), [m for m in output[1].split(",") if m]
+
+
+class TestImport:
+    """pytest for the import time of lpmd."""
+
+    @pytest.mark.parametrize("module", ["lpmd", "lpmd.datasets", "lpmd.core.scrape"])
+    def test_import(self, module):
+        elapsed, loaded = _import(module)
+        assert loaded == []
+        assert elapsed < IMPORT_TIME_LIMIT
@@ -0,0 +1,80 @@
+"""pytest for lpmd.utils.cache."""
+
+import os
+import time
+
+import pytest
+
+import lpmd.utils.cache as cache
+import lpmd.utils.http as http
+
+test_url = "https://www.e-stat.go.jp/stat-search/file-download?statInfId=000032117924&fileKind=0"
+
+
+class TestDownloadCache:
+    """pytest for lpmd.utils.cache.DownloadCache."""
+
+    @pytest.fixture()
+    def setup(self, tmp_path):
+        self.cache = cache.DownloadCache(str(tmp_path / "cache"), max_bytes=100)
+
+    def test_put_and_read(self, setup):
+        assert self.cache.get(test_url) is None
+        assert self.cache.read(test_url) is None
+        assert self.cache.conditional_headers(test_url) == dict()
+
+        self.cache.put(test_url, b"content", etag='"abc"', last_modified="Fri")
+        assert self.cache.read(test_url) == b"content"
+        assert self.cache.get(test_url) == {
+            "url": test_url,
+            "etag": '"abc"',
+            "last_modified": "Fri",
+            "size": 7,
+        }
+        assert self.cache.conditional_headers(test_url) == {
+            "If-None-Match": '"abc"',
+            "If-Modified-Since": "Fri",
+        }
+
+        self.cache.clear()
+        assert self.cache.get(test_url) is None
+
+    def test_evict(self, setup):
+        for i in range(3):
+            self.cache.put(test_url + str(i), b"x" * 40)
+            # LRU の順序を mtime で判定するため時刻をずらす.
+            past = time.time() - 10 + i
+            os.utime(self.cache._path(test_url + str(i), ".bin"), (past, past))
+
+        # 最も古いエントリが削除される.
+        assert self.cache.get(test_url + "0") is None
+        assert self.cache.get(test_url + "1") is not None
+        assert self.cache.get(test_url + "2") is not None
+
+        # 読み込まれたエントリは最近使われたものとして残る.
+        assert self.cache.read(test_url + "1") == b"x" * 40
+        self.cache.put(test_url + "3", b"x" * 40)
+        assert self.cache.get(test_url + "1") is not None
+        assert self.cache.get(test_url + "2") is None
+        assert self.cache.get(test_url + "3") is not None
+
+    def test_raise_init(self):
+        msg = "Specified cache_dir must be str."
+        with pytest.raises(TypeError, match=msg):
+            cache.DownloadCache(1234567890)
+
+    def test_fetch_url_conditional_request(self, setup, estat):
+        self.cache.max_bytes = cache.DEFAULT_MAX_BYTES
+        estat.routes["/file"] = b"content"
+        url = estat.url("/file")
+
+        assert http.fetch_url(url, cache=self.cache) == b"content"
+        assert http.fetch_url(url, cache=self.cache) == b"content"
+        assert estat.count(status=200) == 1
+        assert estat.count(status=304) == 1
+
+        # ファイルが更新された場合は取得し直す.
+        estat.routes["/file"] = b"updated"
+        assert http.fetch_url(url, cache=self.cache) == b"updated"
+        assert estat.count(status=200) == 2
+        assert self.cache.read(url) == b"updated"
@@ -37,3 +37,18 @@ class TestCheck:
         msg = "Specified url must start with `http://` or `https://`."
         with pytest.raises(ValueError, match=msg):
             check.check_url(test_url["raise_protocol"])
+
+    @pytest.mark.parametrize("method", ["HEAD", "GET"])
+    def test_check_url_method(self, estat, method):
+        """Unit test for check_url on the request method."""
+        estat.routes["/file"] = b"content"
+        assert check.check_url(estat.url("/file"), method=method)
+        assert not check.check_url(estat.url("/missing"), method=method)
+        assert estat.count(method=method) == 2
+        assert estat.count(method="HEAD" if method == "GET" else "GET") == 0
+
+    def test_raise_method_check_url(self):
+        """Raise test for check_url on whether specified method is HEAD or GET."""
+        msg = "Specified method must be `HEAD` or `GET`."
+        with pytest.raises(ValueError, match=msg):
+            check.check_url(test_url["effective"], method="POST")
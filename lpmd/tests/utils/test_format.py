@@ -90,6 +90,31 @@ class TestFormat:
         tgt_year_series = fmt.format_raw_str_year(test_year_series)
         pd.testing.assert_series_equal(tgt_year_series, exp_year_series)
 
+    @pytest.mark.parametrize(
+        "label, exp",
+        [
+            ("昭和35年(1960)", 1960),
+            ("昭和35年（1960）", 1960),
+            ("昭和35年", 1960),
+            ("平.元", 1989),
+            ("平成元年", 1989),
+            ("令.３", 2021),
+            ("大正15年", 1926),
+            ("2020", 2020),
+            (2020, 2020),
+        ],
+    )
+    def test_format_raw_str_year_label(self, label, exp):
+        """Unit test for format_raw_year on each label, including those without the Western year."""
+        tgt_year_series = fmt.format_raw_str_year(pd.Series([label, label]))
+        pd.testing.assert_series_equal(tgt_year_series, pd.Series([exp, exp]))
+
+    def test_raise_format_raw_year_label(self):
+        """Raise test for format_raw_year on the label that cannot be formatted."""
+        msg = "Specified label `注` cannot be formatted into year."
+        with pytest.raises(ValueError, match=msg):
+            fmt.format_raw_str_year(pd.Series(["平.13(2001)", "注"]))
+
     def test_raise_format_raw_year(self):
         """Raise test for format_raw_year."""
         msg = "Specified series must be `pandas.core.series.Series`."
@@ -106,3 +131,46 @@ class TestFormat:
         msg = "Specified series must be `pandas.core.series.Series`."
         with pytest.raises(TypeError, match=msg):
             fmt.format_raw_qty(test_qty_list)
+
+    def test_format_raw_qty_normalize(self):
+        """Unit test for format_raw_qty on full-width digits and thousands separators."""
+        tgt_qty_series = fmt.format_raw_qty(
+            pd.Series(["１２３４５", "12,345", " 1,234.5 ", "－", 678, None])
+        )
+        exp = pd.Series([12345.0, 12345.0, 1234.5, np.nan, 678.0, np.nan])
+        pd.testing.assert_series_equal(tgt_qty_series, exp)
+
+        # 数値の列はそのまま float に変換する.
+        tgt_qty_series = fmt.format_raw_qty(pd.Series([1, 2, 3]))
+        pd.testing.assert_series_equal(tgt_qty_series, pd.Series([1.0, 2.0, 3.0]))
+
+    def test_format_raw_qty_frame(self):
+        """Unit test for format_raw_qty_frame."""
+        df = pd.DataFrame(
+            {
+                "year": ["平.13(2001)", "平.14(2002)"],
+                "pig": ["…", "１２,３４５"],
+                "cattle": [35660, "x"],
+            }
+        )
+        tgt = fmt.format_raw_qty_frame(df, columns=["pig", "cattle"])
+        exp = pd.DataFrame(
+            {
+                "year": ["平.13(2001)", "平.14(2002)"],
+                "pig": [np.nan, 12345.0],
+                "cattle": [35660.0, np.nan],
+            }
+        )
+        pd.testing.assert_frame_equal(tgt, exp)
+
+        # 元のデータは変更されない.
+        assert df.loc[0, "pig"] == "…"
+
+        tgt = fmt.format_raw_qty_frame(df[["pig", "cattle"]])
+        pd.testing.assert_frame_equal(tgt, exp[["pig", "cattle"]])
+
+    def test_raise_format_raw_qty_frame(self):
+        """Raise test for format_raw_qty_frame."""
+        msg = "Specified df must be `pandas.core.frame.DataFrame`."
+        with pytest.raises(TypeError, match=msg):
+            fmt.format_raw_qty_frame(test_qty_series)
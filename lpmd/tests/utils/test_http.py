@@ -0,0 +1,92 @@
+"""pytest for lpmd.utils.http."""
+
+import asyncio
+
+import pytest
+
+import lpmd.utils.http as http
+from lpmd.utils.cache import DownloadCache
+
+
+class TestHttp:
+    """pytest for lpmd.utils.http."""
+
+    def test_fetch_url(self, estat):
+        """Unit test for fetch_url."""
+        estat.routes["/file"] = b"content"
+        assert http.fetch_url(estat.url("/file")) == b"content"
+        assert estat.count() == 1
+
+    def test_raise_fetch_url(self, estat):
+        """Raise test for fetch_url."""
+        with pytest.raises(ValueError, match="Response status must be 200, but 404."):
+            http.fetch_url(estat.url("/missing"))
+
+        estat.routes["/empty"] = b""
+        with pytest.raises(ValueError, match="Response body must not be empty."):
+            http.fetch_url(estat.url("/empty"))
+
+    @pytest.mark.parametrize(
+        "status, content_type, content, msg",
+        [
+            (206, None, b"content", "Response status must be 200, but 206."),
+            (
+                200,
+                "text/html; charset=utf-8",
+                b"<html></html>",
+                "Response must be a file, but text/html.",
+            ),
+            (200, "application/vnd.ms-excel", b"", "Response body must not be empty."),
+        ],
+    )
+    def test_raise_validate_response(self, status, content_type, content, msg):
+        """Raise test for validate_response."""
+        with pytest.raises(ValueError, match=msg):
+            http.validate_response(status, content_type, content)
+
+    @pytest.mark.parametrize("has_aiohttp", [True, False])
+    def test_afetch_url(self, estat, tmp_path, monkeypatch, has_aiohttp):
+        """Unit test for afetch_url."""
+        if has_aiohttp:
+            pytest.importorskip("aiohttp")
+        else:
+            monkeypatch.setattr(http, "_import_aiohttp", lambda: None)
+        estat.routes["/file"] = b"content"
+        cache = DownloadCache(str(tmp_path / "cache"))
+
+        async def _fetch():
+            session = http.open_async_session(max_per_host=1)
+            try:
+                return [
+                    await http.afetch_url(
+                        estat.url("/file"), session=session, cache=cache
+                    )
+                    for _ in range(3)
+                ]
+            finally:
+                if session is not None:
+                    await session.close()
+
+        assert asyncio.run(_fetch()) == [b"content"] * 3
+        # 2回目以降は 304 Not Modified のみで, ダウンロードしない.
+        assert estat.count(status=200) == 1
+        assert estat.count(status=304) == 2
+        if has_aiohttp:
+            # 接続は使い回される.
+            assert len(estat.connections) == 1
+
+    def test_raise_afetch_url(self, estat):
+        """Raise test for afetch_url."""
+        pytest.importorskip("aiohttp")
+        estat.routes["/empty"] = b""
+
+        async def _fetch(url):
+            async with http.open_async_session() as session:
+                return await http.afetch_url(url, session=session)
+
+        with pytest.raises(ValueError, match="Response status must be 200, but 404."):
+            asyncio.run(_fetch(estat.url("/missing")))
+        with pytest.raises(ValueError, match="Response body must not be empty."):
+            asyncio.run(_fetch(estat.url("/empty")))
+        with pytest.raises(OSError, match="Specified url cannot be reached"):
+            asyncio.run(_fetch("http://127.0.0.1:9/"))
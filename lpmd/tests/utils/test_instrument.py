@@ -0,0 +1,38 @@
+"""pytest for lpmd.utils.instrument."""
+
+import time
+
+import pytest
+
+import lpmd.utils.instrument as instrument
+
+
+class TestInstrument:
+    """pytest for lpmd.utils.instrument."""
+
+    def test_span(self):
+        events = []
+        with instrument.span("parse", events.append, partition_id="00.All") as event:
+            time.sleep(0.01)
+            event["rows"] = 10
+        assert len(events) == 1
+        assert events[0]["event"] == "parse"
+        assert events[0]["partition_id"] == "00.All"
+        assert events[0]["rows"] == 10
+        assert events[0]["seconds"] >= 0.01
+        assert events[0]["peak_rss_bytes"] > 0
+        assert "error" not in events[0]
+
+    def test_raise_span(self):
+        """The event is emitted with the error, and the exception is re-raised."""
+        events = []
+        with pytest.raises(ValueError, match="broken"):
+            with instrument.span("parse", events.append):
+                raise ValueError("broken")
+        assert events[0]["error"] == "broken"
+        assert events[0]["seconds"] >= 0
+
+    def test_peak_rss_bytes(self):
+        peak_rss = instrument.peak_rss_bytes()
+        assert peak_rss > 0
+        assert instrument.peak_rss_bytes() >= peak_rss
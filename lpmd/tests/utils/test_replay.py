@@ -0,0 +1,186 @@
+"""pytest for lpmd.utils.replay."""
+
+import asyncio
+import pickle
+import zipfile
+
+import pytest
+
+import lpmd.utils.http as http
+import lpmd.utils.replay as replay
+import lpmd.utils.session as sess
+from lpmd.core.scrape import ScraperShipment
+from lpmd.tests.estat import serve_partitions
+from lpmd.utils.cache import DownloadCache
+
+
+class TestReplaySession:
+    """pytest for lpmd.utils.replay.ReplaySession."""
+
+    @pytest.fixture()
+    def setup(self, estat, tmp_path):
+        estat.routes["/file"] = b"content" * 100
+        self.estat = estat
+        self.url = estat.url("/file")
+        self.path = str(tmp_path / "replay" / "estat.zip")
+
+    def _session(self, mode="auto"):
+        return replay.ReplaySession(
+            self.path, mode=mode, session=sess.Session(backoff_factor=0.0)
+        )
+
+    def test_request(self, setup):
+        """Unit test for ReplaySession.request."""
+        with self._session() as session:
+            response = session.request("GET", self.url)
+            assert (response.status, response.content) == (200, b"content" * 100)
+            assert self.url in session
+        assert self.estat.count() == 1
+
+        # 記録された応答はネットワークに接続せずに再生する.
+        del self.estat.routes["/file"]
+        with self._session(mode="replay") as session:
+            for _ in range(3):
+                response = session.request("GET", self.url)
+                assert (response.status, response.content) == (200, b"content" * 100)
+                assert response.headers["content-length"] == str(len(b"content" * 100))
+            response = session.request("HEAD", self.url)
+            assert (response.status, response.content) == (200, b"")
+        assert self.estat.count() == 1
+
+        # 記録は圧縮される.
+        with zipfile.ZipFile(self.path) as archive:
+            assert all(
+                info.compress_type == zipfile.ZIP_DEFLATED
+                for info in archive.infolist()
+            )
+
+    def test_request_auto(self, setup):
+        """Only the responses which are not recorded are sent in auto mode."""
+        self.estat.routes["/other"] = b"other"
+        with self._session() as session:
+            session.request("GET", self.url)
+        with self._session() as session:
+            session.request("GET", self.url)
+            session.request("GET", self.estat.url("/other"))
+        with self._session(mode="replay") as session:
+            assert session.request("GET", self.estat.url("/other")).content == b"other"
+        assert self.estat.count() == 2
+
+    def test_request_record(self, setup):
+        """The archive is recreated in record mode."""
+        with self._session() as session:
+            session.request("GET", self.url)
+        self.estat.routes["/file"] = b"changed"
+        with self._session(mode="record") as session:
+            assert session.request("GET", self.url).content == b"changed"
+            assert session.request("GET", self.url).content == b"changed"
+        assert self.estat.count() == 3
+        with self._session(mode="replay") as session:
+            assert session.request("GET", self.url).content == b"changed"
+
+    def test_request_status(self, setup):
+        """Error responses are replayed as recorded."""
+        url = self.estat.url("/missing")
+        with self._session() as session:
+            assert session.request("GET", url).status == 404
+        with self._session(mode="replay") as session:
+            with pytest.raises(ValueError):
+                http.fetch_url(url, session=session)
+
+    @pytest.mark.parametrize("mode", ["auto", "record"])
+    def test_request_transient(self, setup, mode):
+        """Transient failures are not recorded in auto mode, so that they are sent again."""
+        self.estat.failures["/file"] = 1
+        session = replay.ReplaySession(
+            self.path, mode=mode, session=sess.Session(retries=0)
+        )
+        with session:
+            assert session.request("GET", self.url).status == 503
+            assert (self.url in session) == (mode == "record")
+        with self._session() as session:
+            response = session.request("GET", self.url)
+        assert response.status == (200 if mode == "auto" else 503)
+        assert self.estat.count() == (2 if mode == "auto" else 1)
+
+    def test_request_conditional(self, setup, tmp_path):
+        """Conditional headers are not sent while recording, so that the whole body is recorded."""
+        download_cache = DownloadCache(str(tmp_path / "cache"))
+        http.fetch_url(self.url, cache=download_cache, session=sess.Session())
+        with self._session() as session:
+            content = http.fetch_url(self.url, cache=download_cache, session=session)
+        assert self.estat.count(status=200) == 2
+        assert self.estat.count(status=304) == 0
+        with self._session(mode="replay") as session:
+            assert http.fetch_url(self.url, session=session) == content
+
+    def test_request_passthrough(self, setup):
+        """Requests to the passthrough hosts are neither recorded nor replayed."""
+        session = replay.ReplaySession(
+            self.path, mode="replay", passthrough_hosts=replay.LOCAL_HOSTS
+        )
+        with session:
+            assert session.request("GET", self.url).status == 200
+            assert self.url not in session
+
+    def test_raise_request(self, setup):
+        """Unit test for ReplaySession.request raising error."""
+        with self._session(mode="replay") as session:
+            with pytest.raises(OSError, match="not recorded"):
+                session.request("GET", self.url)
+        assert self.estat.count() == 0
+
+    def test_raise_init(self, setup):
+        """Unit test for ReplaySession.__init__ raising error."""
+        with pytest.raises(ValueError):
+            replay.ReplaySession(self.path, mode="write")
+        with pytest.raises(TypeError):
+            replay.ReplaySession(1)
+
+    def test_pickle(self, setup):
+        """ReplaySession can be passed to the worker processes."""
+        with self._session() as session:
+            session.request("GET", self.url)
+            session_copied = pickle.loads(pickle.dumps(session))
+            assert session_copied.request("GET", self.url).content == b"content" * 100
+            session_copied.close()
+        assert self.estat.count() == 1
+
+    def test_get_session(self, setup, monkeypatch):
+        """The shared session replays the archive in LPMD_REPLAY."""
+        monkeypatch.setenv("LPMD_REPLAY", self.path)
+        monkeypatch.setenv("LPMD_REPLAY_MODE", "replay")
+        monkeypatch.setattr(sess, "_session", None)
+        session = sess.get_session()
+        assert isinstance(session, replay.ReplaySession)
+        assert session.mode == "replay"
+        # e-Stat の代わりのサーバーは記録せずに接続する.
+        assert http.fetch_url(self.url) == b"content" * 100
+        session.close()
+
+    def test_scraper(self, setup):
+        """Scrapers build the data from the archive without network."""
+        scraper = ScraperShipment(session=self._session())
+        serve_partitions(scraper, self.estat, n_partitions=3)
+        df = scraper.aggregate()
+        n_requests = self.estat.count()
+
+        self.estat.routes.clear()
+        scraper_replayed = ScraperShipment(session=self._session(mode="replay"))
+        scraper_replayed.data_catalogue["partition"] = scraper.data_catalogue[
+            "partition"
+        ]
+        assert scraper_replayed.aggregate().equals(df)
+
+        # 非同期版も記録された応答を再生する.
+        async def _scrape():
+            return [
+                partition_id
+                async for partition_id, df_scraped in scraper_replayed.aiter_partitions()
+                if df_scraped is not None
+            ]
+
+        assert sorted(asyncio.run(_scrape())) == sorted(
+            scraper.data_catalogue["partition"]
+        )
+        assert self.estat.count() == n_requests
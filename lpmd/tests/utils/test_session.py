@@ -0,0 +1,148 @@
+"""pytest for lpmd.utils.session."""
+
+import base64
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import lpmd.utils.session as sess
+
+
+class TestSession:
+    """pytest for lpmd.utils.session."""
+
+    @pytest.fixture()
+    def setup(self):
+        self.session = sess.Session(backoff_factor=0.0)
+        yield
+        self.session.close()
+
+    def test_request(self, setup, estat):
+        """Unit test for Session.request."""
+        estat.routes["/file"] = b"content"
+        for _ in range(3):
+            response = self.session.request("GET", estat.url("/file"))
+            assert (response.status, response.content) == (200, b"content")
+        response = self.session.request("HEAD", estat.url("/file"))
+        assert (response.status, response.content) == (200, b"")
+
+        # 接続は使い回される.
+        assert estat.count() == 4
+        assert len(estat.connections) == 1
+
+    def test_request_concurrent(self, setup, estat):
+        """Connections of the concurrent requests are kept in the pool up to max_per_host."""
+        estat.routes["/file"] = b"content"
+        estat.delay = 0.05
+        self.session.max_per_host = 2
+        url = estat.url("/file")
+        for _ in range(2):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                list_response = list(
+                    executor.map(lambda _: self.session.request("GET", url), range(4))
+                )
+            assert all(response.content == b"content" for response in list_response)
+        assert estat.count() == 8
+        assert len(estat.connections) <= 6
+
+    def test_request_retry(self, setup, estat):
+        """Transient failures are retried."""
+        estat.routes["/file"] = b"content"
+        estat.failures["/file"] = 2
+        response = self.session.request("GET", estat.url("/file"))
+        assert response.content == b"content"
+        assert estat.count(status=503) == 2
+
+        # リトライの回数を超えた場合は, 最後の応答を返す.
+        estat.failures["/file"] = 4
+        response = self.session.request("GET", estat.url("/file"))
+        assert response.status == 503
+        assert estat.count(status=503) == 6
+
+    def test_request_redirect(self, setup, estat):
+        """Redirections are followed."""
+        estat.routes["/file"] = b"content"
+        estat.redirects["/old"] = estat.url("/file")
+        response = self.session.request("GET", estat.url("/old"))
+        assert response.content == b"content"
+        assert response.url == estat.url("/file")
+
+        estat.redirects["/loop"] = "/loop"
+        with pytest.raises(OSError, match="Exceeded 5 redirections."):
+            self.session.request("GET", estat.url("/loop"))
+
+    def test_request_user_agent(self, setup, estat):
+        """User-Agent is sent unless the request specifies it."""
+        estat.routes["/file"] = b"content"
+        self.session.request("GET", estat.url("/file"))
+        self.session.request("GET", estat.url("/file"), headers={"user-agent": "test"})
+        assert [h["User-Agent"] for h in estat.request_headers] == [
+            sess.USER_AGENT,
+            "test",
+        ]
+
+    @pytest.fixture()
+    def proxy_env(self, monkeypatch):
+        for name in ["http_proxy", "https_proxy", "no_proxy"]:
+            monkeypatch.delenv(name, raising=False)
+            monkeypatch.delenv(name.upper(), raising=False)
+        return monkeypatch
+
+    def test_request_proxy(self, setup, estat, proxy_env):
+        """Requests are sent through the proxy in the environment as urllib does."""
+        url = "http://lpmd.invalid/file?statInfId=1"
+        # e-Stat の代わりのサーバーをプロキシとして, 絶対 URL で要求を受ける.
+        estat.routes[url] = b"proxied"
+        proxy_env.setenv(
+            "http_proxy", estat.base_url.replace("http://", "http://user:p%40ss@")
+        )
+        assert self.session.request("GET", url).content == b"proxied"
+        assert estat.requests[-1][1] == url
+        assert estat.request_headers[-1]["Proxy-Authorization"] == "Basic {}".format(
+            base64.b64encode(b"user:p@ss").decode("ascii")
+        )
+
+        # no_proxy のホストには直接接続する.
+        proxy_env.setenv("no_proxy", "lpmd.invalid")
+        self.session.retries = 0
+        with pytest.raises(OSError):
+            self.session.request("GET", url)
+        assert estat.count() == 1
+
+    def test_request_proxy_https(self, setup, proxy_env):
+        """https requests are tunneled through the proxy."""
+        proxy_env.setenv("https_proxy", "http://proxy.invalid:3128")
+        proxy = sess._proxy("https", "www.e-stat.go.jp")
+        assert proxy == ("proxy.invalid", 3128, None)
+        connection, _ = self.session._acquire(
+            ("https", "www.e-stat.go.jp", None, proxy), timeout=1.0
+        )
+        assert (connection.host, connection.port) == ("proxy.invalid", 3128)
+        assert connection._tunnel_host == "www.e-stat.go.jp"
+        connection.close()
+
+        proxy_env.setenv("no_proxy", ".e-stat.go.jp")
+        assert sess._proxy("https", "www.e-stat.go.jp") is None
+
+    def test_raise_request(self, setup):
+        """Raise test for Session.request on the url which cannot be reached."""
+        self.session.retries = 1
+        with pytest.raises(OSError):
+            self.session.request("GET", "http://127.0.0.1:9/")
+
+    def test_pickle(self, setup, estat):
+        """Session is pickled without its connections."""
+        estat.routes["/file"] = b"content"
+        self.session.request("GET", estat.url("/file"))
+        session = pickle.loads(pickle.dumps(self.session))
+        assert session.timeout == self.session.timeout
+        assert session.request("GET", estat.url("/file")).content == b"content"
+        assert len(estat.connections) == 2
+        session.close()
+
+    def test_get_session(self):
+        """Unit test for get_session."""
+        session = sess.get_session()
+        assert isinstance(session, sess.Session)
+        assert sess.get_session() is session
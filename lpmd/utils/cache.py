@@ -0,0 +1,193 @@
+"""lpmd.utils.cache."""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+DEFAULT_MAX_BYTES = 512 * 1024**2
+
+
+class DownloadCache:
+    """
+    On-disk cache of downloaded files keyed by url.
+
+    Each entry stores the raw bytes with the ETag and Last-Modified headers of the response,
+    which are used for conditional requests. If the total size exceeds ``max_bytes``,
+    the least recently used entries are evicted.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory where the entries are stored.
+    max_bytes : int, default 512 MiB
+        Maximum total size of the cached files.
+
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        if not isinstance(cache_dir, (str, os.PathLike)):
+            msg = "Specified cache_dir must be str."
+            raise TypeError(msg)
+        self.cache_dir = os.fspath(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _path(self, url, suffix):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + suffix)
+
+    def get(self, url):
+        """
+        Get the metadata of the entry for url.
+
+        Parameters
+        ----------
+        url : str
+            URL.
+
+        Returns
+        -------
+        meta : dict or None
+            Dict with "url", "etag", "last_modified" and "size". If url is not cached, None.
+
+        """
+        try:
+            with open(self._path(url, ".json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url or not os.path.exists(self._path(url, ".bin")):
+            return None
+        return meta
+
+    def conditional_headers(self, url):
+        """
+        Get the headers of a conditional request for url.
+
+        Parameters
+        ----------
+        url : str
+            URL.
+
+        Returns
+        -------
+        headers : dict
+            If-None-Match and If-Modified-Since headers. Empty if url is not cached.
+
+        """
+        headers = dict()
+        meta = self.get(url)
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def read(self, url):
+        """
+        Read the cached bytes for url and mark the entry as recently used.
+
+        Parameters
+        ----------
+        url : str
+            URL.
+
+        Returns
+        -------
+        content : bytes or None
+            Cached bytes. If url is not cached, None.
+
+        """
+        path = self._path(url, ".bin")
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return content
+
+    def put(self, url, content, etag=None, last_modified=None):
+        """
+        Store the bytes for url.
+
+        Parameters
+        ----------
+        url : str
+            URL.
+        content : bytes
+            Body of the response.
+        etag : str, default None
+            ETag header of the response.
+        last_modified : str, default None
+            Last-Modified header of the response.
+
+        """
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "size": len(content),
+        }
+        # 並行して書き込まれても壊れないように一時ファイルから置き換える.
+        self._replace(self._path(url, ".bin"), content)
+        self._replace(
+            self._path(url, ".json"), json.dumps(meta, ensure_ascii=False).encode()
+        )
+        self.evict()
+
+    def _replace(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def evict(self):
+        """Evict the least recently used entries until the total size is within ``max_bytes``."""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".bin"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                for remove_path in [path, path[: -len(".bin")] + ".json"]:
+                    try:
+                        os.remove(remove_path)
+                    except OSError:
+                        pass
+                total -= size
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith((".bin", ".json")):
+                    os.remove(os.path.join(self.cache_dir, name))
@@ -1,13 +1,38 @@
 """lpmd.utils.check."""
 
+URL_PROTOCOL = ["http://", "https://"]
 
-def check_url(url):
+
+def validate_url(url):
+    """Validate that specified url is str starting with `http://` or `https://`.
+
+    Parameters
+    ----------
+    url : str
+        URL.
+
+    """
+    if not isinstance(url, str):
+        msg = "Specified url must be str."
+        raise TypeError(msg)
+    include_protocol = [url.startswith(protocol) for protocol in URL_PROTOCOL]
+    if not any(include_protocol):
+        msg = "Specified url must start with `http://` or `https://`."
+        raise ValueError(msg)
+
+
+def check_url(url, method="HEAD", session=None):
     """Check whether specified url is effective.
 
     Parameters
     ----------
     url : str
         URL.
+    method : {"HEAD", "GET"}, default "HEAD"
+        HTTP method of the request. "HEAD" only probes reachability without downloading the body;
+        if the server does not allow it, the url is checked again with "GET".
+    session : lpmd.utils.session.Session, default None
+        Session keeping connections alive. If None, the session shared in the process is used.
 
     Returns
     -------
@@ -15,24 +40,20 @@ def check_url(url):
         if specified url is effective, True; otherwise False.
 
     """
-    url_protocol = ["http://", "https://"]
-    is_effective = True
-    if not isinstance(url, str):
-        msg = "Specified url must be str."
-        raise TypeError(msg)
-    else:
-        include_protocol = [url.startswith(protocol) for protocol in url_protocol]
-        if not any(include_protocol):
-            msg = "Specified url must start with `http://` or `https://`."
-            raise ValueError(msg)
-
-        import urllib.error
-        import urllib.request
-
-        try:
-            session = urllib.request.urlopen(url)
-            session.close()
-        except urllib.error.URLError:
-            is_effective = False
-
-    return is_effective
+    validate_url(url)
+    if method not in ["HEAD", "GET"]:
+        msg = "Specified method must be `HEAD` or `GET`."
+        raise ValueError(msg)
+
+    import lpmd.utils.session as sess
+
+    if session is None:
+        session = sess.get_session()
+    try:
+        response = session.request(method, url)
+    except OSError:
+        return False
+    # HEAD が許可されていない場合は GET で確認する.
+    if method == "HEAD" and response.status in [405, 501]:
+        return check_url(url, method="GET", session=session)
+    return 200 <= response.status < 400
@@ -1,14 +1,62 @@
 """lpmd.utils.format."""
+import functools
 import re
 
+import numpy as np
 import pandas as pd
 
 LIST_NULL = ["…", "-", "x"]
 
+TRANSLATE_FULL_WIDTH = str.maketrans("０１２３４５６７８９．，－（）", "0123456789.,-()")
+
+
+# Western year in parentheses, e.g. "平.13(2001)" or "平.17(2005）".
+PATTERN_WESTERN_YEAR = re.compile(r"[(（]\s*(\d{4})\s*[)）]")
+
+# Japanese era and its year, e.g. "昭和35年", "平.元" or "令.3".
+PATTERN_ERA_YEAR = re.compile(r"^\s*(明治|大正|昭和|平成|令和|明|大|昭|平|令)\.?\s*(元|\d+)")
+
+# The year before the first year of each era.
+DICT_ERA_OFFSET = {
+    "明治": 1867,
+    "大正": 1911,
+    "昭和": 1925,
+    "平成": 1988,
+    "令和": 2018,
+    "明": 1867,
+    "大": 1911,
+    "昭": 1925,
+    "平": 1988,
+    "令": 2018,
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def _label_to_year(label):
+    """Convert a label of "年次" into the year, memoized as labels repeat across partitions."""
+    if not isinstance(label, str):
+        return int(label)
+    label = label.translate(TRANSLATE_FULL_WIDTH)
+    match = PATTERN_WESTERN_YEAR.search(label)
+    if match is not None:
+        return int(match.group(1))
+    match = PATTERN_ERA_YEAR.search(label)
+    if match is not None:
+        era, year = match.groups()
+        return DICT_ERA_OFFSET[era] + (1 if year == "元" else int(year))
+    if label.strip().isdigit():
+        return int(label)
+    msg = "Specified label `{}` cannot be formatted into year.".format(label)
+    raise ValueError(msg)
+
 
 def format_raw_str_year(series):
     """Format the series for "年次" column into integer one.
 
+    The Western year in parentheses is used if exists (e.g. "昭和35年(1960)" into 1960),
+    otherwise the year is converted from the Japanese era (e.g. "平.元" into 1989).
+    Each unique label is converted once, and the conversion is memoized across calls.
+
     Parameters
     ----------
     series : pandas.core.series.Series
@@ -23,19 +71,18 @@ def format_raw_str_year(series):
     if not isinstance(series, pd.Series):
         msg = "Specified series must be `pandas.core.series.Series`."
         raise TypeError(msg)
-    series_formatted = (
-        series.str.replace("（", "(")
-        .str.replace("）", ")")
-        .replace(re.compile(r".*\("), "", regex=True)
-        .replace(re.compile(r"\)"), "", regex=True)
-        .astype(int)
-    )
+    dict_year = {label: _label_to_year(label) for label in series.unique()}
+    series_formatted = series.map(dict_year).astype(int)
     return series_formatted
 
 
 def format_raw_qty(series):
     """Format the series on quantities into float one.
 
+    Null tokens in ``LIST_NULL`` become NaN, and full-width digits and thousands separators
+    (e.g. "１２,３４５") are accepted. Values are converted in a single vectorized pass,
+    and strings are normalized only if some of them cannot be converted as they are.
+
     Parameters
     ----------
     series : pandas.core.series.Series
@@ -50,9 +97,56 @@ def format_raw_qty(series):
     if not isinstance(series, pd.Series):
         msg = "Specified series must be `pandas.core.series.Series`."
         raise TypeError(msg)
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
 
-    series_formatted = series.copy()
-    for val in LIST_NULL:
-        series_formatted = series_formatted.replace(val, None)
-    series_formatted = series_formatted.astype(float)
+    values = series.to_numpy(dtype=object, copy=True)
+    values[series.isin(LIST_NULL).to_numpy()] = np.nan
+    try:
+        values_formatted = values.astype(float)
+    except ValueError:
+        # 数値に変換できない文字列がある場合のみ, 全角数字や桁区切りを正規化する.
+        is_str = np.array([isinstance(val, str) for val in values], dtype=bool)
+        series_str = (
+            pd.Series(values[is_str], dtype=object)
+            .str.translate(TRANSLATE_FULL_WIDTH)
+            .str.replace(",", "", regex=False)
+            .str.strip()
+        )
+        values[is_str] = series_str.where(~series_str.isin(LIST_NULL)).to_numpy()
+        values_formatted = values.astype(float)
+    series_formatted = pd.Series(values_formatted, index=series.index, name=series.name)
     return series_formatted
+
+
+def format_raw_qty_frame(df, columns=None):
+    """Format the columns on quantities of the data frame into float ones at once.
+
+    All cells of the columns are converted by a single ``format_raw_qty`` pass
+    instead of column by column.
+
+    Parameters
+    ----------
+    df : pandas.core.frame.DataFrame
+        Data frame including columns on quantities.
+    columns : list of str, default None
+        Columns on quantities. If None, all columns are formatted.
+
+    Returns
+    -------
+    df_formatted : pandas.core.frame.DataFrame
+        Data frame whose columns on quantities are formatted.
+
+    """
+    if not isinstance(df, pd.DataFrame):
+        msg = "Specified df must be `pandas.core.frame.DataFrame`."
+        raise TypeError(msg)
+    columns = list(df.columns) if columns is None else list(columns)
+    df_formatted = df.copy(deep=False)
+    if len(columns) == 0:
+        return df_formatted
+
+    values = df[columns].to_numpy(dtype=object).ravel()
+    values_formatted = format_raw_qty(pd.Series(values, dtype=object)).to_numpy()
+    df_formatted[columns] = values_formatted.reshape(len(df), len(columns))
+    return df_formatted
@@ -0,0 +1,189 @@
+"""lpmd.utils.http."""
+
+import functools
+
+from lpmd.utils.check import validate_url
+
+
+def validate_response(status, content_type, content):
+    """Validate the response of a file download.
+
+    Parameters
+    ----------
+    status : int
+        HTTP status code.
+    content_type : str or None
+        Value of Content-Type header.
+    content : bytes
+        Body of the response.
+
+    """
+    if status != 200:
+        msg = "Response status must be 200, but {}.".format(status)
+        raise ValueError(msg)
+    # e-Stat はエラー時に HTML のページを返すため, ファイルとみなさない.
+    if content_type is not None and content_type.split(";")[0].strip() == "text/html":
+        msg = "Response must be a file, but text/html."
+        raise ValueError(msg)
+    if len(content) == 0:
+        msg = "Response body must not be empty."
+        raise ValueError(msg)
+
+
+def fetch_url(url, timeout=None, cache=None, session=None):
+    """Download the body of specified url in a single request.
+
+    Parameters
+    ----------
+    url : str
+        URL.
+    timeout : float, default None
+        Timeout in seconds. If None, the timeout of the session is used.
+    cache : lpmd.utils.cache.DownloadCache, default None
+        Download cache. If url is cached, a conditional request is sent
+        and the cached bytes are returned when the server answers 304 Not Modified.
+    session : lpmd.utils.session.Session, default None
+        Session keeping connections alive. If None, the session shared in the process is used.
+
+    Returns
+    -------
+    content : bytes
+        Validated body of the response.
+
+    Raises
+    ------
+    OSError
+        If the url cannot be reached.
+    ValueError
+        If the response is not a non-empty file with status 200.
+
+    """
+    validate_url(url)
+
+    import lpmd.utils.session as sess
+
+    if session is None:
+        session = sess.get_session()
+    headers = dict() if cache is None else cache.conditional_headers(url)
+    response = session.request("GET", url, headers=headers, timeout=timeout)
+    if response.status == 304 and cache is not None:
+        content = cache.read(url)
+        if content is None:
+            # 304 の応答後にキャッシュが削除された場合は取得し直す.
+            return fetch_url(url, timeout=timeout, session=session)
+        return content
+
+    validate_response(
+        response.status, response.headers.get("Content-Type"), response.content
+    )
+    if cache is not None:
+        cache.put(
+            url,
+            response.content,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+    return response.content
+
+
+def _import_aiohttp():
+    """Import aiohttp if installed, otherwise None."""
+    try:
+        import aiohttp
+    except ImportError:
+        return None
+    return aiohttp
+
+
+def open_async_session(max_per_host=4, timeout=None):
+    """Open a pooled aiohttp session whose connections are kept alive.
+
+    Parameters
+    ----------
+    max_per_host : int, default 4
+        Maximum number of connections per host in the pool.
+    timeout : float, default None
+        Total timeout of a request in seconds. If None, aiohttp's default is used.
+
+    Returns
+    -------
+    session : aiohttp.ClientSession or None
+        Session, which should be closed by the caller. If aiohttp is not installed, None.
+
+    """
+    aiohttp = _import_aiohttp()
+    if aiohttp is None:
+        return None
+    kwargs = dict()
+    if timeout is not None:
+        kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit_per_host=max_per_host), **kwargs
+    )
+
+
+async def afetch_url(url, session=None, timeout=None, cache=None):
+    """Download the body of specified url in a single request without blocking the event loop.
+
+    Parameters
+    ----------
+    url : str
+        URL.
+    session : aiohttp.ClientSession, default None
+        Session opened by ``open_async_session``.
+        If None, ``fetch_url`` runs on the default executor of the event loop.
+    timeout : float, default None
+        Timeout in seconds. If None, the default of the session is used.
+    cache : lpmd.utils.cache.DownloadCache, default None
+        Download cache. See ``fetch_url``.
+
+    Returns
+    -------
+    content : bytes
+        Validated body of the response.
+
+    Raises
+    ------
+    OSError
+        If the url cannot be reached.
+    ValueError
+        If the response is not a non-empty file with status 200.
+
+    """
+    import asyncio
+
+    validate_url(url)
+    if session is None:
+        # aiohttp がない場合は, スレッドで同期版を実行する.
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(fetch_url, url, timeout=timeout, cache=cache)
+        )
+
+    aiohttp = _import_aiohttp()
+    headers = dict() if cache is None else cache.conditional_headers(url)
+    kwargs = dict()
+    if timeout is not None:
+        kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+    try:
+        async with session.get(url, headers=headers, **kwargs) as response:
+            content = await response.read()
+            status = response.status
+            content_type = response.headers.get("Content-Type")
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        # 同期版と同様に, 接続できない場合は OSError とする.
+        msg = "Specified url cannot be reached: {}".format(e)
+        raise OSError(msg) from e
+
+    if status == 304 and cache is not None:
+        content = cache.read(url)
+        if content is None:
+            # 304 の応答後にキャッシュが削除された場合は取得し直す.
+            return await afetch_url(url, session=session, timeout=timeout)
+        return content
+    validate_response(status, content_type, content)
+    if cache is not None:
+        cache.put(url, content, etag=etag, last_modified=last_modified)
+    return content
@@ -0,0 +1,72 @@
+"""lpmd.utils.instrument."""
+
+import contextlib
+import sys
+import time
+
+
+def peak_rss_bytes():
+    """
+    Get the peak resident set size of the current process.
+
+    Returns
+    -------
+    peak_rss : int or None
+        Peak resident set size in bytes. None if it cannot be measured on the platform.
+
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS はバイト単位, それ以外は KiB 単位で返す.
+    if sys.platform == "darwin":
+        return peak_rss
+    return peak_rss * 1024
+
+
+@contextlib.contextmanager
+def span(name, emit, **fields):
+    """
+    Time a block and emit it as an event.
+
+    The event is a dict with ``event`` (name of the span), the given fields,
+    ``seconds`` taken by the block and ``peak_rss_bytes`` of the process after the block.
+    The block may add fields such as ``bytes`` and ``rows`` to the yielded event.
+    If the block raises, ``error`` is added and the exception is re-raised.
+
+    Parameters
+    ----------
+    name : str
+        Name of the span, e.g. "fetch".
+    emit : callable
+        Function called with the event when the block exits.
+    fields
+        Fields of the event, e.g. ``partition_id``.
+
+    Yields
+    ------
+    event : dict
+        Event to which the block may add fields.
+
+    Examples
+    --------
+    >>> events = []
+    >>> with span("parse", events.append, partition_id="00.All") as event:
+    ...     event["rows"] = 10
+    >>> events[0]["event"], events[0]["rows"]
+    ('parse', 10)
+
+    """
+    event = {"event": name, **fields}
+    start = time.perf_counter()
+    try:
+        yield event
+    except Exception as e:
+        event["error"] = str(e)
+        raise
+    finally:
+        event["seconds"] = time.perf_counter() - start
+        event["peak_rss_bytes"] = peak_rss_bytes()
+        emit(event)
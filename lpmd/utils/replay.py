@@ -0,0 +1,225 @@
+"""lpmd.utils.replay."""
+
+import hashlib
+import json
+import os
+import threading
+import zipfile
+from urllib.parse import urlsplit
+
+from lpmd.utils.session import RETRY_STATUSES, Response
+
+# Modes of ReplaySession.
+REPLAY_MODES = ["record", "replay", "auto"]
+
+# Headers of conditional requests, which are not sent while recording.
+CONDITIONAL_HEADERS = ["If-None-Match", "If-Modified-Since"]
+
+# Hosts of local servers, e.g. the e-Stat stand-in of the tests.
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+
+def _key(method, url):
+    return hashlib.sha256("{} {}".format(method, url).encode("utf-8")).hexdigest()
+
+
+def _make_headers(pairs):
+    """Headers of a recorded response, which are looked up case-insensitively as http.client does."""
+    import http.client
+
+    headers = http.client.HTTPMessage()
+    for name, value in pairs:
+        headers[name] = value
+    return headers
+
+
+class ReplaySession:
+    """
+    HTTP session recording responses into a compressed archive and replaying them without network.
+
+    The session is a drop-in replacement of ``lpmd.utils.session.Session``, e.g. passed as
+    ``session`` of the scrapers. Responses are stored in a zip archive compressed with deflate,
+    keyed by the method and the url, so that later runs are fast and deterministic.
+    HEAD requests are answered with the recorded GET response if the HEAD one is not recorded.
+
+    Parameters
+    ----------
+    path : str
+        Path of the archive.
+    mode : {"record", "replay", "auto"}, default "auto"
+        - "record": every request is sent, and the archive is recreated with the responses.
+        - "replay": only recorded responses are served, and never the network.
+        - "auto": recorded responses are served, and the others are sent and recorded,
+          except the transient failures in ``retry_statuses`` of the session (e.g. 503),
+          which are sent again in later runs.
+    session : lpmd.utils.session.Session, default None
+        Session sending the requests which are recorded. If None, a new session is used.
+    passthrough_hosts : tuple of str, default ()
+        Hosts whose requests are sent with ``session`` and neither recorded nor replayed,
+        e.g. local servers.
+
+    Notes
+    -----
+    The archive can be shared by threads, but not recorded by several processes at the same time.
+    Conditional headers (``If-None-Match`` and ``If-Modified-Since``) are not sent while recording,
+    so that the archive always holds the whole bodies.
+
+    Examples
+    --------
+    >>> session = ReplaySession("estat.zip")  # doctest: +SKIP
+    >>> ScraperShipment(session=session).out_to_datasets()  # doctest: +SKIP
+
+    """
+
+    def __init__(self, path, mode="auto", session=None, passthrough_hosts=()):
+        if mode not in REPLAY_MODES:
+            msg = "Specified mode must be one of {}.".format(REPLAY_MODES)
+            raise ValueError(msg)
+        if not isinstance(path, (str, os.PathLike)):
+            msg = "Specified path must be str."
+            raise TypeError(msg)
+        if session is None:
+            import lpmd.utils.session as sess
+
+            session = sess.Session()
+
+        self.path = os.fspath(path)
+        self.mode = mode
+        self.session = session
+        self.passthrough_hosts = tuple(passthrough_hosts)
+        self._lock = threading.Lock()
+        self._reader = None
+        # record では既存の記録を使わず, 最初の書き込みで作り直す.
+        self._is_new = mode == "record"
+        self._index = dict() if self._is_new else self._read_index()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        del state["_reader"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __contains__(self, url):
+        return _key("GET", url) in self._index
+
+    def close(self):
+        """Close the archive and the connections of the session."""
+        with self._lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+        self.session.close()
+
+    def _read_index(self):
+        """Read the metadata of all recorded responses."""
+        if not os.path.exists(self.path):
+            return dict()
+        index = dict()
+        with zipfile.ZipFile(self.path) as archive:
+            for name in archive.namelist():
+                if name.endswith(".json"):
+                    index[name[: -len(".json")]] = json.loads(archive.read(name))
+        return index
+
+    def _read_body(self, key):
+        with self._lock:
+            if self._reader is None:
+                self._reader = zipfile.ZipFile(self.path)
+            return self._reader.read(key + ".body")
+
+    def _write(self, key, meta, content):
+        with self._lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+            directory = os.path.dirname(self.path)
+            if directory != "":
+                os.makedirs(directory, exist_ok=True)
+            zip_mode = "w" if self._is_new else "a"
+            with zipfile.ZipFile(
+                self.path, zip_mode, compression=zipfile.ZIP_DEFLATED, compresslevel=9
+            ) as archive:
+                if key + ".json" in archive.namelist():
+                    # 同じ名前のエントリは追記できないため, 既に記録されたものを優先する.
+                    return
+                archive.writestr(key + ".body", content)
+                archive.writestr(
+                    key + ".json", json.dumps(meta, ensure_ascii=False, indent=2)
+                )
+            self._is_new = False
+            self._index[key] = meta
+
+    def _replay(self, method, url):
+        """Recorded response, or None if it is not recorded."""
+        key = _key(method, url)
+        if key in self._index:
+            meta = self._index[key]
+            content = self._read_body(key)
+        elif method == "HEAD" and _key("GET", url) in self._index:
+            meta = self._index[_key("GET", url)]
+            content = b""
+        else:
+            return None
+        return Response(
+            meta["final_url"], meta["status"], _make_headers(meta["headers"]), content
+        )
+
+    def request(self, method, url, headers=None, timeout=None, max_redirects=5):
+        """
+        Send a request, or replay the recorded response. See ``Session.request``.
+
+        Raises
+        ------
+        OSError
+            If the url cannot be reached, or is not recorded in "replay" mode.
+
+        """
+        if urlsplit(url).hostname in self.passthrough_hosts:
+            return self.session.request(
+                method,
+                url,
+                headers=headers,
+                timeout=timeout,
+                max_redirects=max_redirects,
+            )
+
+        if self.mode != "record":
+            response = self._replay(method, url)
+            if response is not None:
+                return response
+            if self.mode == "replay":
+                msg = "Specified url is not recorded in {}: {}".format(self.path, url)
+                raise OSError(msg)
+
+        headers = {
+            name: value
+            for name, value in (headers or dict()).items()
+            if name not in CONDITIONAL_HEADERS
+        }
+        response = self.session.request(
+            method, url, headers=headers, timeout=timeout, max_redirects=max_redirects
+        )
+        retry_statuses = getattr(self.session, "retry_statuses", RETRY_STATUSES)
+        if self.mode == "auto" and response.status in retry_statuses:
+            # 一時的な障害を記録すると, 以降の実行で再生され続けるため記録しない.
+            return response
+        meta = {
+            "method": method,
+            "url": url,
+            "final_url": response.url,
+            "status": response.status,
+            "headers": list(response.headers.items()),
+        }
+        self._write(_key(method, url), meta, response.content)
+        return response
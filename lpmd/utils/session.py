@@ -0,0 +1,338 @@
+"""lpmd.utils.session."""
+
+import os
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urljoin, urlsplit
+
+# Timeout of a request in seconds.
+DEFAULT_TIMEOUT = 60.0
+
+# Status codes of the responses which are retried.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Status codes of the redirections which are followed.
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+# User-Agent sent if the request does not specify it, as urllib sends its own.
+USER_AGENT = "lpmd (+https://lpmd.readthedocs.io/en/latest)"
+
+Response = namedtuple("Response", ["url", "status", "headers", "content"])
+
+_lock = threading.Lock()
+_session = None
+
+
+class Session:
+    """
+    HTTP session keeping connections alive in a pool per host.
+
+    Requests to the same host re-use the idle connections in the pool instead of opening
+    a new TCP (and TLS) connection for each request. Transient failures, i.e. connection errors,
+    timeouts and the status codes in ``retry_statuses``, are retried with exponential backoff.
+    The session can be shared by threads, and pickled without its connections.
+
+    Parameters
+    ----------
+    timeout : float, default 60.0
+        Timeout of a request in seconds.
+    max_per_host : int, default 4
+        Maximum number of idle connections kept per host.
+    retries : int, default 3
+        Maximum number of retries of a request.
+    backoff_factor : float, default 0.5
+        Seconds to sleep before the first retry, which is doubled on each retry.
+        ``Retry-After`` header of the response is honored if it is longer.
+    retry_statuses : tuple of int, default (429, 500, 502, 503, 504)
+        Status codes of the responses which are retried.
+
+    Notes
+    -----
+    Proxies are taken from the environment as ``urllib.request`` does, i.e. ``http_proxy``,
+    ``https_proxy`` and ``no_proxy`` (or the system settings on Windows and macOS).
+    https requests are tunneled through the proxy with ``CONNECT``.
+
+    """
+
+    def __init__(
+        self,
+        timeout=DEFAULT_TIMEOUT,
+        max_per_host=4,
+        retries=3,
+        backoff_factor=0.5,
+        retry_statuses=RETRY_STATUSES,
+    ):
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.retry_statuses = tuple(retry_statuses)
+        self._lock = threading.Lock()
+        self._pools = dict()
+        self._pid = os.getpid()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # 接続とロックはプロセス間で共有できないため, 復元先で作り直す.
+        del state["_lock"]
+        del state["_pools"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._pools = dict()
+        self._pid = os.getpid()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close all idle connections in the pool."""
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools = dict()
+        for pool in pools:
+            for connection in pool:
+                connection.close()
+
+    def _acquire(self, key, timeout):
+        """Take an idle connection of the host from the pool, or open a new one."""
+        if self._pid != os.getpid():
+            # fork された子プロセスでは親プロセスの接続を使わない.
+            self._lock = threading.Lock()
+            self._pools = dict()
+            self._pid = os.getpid()
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool:
+                connection = pool.pop()
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                return connection, True
+
+        import http.client
+
+        scheme, host, port, proxy = key
+        if proxy is not None:
+            # プロキシに接続し, https の場合は CONNECT で目的のホストまで中継させる.
+            connect_host, connect_port, proxy_authorization = proxy
+        else:
+            connect_host, connect_port = host, port
+        if scheme == "https":
+            import ssl
+
+            connection = http.client.HTTPSConnection(
+                connect_host,
+                connect_port,
+                timeout=timeout,
+                context=ssl.create_default_context(),
+            )
+            if proxy is not None:
+                tunnel_headers = dict()
+                if proxy_authorization is not None:
+                    tunnel_headers["Proxy-Authorization"] = proxy_authorization
+                connection.set_tunnel(host, port, headers=tunnel_headers)
+        else:
+            connection = http.client.HTTPConnection(
+                connect_host, connect_port, timeout=timeout
+            )
+        return connection, False
+
+    def _release(self, key, connection):
+        """Return the connection to the pool, or close it if the pool of the host is full."""
+        with self._lock:
+            pool = self._pools.setdefault(key, [])
+            if len(pool) < self.max_per_host:
+                pool.append(connection)
+                return
+        connection.close()
+
+    def _send(self, method, url, headers, timeout):
+        """Send a single request, re-opening the connection once if an idle one has been closed."""
+        import http.client
+
+        parts = urlsplit(url)
+        proxy = _proxy(parts.scheme, parts.hostname, parts.port)
+        key = (parts.scheme, parts.hostname, parts.port, proxy)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        if proxy is not None and parts.scheme == "http":
+            # http のプロキシには絶対 URL で要求する.
+            path = "{}://{}{}".format(parts.scheme, parts.netloc, path)
+            if proxy[2] is not None:
+                headers = {**headers, "Proxy-Authorization": proxy[2]}
+
+        while True:
+            connection, is_reused = self._acquire(key, timeout)
+            try:
+                connection.request(method, path, headers=headers)
+                response = connection.getresponse()
+                content = response.read()
+            except (http.client.HTTPException, ConnectionError) as e:
+                connection.close()
+                # サーバーが閉じたアイドル接続を使った場合は, 新しい接続でやり直す.
+                if is_reused:
+                    continue
+                if isinstance(e, http.client.HTTPException):
+                    raise ConnectionError(str(e)) from e
+                raise
+            except BaseException:
+                connection.close()
+                raise
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(key, connection)
+            return Response(url, response.status, response.headers, content)
+
+    def request(self, method, url, headers=None, timeout=None, max_redirects=5):
+        """
+        Send a request, following redirections and retrying transient failures.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method, e.g. "GET" or "HEAD".
+        url : str
+            URL starting with `http://` or `https://`.
+        headers : dict, default None
+            Headers of the request.
+        timeout : float, default None
+            Timeout in seconds. If None, ``timeout`` of the session is used.
+        max_redirects : int, default 5
+            Maximum number of redirections followed.
+
+        Returns
+        -------
+        response : Response
+            Named tuple of url (after redirections), status, headers and content.
+            The status may be an error status, which is not raised.
+
+        Raises
+        ------
+        OSError
+            If the url cannot be reached after the retries.
+
+        """
+        headers = dict() if headers is None else dict(headers)
+        if not any(name.lower() == "user-agent" for name in headers):
+            headers["User-Agent"] = USER_AGENT
+        timeout = self.timeout if timeout is None else timeout
+
+        for _ in range(max_redirects + 1):
+            response = self._request_with_retries(method, url, headers, timeout)
+            location = response.headers.get("Location")
+            if response.status not in REDIRECT_STATUSES or location is None:
+                return response
+            url = urljoin(url, location)
+            if response.status == 303:
+                method = "GET"
+        msg = "Exceeded {} redirections.".format(max_redirects)
+        raise OSError(msg)
+
+    def _request_with_retries(self, method, url, headers, timeout):
+        import socket
+
+        for attempt in range(self.retries + 1):
+            is_last = attempt == self.retries
+            try:
+                response = self._send(method, url, headers, timeout)
+            except socket.gaierror:
+                # 名前解決の失敗は一時的なものとみなさない.
+                raise
+            except (ConnectionError, TimeoutError, socket.timeout):
+                if is_last:
+                    raise
+                self._sleep(attempt)
+                continue
+            if response.status not in self.retry_statuses or is_last:
+                return response
+            self._sleep(attempt, response.headers.get("Retry-After"))
+        return response
+
+    def _sleep(self, attempt, retry_after=None):
+        seconds = self.backoff_factor * (2**attempt)
+        if retry_after is not None and retry_after.isdigit():
+            seconds = max(seconds, int(retry_after))
+        time.sleep(seconds)
+
+
+def _proxy(scheme, host, port=None):
+    """
+    Proxy of the url taken from the environment as ``urllib.request`` does.
+
+    Returns
+    -------
+    proxy : tuple or None
+        Tuple of the host, the port and the value of ``Proxy-Authorization`` (None without credentials).
+        None if the url is not proxied.
+
+    """
+    import base64
+    import urllib.request
+    from urllib.parse import unquote
+
+    proxy_url = urllib.request.getproxies().get(scheme)
+    if not proxy_url:
+        return None
+    if urllib.request.proxy_bypass(
+        host if port is None else "{}:{}".format(host, port)
+    ):
+        return None
+    if "://" not in proxy_url:
+        proxy_url = "http://" + proxy_url
+    parts = urlsplit(proxy_url)
+    proxy_authorization = None
+    if parts.username is not None:
+        credentials = "{}:{}".format(
+            unquote(parts.username), unquote(parts.password or "")
+        )
+        proxy_authorization = "Basic " + base64.b64encode(
+            credentials.encode("utf-8")
+        ).decode("ascii")
+    default_port = 443 if parts.scheme == "https" else 80
+    return parts.hostname, parts.port or default_port, proxy_authorization
+
+
+def get_session():
+    """
+    Get the session shared in the process, which keeps connections alive across requests.
+
+    If the environment variable ``LPMD_REPLAY`` is set to the path of an archive, the session is
+    ``lpmd.utils.replay.ReplaySession`` recording and replaying the responses in the archive,
+    whose mode is given by ``LPMD_REPLAY_MODE`` (default "auto"). Requests to the local hosts
+    are not recorded.
+
+    Returns
+    -------
+    session : Session or lpmd.utils.replay.ReplaySession
+        Session with the default settings.
+
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _make_default_session()
+    return _session
+
+
+def _make_default_session():
+    path = os.environ.get("LPMD_REPLAY")
+    if not path:
+        return Session()
+    import lpmd.utils.replay as replay
+
+    return replay.ReplaySession(
+        path,
+        mode=os.environ.get("LPMD_REPLAY_MODE", "auto"),
+        passthrough_hosts=replay.LOCAL_HOSTS,
+    )
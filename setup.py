@@ -34,6 +34,12 @@ setup(
     url="https://lpmd.readthedocs.io/en/latest",
     packages=find_packages(),
     install_requires=list(read(REQUIREMENTS).splitlines()),
+    extras_require={
+        "dask": ["dask[dataframe]"],
+        "calamine": ["python-calamine"],
+        "aiohttp": ["aiohttp"],
+    },
+    entry_points={"console_scripts": ["lpmd=lpmd.cli:main"]},
     include_package_data=True,
     python_requires=">=3.9",
 )